@@ -2,12 +2,12 @@
 IVR Lead Processing Tasks
 Query last 1000 calls, group by project/status, enqueue WhatsApp sends
 """
-import re
 from datetime import datetime, timedelta
 from django.db.models import Q
 from django.utils import timezone
 from .models import IVRCall
 from dashboard.models import Lead, Project
+from dashboard import phone_numbers
 from apps.whatsapp.api import WhatsAppService
 
 class IVRLeadProcessor:
@@ -20,25 +20,12 @@ class IVRLeadProcessor:
     
     def validate_e164_phone(self, phone):
         """Validate and convert to E.164 format"""
-        clean_phone = re.sub(r'[^\d+]', '', phone)
-        
-        if not clean_phone.startswith('+'):
-            if clean_phone.startswith('91') and len(clean_phone) == 12:
-                clean_phone = '+' + clean_phone
-            elif len(clean_phone) == 10:
-                clean_phone = '+91' + clean_phone
-            else:
-                return None
-        
-        e164_pattern = r'^\+[1-9]\d{6,15}$'
-        if re.match(e164_pattern, clean_phone):
-            return clean_phone
-        return None
+        return phone_numbers.normalize(phone) or None
     
     def check_dnd_list(self, phone):
         """Check if phone is in CRM DND list"""
         # Check if lead has opted out
-        lead = Lead.objects.filter(phone=phone).first()
+        lead = Lead.objects.matching_phone(phone).first()
         return lead and hasattr(lead, 'whatsapp_opt_out') and lead.whatsapp_opt_out
     
     def deduplicate_by_phone(self, calls):
@@ -126,7 +113,7 @@ class IVRLeadProcessor:
         template_name = "project_update_template"  # Default template
         
         # Get lead name if exists
-        lead = Lead.objects.filter(phone__icontains=clean_phone[-10:]).first()
+        lead = Lead.objects.matching_phone(clean_phone).first()
         lead_name = lead.name if lead else "Customer"
         
         # Get project brochure URL if exists
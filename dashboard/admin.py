@@ -2,10 +2,12 @@ from django.contrib import admin
 from .models import (
     Project, ProjectImage, Lead, LeadNote, LeadStage, LeadStageHistory,
     TeamMember, Meeting, Earning, Task, TaskStage, TaskCategory, 
-    CalendarEvent, Notification, Attendance, IVRCallLog,
-    WhatsAppTemplate, WhatsAppMessage, Event, EventRegistration,
+    CalendarEvent, Notification, Attendance, IVRCallLog, WebhookEvent, SyncWatermark,
+    WhatsAppTemplate, WhatsAppMessage, WhatsAppOptOut, WhatsAppCampaignJob, WhatsAppCampaignRecipient,
+    Event, EventRegistration,
     LeadSource, MarketingExpense, ProjectUnit, Client,
-    LeaveType, LeaveApplication, CompOffRequest
+    LeaveType, LeaveApplication, CompOffRequest,
+    LeadImportJob, LeadImportError, KPISnapshot, LeadDailyMetric
 )
 
 @admin.register(Project)
@@ -157,6 +159,53 @@ class WhatsAppMessageAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'sent_at', 'delivered_at', 'read_at', 'failed_at']
     raw_id_fields = ['lead', 'template']
 
+@admin.register(WhatsAppOptOut)
+class WhatsAppOptOutAdmin(admin.ModelAdmin):
+    list_display = ['phone_number', 'reason', 'created_at']
+    search_fields = ['phone_number', 'reason']
+    readonly_fields = ['created_at']
+
+@admin.register(WhatsAppCampaignJob)
+class WhatsAppCampaignJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'template_name', 'status', 'total_recipients', 'sent_count', 'failed_count', 'skipped_count', 'created_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['template_name']
+    readonly_fields = ['created_at', 'started_at', 'completed_at', 'updated_at', 'lease_owner', 'lease_expires_at']
+
+@admin.register(WhatsAppCampaignRecipient)
+class WhatsAppCampaignRecipientAdmin(admin.ModelAdmin):
+    list_display = ['job', 'lead', 'phone_number', 'status', 'processed_at']
+    list_filter = ['status']
+    search_fields = ['phone_number', 'lead__name']
+    raw_id_fields = ['job', 'lead', 'whatsapp_message']
+
+@admin.register(LeadImportJob)
+class LeadImportJobAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'status', 'rows_processed', 'created_count', 'skipped_count', 'failed_count', 'created_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['original_name', 'created_by__username']
+    readonly_fields = ['rows_processed', 'created_count', 'skipped_count', 'failed_count', 'lease_owner', 'lease_expires_at',
+                       'started_at', 'completed_at', 'created_at', 'updated_at']
+    # Uploads go through LeadImportJobRunner.enqueue; the import storage has no public URLs
+    exclude = ['file']
+
+@admin.register(LeadImportError)
+class LeadImportErrorAdmin(admin.ModelAdmin):
+    list_display = ['job', 'row_number', 'message']
+    search_fields = ['message']
+    raw_id_fields = ['job']
+
+@admin.register(KPISnapshot)
+class KPISnapshotAdmin(admin.ModelAdmin):
+    list_display = ['key', 'value', 'refreshed_at']
+    readonly_fields = ['refreshed_at']
+
+@admin.register(LeadDailyMetric)
+class LeadDailyMetricAdmin(admin.ModelAdmin):
+    list_display = ['date', 'source', 'project', 'assigned_to', 'stage', 'created', 'converted', 'touched', 'built_at']
+    list_filter = ['source', 'stage_category', 'date']
+    date_hierarchy = 'date'
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ['name', 'event_type', 'start_date', 'location', 'registration_count', 'is_active']
@@ -478,6 +527,27 @@ class IVRCallLogAdmin(admin.ModelAdmin):
         self.message_user(request, f'{count} new leads created from call logs.')
     create_leads_from_calls.short_description = "Create new leads from unassociated calls"
 
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['idempotency_key', 'source', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['source', 'status', 'received_at']
+    search_fields = ['idempotency_key', 'last_error']
+    readonly_fields = ['idempotency_key', 'source', 'payload', 'attempts', 'last_error',
+                       'lease_owner', 'lease_expires_at', 'received_at', 'processed_at']
+    
+    actions = ['retry_events']
+    
+    def retry_events(self, request, queryset):
+        updated = queryset.exclude(status='done').update(status='pending', attempts=0, lease_owner='', lease_expires_at=None)
+        self.message_user(request, f'{updated} webhook events queued for another attempt.')
+    retry_events.short_description = "Retry selected failed events"
+
+@admin.register(SyncWatermark)
+class SyncWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'watermark', 'last_run_at', 'last_success_at', 'last_synced_count', 'lease_owner']
+    readonly_fields = ['last_run_at', 'last_success_at', 'last_synced_count', 'last_error',
+                       'lease_owner', 'lease_expires_at', 'updated_at']
+
 @admin.register(LeaveType)
 class LeaveTypeAdmin(admin.ModelAdmin):
     list_display = ['name', 'days_allowed_per_year', 'carry_forward_allowed', 'max_carry_forward_days', 'requires_approval']
@@ -4,3 +4,6 @@ class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
     verbose_name = 'Dashboard'
+    
+    def ready(self):
+        from . import signals
@@ -0,0 +1,219 @@
+"""
+Incremental TATA call record sync
+Pulls only the CDRs newer than a stored watermark (minus a small overlap for
+late-arriving records), fetches pages concurrently with a bounded thread pool
+and upserts each page in one statement through ivr_ingest.
+"""
+import logging
+import math
+import os
+import socket
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import ivr_ingest
+from .models import SyncWatermark
+from .tata_calls_api import TATACallsAPI
+
+logger = logging.getLogger(__name__)
+
+# Windows are not split below this, however many calls they hold
+MIN_WINDOW = timedelta(minutes=1)
+
+
+class CDRSyncError(Exception):
+    pass
+
+
+class CDRSync:
+    """Sync TATA call records from the watermark up to now"""
+
+    name = 'tata_cdr'
+
+    def __init__(self, api=None, page_size: int = None, workers: int = None, overlap_seconds: int = None,
+                 max_pages: int = 500, lease_seconds: int = 600, worker_id: str = None):
+        self.api = api or TATACallsAPI()
+        self.page_size = page_size or getattr(settings, 'TATA_CDR_PAGE_SIZE', 100)
+        self.workers = workers or getattr(settings, 'TATA_CDR_SYNC_WORKERS', 4)
+        self.overlap = timedelta(seconds=getattr(settings, 'TATA_CDR_SYNC_OVERLAP_SECONDS', 300) if overlap_seconds is None else overlap_seconds)
+        self.max_pages = max_pages
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    def claim(self):
+        """Lease the watermark row; None while another run holds it"""
+        state, _ = SyncWatermark.objects.get_or_create(name=self.name)
+        now = timezone.now()
+        claimed = SyncWatermark.objects.filter(id=state.id).filter(
+            Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now) | Q(lease_owner=self.worker_id)
+        ).update(lease_owner=self.worker_id, lease_expires_at=now + timedelta(seconds=self.lease_seconds), last_run_at=now)
+        if not claimed:
+            return None
+        state.refresh_from_db()
+        return state
+
+    def window(self, state, since=None):
+        if since is None:
+            if state.watermark:
+                since = state.watermark - self.overlap
+            else:
+                since = timezone.now() - timedelta(days=getattr(settings, 'TATA_CDR_SYNC_INITIAL_DAYS', 1))
+        return since, timezone.now()
+
+    def fetch_page(self, from_date: str, to_date: str, page: int) -> Dict:
+        """One page of call records (runs in a pool thread, so it must not touch the database)"""
+        result = self.api.get_call_records(from_date, to_date, page=page, limit=self.page_size)
+        if result.get('success') is False:
+            raise CDRSyncError(f"Page {page}: {result.get('error', 'API error')}")
+        return result
+
+    def run(self, since=None) -> Dict:
+        """Sync from the watermark up to now, checkpointing the watermark after each window
+
+        A window holding more than max_pages pages is split into shorter windows sized
+        from its page count, so a backlog (after an outage or a busy day) is worked
+        through window by window instead of re-reading the same first pages every run.
+        """
+        state = self.claim()
+        if state is None:
+            logger.info("TATA CDR sync already running elsewhere, skipping")
+            return {'status': 'busy'}
+
+        start, end = self.window(state, since)
+        stats = {
+            'status': 'ok', 'from': start, 'to': end, 'windows': 0, 'pages': 0,
+            'fetched': 0, 'created': 0, 'updated': 0, 'capped': False
+        }
+        newest = state.watermark
+
+        try:
+            window_start = start
+            while window_start < end:
+                window_end = end
+                while True:
+                    window_newest, pages_needed = self.sync_window(window_start, window_end, stats)
+                    if pages_needed is None or window_end - window_start <= MIN_WINDOW:
+                        break
+                    # Too many calls for one window: retry a shorter one (its first pages are already stored)
+                    window_end = window_start + max((window_end - window_start) * self.max_pages / pages_needed, MIN_WINDOW)
+
+                if pages_needed is not None:
+                    stats['capped'] = True
+                    logger.warning(
+                        f"TATA CDR sync window from {window_start} holds more than {self.max_pages} pages "
+                        f"even at {MIN_WINDOW}; only the first {self.max_pages} pages were stored"
+                    )
+                if window_newest is not None and (newest is None or window_newest > newest):
+                    newest = window_newest
+                stats['windows'] += 1
+                self.checkpoint(state, newest)
+                window_start = window_end
+        except Exception as e:
+            logger.error(f"TATA CDR sync failed after {stats['pages']} pages: {str(e)}")
+            stats.update(status='failed', error=str(e))
+            self.release(state, last_error=str(e)[:2000], last_synced_count=stats['created'])
+            return stats
+
+        self.release(
+            state,
+            watermark=newest,
+            last_success_at=timezone.now(),
+            last_synced_count=stats['created'],
+            last_error=f"A window exceeded {self.max_pages} pages" if stats['capped'] else ''
+        )
+        stats['watermark'] = newest
+        logger.info(
+            f"TATA CDR sync {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}: {stats['windows']} windows, "
+            f"{stats['pages']} pages, {stats['created']} new calls, {stats['updated']} updated"
+        )
+        return stats
+
+    def sync_window(self, window_start, window_end, stats: Dict):
+        """Store every page of one window
+
+        Returns (newest start time stored, None) when the window fit under max_pages, or
+        (newest, pages needed) when it didn't and should be retried as a shorter window.
+        """
+        from_date = timezone.localtime(window_start).strftime('%Y-%m-%d %H:%M:%S')
+        to_date = timezone.localtime(window_end).strftime('%Y-%m-%d %H:%M:%S')
+
+        first = self.fetch_page(from_date, to_date, 1)
+        records = first.get('results') or []
+        newest = self.store(records, stats, None)
+        total_pages = self.page_count(first)
+        if total_pages is not None and total_pages > self.max_pages:
+            return newest, total_pages
+        if len(records) < self.page_size:
+            return newest, None
+        last_page = min(total_pages or self.max_pages, self.max_pages)
+        overflow = total_pages is None and last_page == 1
+
+        # The window end is fixed, so pages stay stable while they are fetched out of order
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight, next_page = {}, 2
+            while True:
+                while len(in_flight) < self.workers and next_page <= last_page:
+                    in_flight[pool.submit(self.fetch_page, from_date, to_date, next_page)] = next_page
+                    next_page += 1
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    try:
+                        records = future.result().get('results') or []
+                    except Exception:
+                        for pending in in_flight:
+                            pending.cancel()
+                        raise
+                    newest = self.store(records, stats, newest)
+                    if len(records) < self.page_size:
+                        last_page = min(last_page, page)
+                    elif page == self.max_pages and total_pages is None:
+                        overflow = True  # a full page at the cap: there are more beyond it
+
+        # Without a reported total the real page count is unknown; halve the window
+        return newest, (2 * self.max_pages if overflow else None)
+
+    def page_count(self, result: Dict):
+        """Page count from the API's total, None when it doesn't report one"""
+        total = result.get('count', result.get('total'))
+        if isinstance(total, int) and total >= 0:
+            return max(1, math.ceil(total / self.page_size))
+        return None
+
+    def store(self, records: List[Dict], stats: Dict, newest):
+        stats['pages'] += 1
+        if not records:
+            return newest
+        calls = [ivr_ingest.call_from_cdr(record) for record in records]
+        result = ivr_ingest.ingest_calls(calls, update_fields=ivr_ingest.UPDATE_FIELDS + ['start_stamp'])
+        stats['fetched'] += len(records)
+        stats['created'] += result['created']
+        stats['updated'] += result['updated']
+        # Records without a date get a now() start_stamp; they must not drag the watermark forward
+        dated = [start for start in map(ivr_ingest.cdr_start, records) if start is not None]
+        if not dated:
+            return newest
+        latest = max(dated)
+        return latest if newest is None or latest > newest else newest
+
+    def checkpoint(self, state, watermark):
+        """Save the watermark after a finished window and extend the lease for the next one"""
+        SyncWatermark.objects.filter(id=state.id, lease_owner=self.worker_id).update(
+            watermark=watermark, lease_expires_at=timezone.now() + timedelta(seconds=self.lease_seconds)
+        )
+
+    def release(self, state, **fields):
+        SyncWatermark.objects.filter(id=state.id, lease_owner=self.worker_id).update(
+            lease_owner='', lease_expires_at=None, **fields
+        )
+
+    def reset(self):
+        """Forget the watermark; the next run starts from TATA_CDR_SYNC_INITIAL_DAYS ago"""
+        SyncWatermark.objects.filter(name=self.name).update(watermark=None)
@@ -1,9 +1,10 @@
-import requests
 import json
 from datetime import datetime
+from .tata_http import get_client
 
 class TataChatPanel:
     def __init__(self, auth_token):
+        self.http = get_client()
         self.auth_token = auth_token
         self.base_url = "https://wb.omni.tatatelebusiness.com"
         self.headers = {"Authorization": f"Bearer {auth_token}"}
@@ -38,7 +39,7 @@ class TataChatPanel:
             "text": {"body": message_text}
         }
         
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.http.post(url, headers=self.headers, json=payload)
         
         if response.status_code == 200:
             # Add to conversation history
@@ -0,0 +1,114 @@
+"""
+Database-backed file storage
+Keeps files as fixed-size binary chunks so a file saved by one service (the
+web process) can be streamed by another (a worker) without a shared disk.
+"""
+import io
+import logging
+
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StoredFileReader(io.RawIOBase):
+    """Seekable reader that loads one chunk at a time, so pandas and openpyxl can stream it"""
+
+    def __init__(self, stored):
+        self.stored = stored
+        self.position = 0
+        self.chunk_index = None
+        self.chunk = b''
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.stored.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.stored.size:
+            return 0
+        index, start = divmod(self.position, self.stored.chunk_size)
+        if index != self.chunk_index:
+            from .models import StoredFileChunk
+            self.chunk = bytes(StoredFileChunk.objects.values_list('data', flat=True).get(file=self.stored, index=index))
+            self.chunk_index = index
+        data = self.chunk[start:start + len(buffer)]
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+@deconstructible
+class DatabaseStorage(Storage):
+    """Storage backend that keeps files in StoredFile/StoredFileChunk rows
+
+    Models are imported per call: the storage is built while dashboard.models is still loading.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def _save(self, name, content):
+        from .models import StoredFile, StoredFileChunk
+
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with transaction.atomic():
+            stored = StoredFile.objects.create(name=name, chunk_size=self.chunk_size)
+            index = 0
+            while True:
+                data = content.read(self.chunk_size)
+                if not data:
+                    break
+                StoredFileChunk.objects.create(file=stored, index=index, data=data)
+                stored.size += len(data)
+                index += 1
+            stored.save(update_fields=['size'])
+        logger.info(f"Stored {name} in the database ({stored.size} bytes, {index} chunks)")
+        return name
+
+    def _open(self, name, mode='rb'):
+        from .models import StoredFile
+
+        if 'w' in mode or 'a' in mode or '+' in mode:
+            raise ValueError("DatabaseStorage files are read-only once saved")
+        try:
+            stored = StoredFile.objects.get(name=name)
+        except StoredFile.DoesNotExist:
+            raise FileNotFoundError(f"No stored file named {name}")
+        return File(io.BufferedReader(StoredFileReader(stored), buffer_size=64 * 1024), name=name)
+
+    def exists(self, name):
+        from .models import StoredFile
+
+        return StoredFile.objects.filter(name=name).exists()
+
+    def delete(self, name):
+        from .models import StoredFile
+
+        StoredFile.objects.filter(name=name).delete()
+
+    def size(self, name):
+        from .models import StoredFile
+
+        return StoredFile.objects.values_list('size', flat=True).get(name=name)
@@ -0,0 +1,169 @@
+"""
+IVR call ingestion
+Webhook payloads and TATA CDR pages are mapped to IVRCallLog rows keyed on the
+provider call uuid and upserted in one statement, so replayed webhooks and
+overlapping sync windows update the same rows instead of adding new ones.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import phone_numbers, report_cache
+from .models import IVRCallLog, Lead, LeadNote
+
+logger = logging.getLogger(__name__)
+
+# Columns a re-delivered call may refresh; the lead association and processed flag are ours
+UPDATE_FIELDS = [
+    'call_to_number', 'caller_id_number', 'call_id', 'end_stamp', 'duration', 'status',
+    'billing_circle', 'customer_no_with_prefix', 'raw_data'
+]
+
+
+def call_uuid(data: Dict) -> str:
+    """Provider call id of a payload; a hash of the payload when it carries none, so replays still collide"""
+    provider_id = data.get('uuid') or data.get('call_id')
+    if provider_id:
+        return str(provider_id)[:100]
+    return 'ivr_' + hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        try:
+            moment = parse_datetime(str(value)) if value else None
+        except ValueError:
+            moment = None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def call_from_webhook(data: Dict) -> IVRCallLog:
+    """Unsaved call log for a TATA IVR webhook payload (either of the webhook formats)"""
+    caller = data.get('caller_id_number') or data.get('from', '')
+    return IVRCallLog(
+        uuid=call_uuid(data),
+        call_to_number=data.get('call_to_number') or data.get('to', ''),
+        caller_id_number=caller,
+        call_id=data.get('call_id', ''),
+        start_stamp=_timestamp(data.get('start_stamp') or data.get('start_time')) or timezone.now(),
+        end_stamp=_timestamp(data.get('end_stamp')),
+        duration=int(data.get('duration') or data.get('billsec') or 0),
+        status=data.get('status', 'received'),
+        billing_circle=data.get('billing_circle', ''),
+        customer_no_with_prefix=data.get('customer_no_with_prefix', caller),
+        raw_data=data
+    )
+
+
+def cdr_start(data: Dict):
+    """Start time of a call records API record, None when it has no usable date and time"""
+    if not (data.get('date') and data.get('time')):
+        return None
+    return _timestamp(f"{data.get('date')} {data.get('time')}")
+
+
+def call_from_cdr(data: Dict) -> IVRCallLog:
+    """Unsaved call log for a record from the TATA call records API"""
+    circle = data.get('circle')
+    return IVRCallLog(
+        uuid=call_uuid(data),
+        call_to_number=data.get('did_number', ''),
+        caller_id_number=data.get('client_number', ''),
+        call_id=data.get('call_id', ''),
+        start_stamp=cdr_start(data) or timezone.now(),
+        duration=int(data.get('call_duration') or 0),
+        status=data.get('status', 'unknown'),
+        billing_circle=circle.get('circle', '') if isinstance(circle, dict) else '',
+        customer_no_with_prefix=data.get('client_number', ''),
+        raw_data=data
+    )
+
+
+class IVRCallIngestor:
+    """Upsert call logs by uuid and link the new ones to their leads in bulk"""
+
+    def __init__(self, update_fields: List[str] = None, batch_size: int = 500):
+        self.update_fields = update_fields or UPDATE_FIELDS
+        self.batch_size = batch_size
+
+    def ingest(self, calls: Iterable[IVRCallLog]) -> Dict:
+        """Returns created/updated/associated counts and the uuids that were new"""
+        by_uuid = {}
+        for call in calls:
+            by_uuid[call.uuid] = call  # the last delivery of a call within one batch wins
+        if not by_uuid:
+            return {'created': 0, 'updated': 0, 'associated': 0, 'new_uuids': []}
+
+        with transaction.atomic():
+            existing = set(IVRCallLog.objects.filter(uuid__in=list(by_uuid)).values_list('uuid', flat=True))
+            IVRCallLog.objects.bulk_create(
+                list(by_uuid.values()),
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['uuid'],
+                update_fields=self.update_fields
+            )
+            new_uuids = [uuid for uuid in by_uuid if uuid not in existing]
+            associated = self.associate_leads(new_uuids)
+
+        logger.info(f"Ingested {len(by_uuid)} IVR calls: {len(new_uuids)} new, {associated} linked to leads")
+        return {
+            'created': len(new_uuids),
+            'updated': len(existing),
+            'associated': associated,
+            'new_uuids': new_uuids,
+        }
+
+    def associate_leads(self, uuids: List[str]) -> int:
+        """Link unassociated calls to the lead with the caller's phone and note the call on it
+
+        The rows are locked, so a concurrent ingest of the same calls waits and then
+        finds them already linked instead of adding the note twice.
+        """
+        if not uuids:
+            return 0
+        calls = list(
+            IVRCallLog.objects.select_for_update()
+            .filter(uuid__in=uuids, associated_lead__isnull=True)
+            .order_by('id')
+        )
+        keys = {call.id: phone_numbers.phone_key(call.caller_id_number) for call in calls}
+        leads = {}
+        for lead in Lead.objects.filter(phone_key__in={key for key in keys.values() if key}).order_by('-created_at', '-id'):
+            leads.setdefault(lead.phone_key, lead)  # newest lead first, as matching_phone().first() picks with Lead's default ordering
+
+        linked, notes = [], []
+        for call in calls:
+            lead = leads.get(keys[call.id])
+            if lead is None:
+                continue
+            call.associated_lead = lead
+            linked.append(call)
+            notes.append(LeadNote(
+                lead=lead,
+                call_type='ivr_call',
+                note=f"IVR Call: {call.caller_id_number} to {call.call_to_number}. Duration: {call.call_duration_formatted}",
+                call_duration=call.duration,
+                created_by_id=1  # System user
+            ))
+
+        if linked:
+            IVRCallLog.objects.bulk_update(linked, ['associated_lead'], batch_size=self.batch_size)
+            LeadNote.objects.bulk_create(notes, batch_size=self.batch_size)
+            # bulk_create skips the post_save cache invalidation
+            report_cache.bump()
+        return len(linked)
+
+
+def ingest_calls(calls: Iterable[IVRCallLog], **kwargs) -> Dict:
+    return IVRCallIngestor(**kwargs).ingest(calls)
@@ -2,11 +2,11 @@
 IVR Lead Processing Integration
 Query last 1000 calls, group by project/status, enqueue WhatsApp sends
 """
-import re
 from datetime import datetime, timedelta
 from django.db.models import Q
 from django.utils import timezone
-from .models import IVRCallLog, Lead, Project
+from .models import IVRCallLog, Lead, Project, WhatsAppOptOut
+from . import phone_numbers
 from .whatsapp_integration import WhatsAppIntegrationService
 from .whatsapp_interactive import WhatsAppInteractiveService
 
@@ -21,25 +21,11 @@ class IVRLeadProcessor:
     
     def validate_e164_phone(self, phone):
         """Validate and convert to E.164 format"""
-        clean_phone = re.sub(r'[^\d+]', '', phone)
-        
-        if not clean_phone.startswith('+'):
-            if clean_phone.startswith('91') and len(clean_phone) == 12:
-                clean_phone = '+' + clean_phone
-            elif len(clean_phone) == 10:
-                clean_phone = '+91' + clean_phone
-            else:
-                return None
-        
-        e164_pattern = r'^\+[1-9]\d{6,15}$'
-        if re.match(e164_pattern, clean_phone):
-            return clean_phone
-        return None
+        return phone_numbers.normalize(phone) or None
     
     def check_dnd_list(self, phone):
         """Check if phone is in CRM DND list"""
-        lead = Lead.objects.filter(phone=phone).first()
-        return lead and hasattr(lead, 'whatsapp_opt_out') and getattr(lead, 'whatsapp_opt_out', False)
+        return WhatsAppOptOut.objects.filter(phone_number=phone).exists()
     
     def deduplicate_by_phone(self, calls):
         """Deduplicate calls by phone number, keep latest"""
@@ -127,7 +113,7 @@ class IVRLeadProcessor:
                             lead = call.associated_lead
                             if not lead:
                                 # Try to find lead by phone
-                                lead = Lead.objects.filter(phone__icontains=clean_phone[-10:]).first()
+                                lead = Lead.objects.matching_phone(clean_phone).first()
                             
                             if lead:
                                 success, message_id, response = self.interactive_service.send_interactive_message(
@@ -160,7 +146,7 @@ class IVRLeadProcessor:
         lead = call.associated_lead
         if not lead:
             # Try to find lead by phone
-            lead = Lead.objects.filter(phone__icontains=clean_phone[-10:]).first()
+            lead = Lead.objects.matching_phone(clean_phone).first()
         
         lead_name = lead.name if lead else "Customer"
         
@@ -2,10 +2,10 @@
 IVR Lead Auto-Creation Service
 Automatically creates leads from IVR calls with proper classification
 """
-import re
 from django.db import transaction
 from django.utils import timezone
 from .models import IVRCallLog, Lead, Project, LeadStage, LeadNote
+from . import phone_numbers
 
 class IVRLeadCreator:
     """Service to automatically create leads from IVR calls"""
@@ -33,15 +33,7 @@ class IVRLeadCreator:
     
     def clean_phone_number(self, phone):
         """Clean and format phone number"""
-        clean_phone = re.sub(r'[^\d+]', '', phone)
-        
-        if not clean_phone.startswith('+'):
-            if clean_phone.startswith('91') and len(clean_phone) == 12:
-                clean_phone = '+' + clean_phone
-            elif len(clean_phone) == 10:
-                clean_phone = '+91' + clean_phone
-        
-        return clean_phone
+        return phone_numbers.normalize(phone) or phone_numbers.NON_PHONE_CHARS.sub('', phone)
     
     def get_project_from_ivr_number(self, ivr_number):
         """Get project based on IVR number called"""
@@ -81,7 +73,7 @@ class IVRLeadCreator:
         clean_phone = self.clean_phone_number(call.caller_id_number)
         
         # Check if lead already exists for this phone
-        existing_lead = Lead.objects.filter(phone=clean_phone).first()
+        existing_lead = Lead.objects.matching_phone(clean_phone).first()
         
         if existing_lead:
             # Update existing lead with new call info
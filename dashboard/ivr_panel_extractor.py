@@ -8,6 +8,7 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Lead, IVRCallLog, Project, LeadStage
+from . import ivr_ingest, phone_numbers
 
 class IVRPanelExtractor:
     def __init__(self):
@@ -117,7 +118,7 @@ class IVRPanelExtractor:
             clean_phone = self._clean_phone(phone)
             
             # Check for existing lead
-            existing = Lead.objects.filter(phone=clean_phone).first()
+            existing = Lead.objects.matching_phone(clean_phone).first()
             if existing:
                 results['duplicates_skipped'] += 1
                 continue
@@ -193,12 +194,7 @@ class IVRPanelExtractor:
     
     def _clean_phone(self, phone):
         """Clean and format phone number"""
-        clean = phone.replace('+91', '').replace(' ', '').replace('-', '')
-        if len(clean) == 10:
-            return '+91' + clean
-        elif len(clean) > 10:
-            return '+91' + clean[-10:]
-        return phone
+        return phone_numbers.normalize(phone) or phone
     
     def _create_call_log(self, call_data, lead):
         """Create IVR call log entry"""
@@ -209,8 +205,8 @@ class IVRPanelExtractor:
             elif not timestamp:
                 timestamp = timezone.now()
                 
-            IVRCallLog.objects.create(
-                uuid=call_data.get('uuid', f"panel_{lead.id}"),
+            ivr_ingest.ingest_calls([IVRCallLog(
+                uuid=ivr_ingest.call_uuid(call_data),
                 call_to_number=call_data.get('call_to_number', '+919355421616'),
                 caller_id_number=call_data.get('caller_id_number'),
                 start_stamp=timestamp,
@@ -219,6 +215,6 @@ class IVRPanelExtractor:
                 raw_data=call_data,
                 processed=True,
                 associated_lead=lead
-            )
+            )])
         except Exception as e:
             pass  # Skip if call log creation fails
\ No newline at end of file
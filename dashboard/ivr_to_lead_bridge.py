@@ -40,7 +40,7 @@ class IVRToLeadBridge:
             call_time = call_data['timestamp']
             
             # Check for existing lead
-            existing_lead = Lead.objects.filter(phone=phone).first()
+            existing_lead = Lead.objects.matching_phone(phone).first()
             if existing_lead:
                 results['duplicates_skipped'] += 1
                 continue
@@ -4,15 +4,16 @@ IVR WhatsApp Campaign - Send templates to today's leads
 import hashlib
 import hmac
 import time
-import requests
 from datetime import datetime
 from django.utils import timezone
 from django.conf import settings
 from .models import Lead
+from .tata_http import get_client
 
 class IVRWhatsAppCampaign:
     
     def __init__(self):
+        self.http = get_client()
         self.webhook_url = "https://crm-boprealty.onrender.com/webhook/whatsapp/integration/"
         self.secret_key = getattr(settings, 'SECRET_KEY', 'default-secret')
     
@@ -86,11 +87,10 @@ class IVRWhatsAppCampaign:
                 }
                 
                 # Send to webhook
-                response = requests.post(
+                response = self.http.post(
                     self.webhook_url,
                     json=payload,
-                    headers={'Content-Type': 'application/json'},
-                    timeout=30
+                    headers={'Content-Type': 'application/json'}
                 )
                 
                 if response.status_code == 200:
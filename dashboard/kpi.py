@@ -0,0 +1,100 @@
+"""
+Dashboard KPI snapshot
+Landing-page counters live in the KPISnapshot table. Lead signals adjust them
+incrementally and the reconciler recounts everything periodically, so the
+dashboard reads all of them with one query regardless of table size.
+"""
+import logging
+from collections import Counter
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .lead_stats import ACTIVE_CATEGORIES, LeadStatsService
+from .models import Earning, KPISnapshot, LeadStage, Project
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_KEYS = {category: f'leads_{category}' for category, _ in LeadStage.STAGE_CATEGORIES}
+DECIMAL_KEYS = {'monthly_earnings'}
+
+
+def compute_kpis() -> Dict[str, Decimal]:
+    """Recount every KPI from the source tables (lead counters in one aggregate)"""
+    today = timezone.now().date()
+    stats = LeadStatsService().stats()
+
+    kpis = {key: Decimal(stats[category]) for category, key in CATEGORY_KEYS.items()}
+    kpis['total_leads'] = Decimal(stats['total'])
+    kpis['overdue_followups'] = Decimal(stats['overdue'])
+    kpis['total_projects'] = Decimal(Project.objects.filter(is_active=True).count())
+    kpis['monthly_earnings'] = Earning.objects.filter(
+        date_earned__month=today.month
+    ).aggregate(total=Sum('commission_amount'))['total'] or Decimal(0)
+    return kpis
+
+
+def reconcile() -> Dict[str, Decimal]:
+    """Overwrite the snapshot with a full recount"""
+    kpis = compute_kpis()
+    now = timezone.now()
+    with transaction.atomic():
+        KPISnapshot.objects.bulk_create(
+            [KPISnapshot(key=key, value=value, refreshed_at=now) for key, value in kpis.items()],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['value', 'refreshed_at']
+        )
+    logger.info(f"KPI snapshot reconciled ({len(kpis)} counters)")
+    return kpis
+
+
+def adjust(deltas: Dict[str, int]):
+    """Apply counter deltas in place; rows the reconciler hasn't created yet are skipped"""
+    for key, delta in deltas.items():
+        if delta:
+            KPISnapshot.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def lead_deltas(before: Tuple = None, after: Tuple = None) -> Dict[str, int]:
+    """Counter deltas for a lead going from state `before` to `after`.
+
+    A state is (stage category, follow_up_date); None means the lead doesn't exist.
+    """
+    today = timezone.now().date()
+    deltas = Counter()
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        category, follow_up_date = state
+        if isinstance(follow_up_date, str):
+            follow_up_date = parse_date(follow_up_date)
+        deltas['total_leads'] += sign
+        if category in CATEGORY_KEYS:
+            deltas[CATEGORY_KEYS[category]] += sign
+        if follow_up_date and follow_up_date < today and category in ACTIVE_CATEGORIES:
+            deltas['overdue_followups'] += sign
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def snapshot(max_age_seconds: int = None) -> Dict:
+    """All KPIs in one query; recounted first when missing or older than the reconcile interval"""
+    if max_age_seconds is None:
+        max_age_seconds = getattr(settings, 'KPI_RECONCILE_SECONDS', 900)
+
+    rows = list(KPISnapshot.objects.values_list('key', 'value', 'refreshed_at'))
+    oldest = min((refreshed_at for _, _, refreshed_at in rows), default=None)
+    if not rows or (timezone.now() - oldest).total_seconds() > max_age_seconds:
+        values = reconcile()
+    else:
+        values = {key: value for key, value, _ in rows}
+
+    return {
+        key: (value if key in DECIMAL_KEYS else int(value))
+        for key, value in values.items()
+    }
@@ -0,0 +1,218 @@
+"""
+Lead duplicate detection and merging
+Groups leads by blocking keys (phone_key, lowercased email) with aggregate
+queries, links leads that share any key into clusters and marks everything
+but the earliest lead of each cluster as a duplicate of it. Merging repoints
+all related rows with queryset updates before the duplicates are deleted.
+"""
+import logging
+from typing import Dict, List
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import lead_metrics
+from .models import Lead
+
+logger = logging.getLogger(__name__)
+
+
+class LeadDuplicateDetector:
+    """Find duplicate clusters across all leads without per-lead queries"""
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size  # ids per UPDATE statement
+
+    def duplicate_blocks(self, leads=None):
+        """Leads that share a phone_key or email with at least one other lead"""
+        leads = leads if leads is not None else Lead.objects.all()
+        leads = leads.annotate(email_key=Lower('email'))
+
+        shared_phones = (
+            leads.exclude(phone_key='').order_by()
+            .values('phone_key').annotate(lead_count=Count('id')).filter(lead_count__gt=1)
+            .values('phone_key')
+        )
+        shared_emails = (
+            leads.exclude(email='').order_by()
+            .values('email_key').annotate(lead_count=Count('id')).filter(lead_count__gt=1)
+            .values('email_key')
+        )
+
+        return leads.filter(
+            Q(phone_key__in=shared_phones) | Q(email_key__in=shared_emails)
+        ).order_by().values_list('id', 'email_key', 'phone_key', 'created_at', 'is_duplicate', 'original_lead_id')
+
+    def find_clusters(self, leads=None) -> List[List[tuple]]:
+        """Clusters of lead rows linked by any shared key, earliest lead first"""
+        rows = list(self.duplicate_blocks(leads))
+        parent = {row[0]: row[0] for row in rows}
+
+        def find(lead_id):
+            while parent[lead_id] != lead_id:
+                parent[lead_id] = parent[parent[lead_id]]
+                lead_id = parent[lead_id]
+            return lead_id
+
+        first_by_key = {}
+        for row in rows:
+            lead_id, email_key, phone_key = row[0], row[1], row[2]
+            for key in (('email', email_key), ('phone', phone_key)):
+                if not key[1]:
+                    continue
+                other = first_by_key.setdefault(key, lead_id)
+                parent[find(lead_id)] = find(other)
+
+        clusters = {}
+        for row in rows:
+            clusters.setdefault(find(row[0]), []).append(row)
+
+        return [
+            sorted(members, key=lambda row: (row[3], row[0]))
+            for members in clusters.values() if len(members) > 1
+        ]
+
+    def detect(self, leads=None) -> Dict:
+        """Mark every non-original lead of each cluster as a duplicate of the earliest one"""
+        clusters = self.find_clusters(leads)
+
+        changed = {}  # original id -> duplicate ids that don't point at it yet
+        duplicate_leads = 0
+        for members in clusters:
+            original_id = members[0][0]
+            for lead_id, _, _, _, is_duplicate, original_lead_id in members[1:]:
+                duplicate_leads += 1
+                if is_duplicate and original_lead_id == original_id:
+                    continue
+                changed.setdefault(original_id, []).append(lead_id)
+
+        # One UPDATE per cluster; bulk_update's per-row CASE expressions were far slower at this size
+        with transaction.atomic():
+            for original_id, lead_ids in changed.items():
+                for start in range(0, len(lead_ids), self.batch_size):
+                    Lead.objects.filter(id__in=lead_ids[start:start + self.batch_size]).update(
+                        is_duplicate=True, original_lead_id=original_id
+                    )
+
+        duplicates_found = sum(len(lead_ids) for lead_ids in changed.values())
+        logger.info(f"Duplicate scan: {len(clusters)} clusters, {duplicate_leads} duplicates, {duplicates_found} newly marked")
+        return {
+            'clusters': len(clusters),
+            'duplicate_leads': duplicate_leads,
+            'duplicates_found': duplicates_found,
+        }
+
+
+class LeadMergeService:
+    """Fold duplicate leads into their originals with set-based updates, one transaction per batch"""
+
+    def __init__(self, clusters_per_batch: int = 500):
+        self.clusters_per_batch = clusters_per_batch
+
+    @staticmethod
+    def lead_relations():
+        """Every FK that points at Lead (notes, messages, calls, history, meetings, tasks, ...)"""
+        return [
+            relation for relation in Lead._meta.related_objects
+            if relation.one_to_many or relation.one_to_one
+        ]
+
+    def merge(self, duplicate: Lead) -> Dict:
+        """Merge one marked duplicate into its original lead"""
+        return self.merge_clusters({duplicate.original_lead_id: [duplicate.id]})
+
+    def merge_marked(self) -> Dict:
+        """Merge every lead marked as a duplicate, following original_lead chains to the root"""
+        original_of = dict(
+            Lead.objects.filter(is_duplicate=True, original_lead__isnull=False)
+            .values_list('id', 'original_lead_id')
+        )
+
+        def root(lead_id):
+            seen = set()
+            while lead_id in original_of and lead_id not in seen:
+                seen.add(lead_id)
+                lead_id = original_of[lead_id]
+            return lead_id
+
+        clusters = {}
+        for lead_id in original_of:
+            original_id = root(lead_id)
+            if original_id != lead_id:
+                clusters.setdefault(original_id, []).append(lead_id)
+        return self.merge_clusters(clusters)
+
+    def merge_clusters(self, clusters: Dict[int, List[int]]) -> Dict:
+        """Merge {original_id: [duplicate_id, ...]} clusters; each batch commits or rolls back as a whole"""
+        results = {'clusters': 0, 'merged_leads': 0, 'moved_rows': 0}
+        items = [(original_id, duplicate_ids) for original_id, duplicate_ids in clusters.items() if duplicate_ids]
+
+        for start in range(0, len(items), self.clusters_per_batch):
+            batch = items[start:start + self.clusters_per_batch]
+            with transaction.atomic():
+                for original_id, duplicate_ids in batch:
+                    results['moved_rows'] += self._merge_cluster(original_id, duplicate_ids)
+                    results['clusters'] += 1
+                    results['merged_leads'] += len(duplicate_ids)
+
+        logger.info(f"Lead merge: {results['merged_leads']} leads merged into {results['clusters']} originals")
+        return results
+
+    def _merge_cluster(self, original_id: int, duplicate_ids: List[int]) -> int:
+        duplicate_ids = [lead_id for lead_id in duplicate_ids if lead_id != original_id]
+        original = Lead.objects.select_for_update().get(id=original_id)
+        duplicates = list(Lead.objects.filter(id__in=duplicate_ids).values('name', 'email', 'phone'))
+        moved = 0
+
+        # History and projects move with bulk updates the metrics build can't see
+        lead_metrics.mark_leads_dirty([original_id] + duplicate_ids)
+
+        # Repoint every related row instead of letting the delete cascade over it
+        for relation in self.lead_relations():
+            model = relation.related_model
+            field_name = relation.field.name
+            rows = model._base_manager.filter(**{f'{field_name}__in': duplicate_ids})
+            self._drop_unique_collisions(model, field_name, rows, original_id)
+            moved += rows.update(**{field_name: original_id})
+
+        # Union the interested projects through the M2M table
+        through = Lead.interested_projects.through
+        project_ids = set(
+            through.objects.filter(lead_id__in=duplicate_ids).values_list('project_id', flat=True)
+        )
+        through.objects.bulk_create(
+            [through(lead_id=original_id, project_id=project_id) for project_id in project_ids],
+            ignore_conflicts=True
+        )
+
+        merge_notes = [
+            f"Merged with duplicate lead: {lead['name']} ({lead['email']}, {lead['phone']})"
+            for lead in duplicates
+        ]
+        notes = '\n\n'.join(filter(None, [original.notes] + merge_notes))
+        Lead.objects.filter(id=original_id).update(notes=notes, updated_at=timezone.now())
+        # A cycle in original_lead would leave the original pointing at itself
+        Lead.objects.filter(id=original_id, original_lead_id=original_id).update(original_lead=None, is_duplicate=False)
+
+        Lead.objects.filter(id__in=duplicate_ids).delete()
+        return moved
+
+    @staticmethod
+    def _drop_unique_collisions(model, field_name: str, rows, original_id: int):
+        """Delete duplicate-side rows that would violate a unique_together once repointed (e.g. one registration per event)"""
+        for unique_fields in model._meta.unique_together:
+            if field_name not in unique_fields:
+                continue
+            others = [name for name in unique_fields if name != field_name]
+            taken = set(model._base_manager.filter(**{field_name: original_id}).values_list(*others))
+            colliding = []
+            for pk, *key in rows.values_list('pk', *others):
+                key = tuple(key)
+                if key in taken:
+                    colliding.append(pk)
+                else:
+                    taken.add(key)
+            if colliding:
+                model._base_manager.filter(pk__in=colliding).delete()
@@ -0,0 +1,360 @@
+"""
+Bulk lead import pipeline
+Normalizes uploaded rows with pandas, deduplicates each chunk against the
+database with set-based IN queries and inserts leads with bulk_create.
+"""
+import logging
+import os
+import socket
+from collections import Counter
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import kpi, phone_numbers, report_cache
+from .models import Lead, LeadStage, LeadImportJob, LeadImportError
+from .upload_streaming import iter_upload_chunks
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['name', 'email', 'phone']
+
+
+class LeadImportPipeline:
+    """Import lead rows chunk by chunk with one dedup query and one transaction per chunk"""
+
+    def __init__(self,
+                 default_source: str = 'website',
+                 default_status: str = 'warm',
+                 skip_duplicates: bool = True,
+                 chunk_size: int = 2000,
+                 on_chunk: Optional[Callable] = None):
+        self.default_source = default_source
+        self.default_status = default_status
+        self.skip_duplicates = skip_duplicates
+        self.chunk_size = chunk_size
+        # Called with the pipeline inside each chunk's transaction, e.g. to checkpoint a job
+        self.on_chunk = on_chunk
+
+        self.valid_sources = {choice[0] for choice in Lead.SOURCE_CHOICES}
+        if self.default_source not in self.valid_sources:
+            self.default_source = 'website'
+
+        # First stage (by order) of every category, loaded once per import
+        self.stage_map = {}
+        for stage in LeadStage.objects.order_by('category', 'order'):
+            self.stage_map.setdefault(stage.category, stage)
+
+        # Keys already present in the file so far, so in-file repeats are skipped too
+        self.seen_emails = set()
+        self.seen_phone_keys = set()
+
+        self.counts = {'processed': 0, 'created': 0, 'skipped': 0, 'failed': 0}
+        self.errors = []  # (row_number, message)
+
+    @staticmethod
+    def missing_columns(columns) -> List[str]:
+        return [col for col in REQUIRED_COLUMNS if col not in columns]
+
+    def process_dataframe(self, df: pd.DataFrame, first_row_number: int = 2) -> Dict:
+        """Import a frame; first_row_number is the spreadsheet row of df's first record"""
+        for start in range(0, len(df), self.chunk_size):
+            self.process_chunk(df.iloc[start:start + self.chunk_size], first_row_number + start)
+        return self.counts
+
+    def normalize(self, df: pd.DataFrame, first_row_number: int) -> pd.DataFrame:
+        """Vectorized cleanup of one chunk"""
+        df = df.copy()
+        df['_row'] = range(first_row_number, first_row_number + len(df))
+
+        for column in REQUIRED_COLUMNS:
+            values = df[column]
+            if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+                # Spreadsheet phone columns arrive as floats (9876543210.0)
+                values = values.astype('Int64')
+            df[column] = values.astype('string').fillna('').str.strip()
+
+        df['email'] = df['email'].str.lower()
+        df['phone'] = df['phone'].str.replace(r'\.0$', '', regex=True)
+        df['phone_e164'] = phone_numbers.normalize_many(df['phone'])
+        df['phone_key'] = phone_numbers.phone_key_many(df['phone'])
+
+        if 'source' in df.columns:
+            df['source'] = df['source'].astype('string').fillna('').str.strip()
+            df.loc[~df['source'].isin(self.valid_sources), 'source'] = self.default_source
+        else:
+            df['source'] = self.default_source
+
+        if 'status' in df.columns:
+            df['status'] = df['status'].astype('string').fillna(self.default_status).str.strip().str.lower()
+        else:
+            df['status'] = self.default_status
+
+        for column in ['budget_min', 'budget_max']:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+            else:
+                df[column] = None
+
+        if 'notes' in df.columns:
+            df['notes'] = df['notes'].astype('string').fillna('')
+        else:
+            df['notes'] = ''
+
+        return df
+
+    def existing_keys(self, df: pd.DataFrame):
+        """One IN query for every email/phone key of the chunk"""
+        emails = set(df['email'])
+        keys = set(df['phone_key']) - {''}
+
+        existing_emails, existing_keys = set(), set()
+        for email, key in Lead.objects.filter(
+            Q(email__in=emails) | Q(phone_key__in=keys)
+        ).values_list('email', 'phone_key'):
+            existing_emails.add(email.lower())
+            if key:
+                existing_keys.add(key)
+        return existing_emails, existing_keys
+
+    @staticmethod
+    def empty_rows(df: pd.DataFrame) -> pd.Series:
+        return (df['name'] == '') | (df['email'] == '') | (df['phone'] == '')
+
+    @staticmethod
+    def too_long_rows(df: pd.DataFrame) -> pd.Series:
+        return (df['name'].str.len() > 255) | (df['email'].str.len() > 254) | (df['phone'].str.len() > 20)
+
+    def remember(self, df: pd.DataFrame, first_row_number: int = 2):
+        """Rebuild the in-file duplicate keys from rows a previous run of the same file already processed"""
+        if not self.skip_duplicates or not len(df):
+            return
+        df = self.normalize(df, first_row_number)
+        df = df[~self.empty_rows(df)]
+        df = df[~self.too_long_rows(df)]
+        self.seen_emails.update(df['email'])
+        self.seen_phone_keys.update(set(df['phone_key']) - {''})
+
+    def process_chunk(self, df: pd.DataFrame, first_row_number: int = 2):
+        """Import one chunk in one transaction, together with the on_chunk checkpoint"""
+        with transaction.atomic():
+            self._process_chunk(df, first_row_number)
+            if self.on_chunk:
+                self.on_chunk(self)
+
+    def _process_chunk(self, df: pd.DataFrame, first_row_number: int):
+        df = self.normalize(df, first_row_number)
+        self.counts['processed'] += len(df)
+
+        # Skip empty rows
+        empty = self.empty_rows(df)
+        self.counts['skipped'] += int(empty.sum())
+        df = df[~empty]
+
+        # Values the database would reject are reported per row instead of failing the chunk
+        too_long = self.too_long_rows(df)
+        for row_number in df.loc[too_long, '_row']:
+            self.record_error(row_number, 'Name, email or phone is too long')
+        df = df[~too_long]
+
+        if self.skip_duplicates and len(df):
+            existing_emails, existing_keys = self.existing_keys(df)
+            existing_emails |= self.seen_emails
+            existing_keys |= self.seen_phone_keys
+
+            duplicate = df['email'].isin(existing_emails) | df['phone_key'].isin(existing_keys)
+            # Later rows repeating an earlier row of the same chunk are duplicates as well
+            duplicate |= df['email'].duplicated() | df['phone'].duplicated()
+            duplicate |= (df['phone_key'] != '') & df['phone_key'].duplicated()
+
+            self.counts['skipped'] += int(duplicate.sum())
+            df = df[~duplicate]
+
+        leads = [self.build_lead(row) for row in df.itertuples(index=False)]
+        self.seen_emails.update(df['email'])
+        self.seen_phone_keys.update(set(df['phone_key']) - {''})
+
+        if leads:
+            self.save_leads(leads, list(df['_row']))
+
+    def build_lead(self, row) -> Lead:
+        budget_min = row.budget_min if pd.notna(row.budget_min) else None
+        budget_max = row.budget_max if pd.notna(row.budget_max) else None
+        stage = self.stage_map.get(row.status)
+        return Lead(
+            name=row.name,
+            email=row.email,
+            phone=row.phone,
+            phone_e164=row.phone_e164,
+            phone_key=row.phone_key,
+            source=row.source,
+            budget_min=budget_min,
+            budget_max=budget_max,
+            notes=row.notes,
+            current_stage=stage,
+            # bulk_create skips Lead.save(), which maintains this
+            stage_category=stage.category if stage else ''
+        )
+
+    def save_leads(self, leads: List[Lead], row_numbers: List[int]):
+        """Insert a chunk in one transaction; fall back to row-by-row to isolate bad rows"""
+        try:
+            with transaction.atomic():
+                Lead.objects.bulk_create(leads, batch_size=500)
+                # bulk_create skips the post_save KPI handler
+                categories = Counter(lead.stage_category or None for lead in leads)
+                kpi_deltas = Counter()
+                for category, created in categories.items():
+                    for key, delta in kpi.lead_deltas(after=(category, None)).items():
+                        kpi_deltas[key] += delta * created
+                kpi.adjust(kpi_deltas)
+                report_cache.bump()
+            self.counts['created'] += len(leads)
+        except Exception as e:
+            logger.warning(f"Bulk insert failed, retrying chunk row by row: {str(e)}")
+            for lead, row_number in zip(leads, row_numbers):
+                try:
+                    lead.pk = None
+                    lead._state.adding = True
+                    with transaction.atomic():
+                        lead.save()
+                    self.counts['created'] += 1
+                except Exception as row_error:
+                    self.record_error(row_number, str(row_error))
+
+    def record_error(self, row_number: int, message: str):
+        self.counts['failed'] += 1
+        self.errors.append((int(row_number), message))
+
+
+class LeadImportJobRunner:
+    """Process queued LeadImportJob uploads chunk by chunk, checkpointing after every chunk"""
+
+    def __init__(self, lease_seconds: int = 300, chunk_size: int = 2000, worker_id: str = None):
+        self.lease_seconds = lease_seconds
+        self.chunk_size = chunk_size
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def enqueue(uploaded_file,
+                default_source: str = 'website',
+                default_status: str = 'warm',
+                skip_duplicates: bool = True,
+                user=None) -> LeadImportJob:
+        """Persist the upload (streamed to storage in chunks) and queue it for the worker"""
+        job = LeadImportJob(
+            original_name=uploaded_file.name,
+            default_source=default_source,
+            default_status=default_status,
+            skip_duplicates=skip_duplicates,
+            created_by=user
+        )
+        job.file.save(uploaded_file.name, uploaded_file, save=False)
+        job.save()
+        logger.info(f"Queued lead import job {job.id} ({uploaded_file.name})")
+        return job
+
+    def claim_job(self, job_id: int = None) -> Optional[LeadImportJob]:
+        """Atomically lease the oldest runnable import (or a specific one) for this worker"""
+        now = timezone.now()
+        lease_free = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now) | Q(lease_owner=self.worker_id)
+        candidates = LeadImportJob.objects.filter(status__in=['queued', 'running']).filter(lease_free)
+        if job_id:
+            candidates = candidates.filter(id=job_id)
+
+        for job in candidates.order_by('created_at')[:10]:
+            claimed = LeadImportJob.objects.filter(id=job.id).filter(lease_free).update(
+                lease_owner=self.worker_id, lease_expires_at=now + timedelta(seconds=self.lease_seconds)
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+        return None
+
+    def process_job(self, job: LeadImportJob) -> LeadImportJob:
+        """Import a claimed job, resuming after the last checkpointed row
+
+        The checkpoint is written in the transaction of every pipeline chunk, so a
+        crashed run resumes exactly after the rows it committed.
+        """
+        base = {
+            'processed': job.rows_processed,
+            'created': job.created_count,
+            'skipped': job.skipped_count,
+            'failed': job.failed_count,
+        }
+        resume_after = job.rows_processed
+        reported_errors = 0
+
+        def checkpoint(pipeline):
+            nonlocal reported_errors
+            LeadImportError.objects.bulk_create([
+                LeadImportError(job=job, row_number=row_number, message=message[:1000])
+                for row_number, message in pipeline.errors[reported_errors:]
+            ])
+            reported_errors = len(pipeline.errors)
+            self.checkpoint(job, base, pipeline.counts)
+
+        pipeline = LeadImportPipeline(
+            default_source=job.default_source,
+            default_status=job.default_status,
+            skip_duplicates=job.skip_duplicates,
+            chunk_size=self.chunk_size,
+            on_chunk=checkpoint
+        )
+
+        if job.status == 'queued':
+            job.status = 'running'
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'started_at', 'updated_at'])
+
+        try:
+            with job.file.open('rb') as upload:
+                seen_rows = 0
+                for first_row_number, chunk in iter_upload_chunks(upload):
+                    if seen_rows == 0:
+                        missing_columns = LeadImportPipeline.missing_columns(chunk.columns)
+                        if missing_columns:
+                            raise ValueError(f'Missing required columns: {", ".join(missing_columns)}')
+
+                    chunk_rows = len(chunk)
+                    seen_rows += chunk_rows
+                    # Rows checkpointed by a previous run are already imported; only their keys are needed
+                    if seen_rows <= resume_after:
+                        pipeline.remember(chunk, first_row_number)
+                        continue
+                    if seen_rows - chunk_rows < resume_after:
+                        skip = resume_after - (seen_rows - chunk_rows)
+                        pipeline.remember(chunk.iloc[:skip], first_row_number)
+                        chunk = chunk.iloc[skip:]
+                        first_row_number += skip
+
+                    pipeline.process_dataframe(chunk, first_row_number)
+
+            job.status = 'completed'
+            # The upload lives in shared (database) storage; an imported file is no longer needed
+            job.file.delete(save=False)
+        except Exception as e:
+            logger.error(f"Lead import job {job.id} failed: {str(e)}")
+            job.status = 'failed'
+            job.last_error = str(e)
+
+        job.completed_at = timezone.now()
+        job.lease_owner = ''
+        job.lease_expires_at = None
+        job.save(update_fields=['status', 'last_error', 'completed_at', 'lease_owner', 'lease_expires_at', 'file', 'updated_at'])
+        return job
+
+    def checkpoint(self, job: LeadImportJob, base: Dict, counts: Dict):
+        job.rows_processed = base['processed'] + counts['processed']
+        job.created_count = base['created'] + counts['created']
+        job.skipped_count = base['skipped'] + counts['skipped']
+        job.failed_count = base['failed'] + counts['failed']
+        job.lease_expires_at = timezone.now() + timedelta(seconds=self.lease_seconds)
+        job.save(update_fields=[
+            'rows_processed', 'created_count', 'skipped_count', 'failed_count', 'lease_expires_at', 'updated_at'
+        ])
@@ -0,0 +1,172 @@
+"""
+Lead metrics rollup
+Daily lead counts per source, project, assignee and stage in LeadDailyMetric,
+so report trends and breakdowns read O(days) rows instead of every lead. Days
+with new leads, edited leads or stage history since the last build, plus days
+queued in LeadMetricDirtyDay by deletes and project-interest edits, are
+recomputed from Lead and LeadStageHistory.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import report_cache
+from .models import Lead, LeadDailyMetric, LeadMetricDirtyDay, LeadStage, LeadStageHistory
+
+logger = logging.getLogger(__name__)
+
+# Rows committed just after a build started still fall inside the next build's window
+BUILD_OVERLAP = timedelta(minutes=2)
+BUILD_LOCK_ID = 7301501
+
+
+class LeadMetricsRollup:
+    """Incremental builder for the LeadDailyMetric table"""
+
+    def __init__(self, days_per_batch: int = 31):
+        self.days_per_batch = days_per_batch
+
+    @staticmethod
+    def watermark():
+        return LeadDailyMetric.objects.aggregate(built=Max('built_at'))['built']
+
+    @staticmethod
+    def _days(queryset, field: str) -> set:
+        return set(
+            queryset.annotate(day=TruncDate(field)).order_by().values_list('day', flat=True).distinct()
+        )
+
+    def dirty_dates(self, since) -> set:
+        """Days whose rollup rows may have changed since `since`"""
+        history = LeadStageHistory.objects.filter(changed_at__gte=since)
+        return (
+            self._days(Lead.objects.filter(Q(created_at__gte=since) | Q(updated_at__gte=since)), 'created_at')
+            | self._days(history, 'changed_at')
+            # A stage move also changes the cell the lead's creation day counts it in
+            | self._days(history, 'lead__created_at')
+        )
+
+    def all_dates(self) -> set:
+        return self._days(Lead.objects.all(), 'created_at') | self._days(LeadStageHistory.objects.all(), 'changed_at')
+
+    def refresh(self, full: bool = False) -> int:
+        """Rebuild changed days (every day when full or never built); returns the number of days rebuilt
+
+        Days queued by mark_dirty are rebuilt too and their queue rows removed; a day
+        queued while the build runs keeps its new row for the next one.
+        """
+        started = timezone.now()
+        queued = list(LeadMetricDirtyDay.objects.values_list('id', 'date'))
+        watermark = None if full else self.watermark()
+        dates = self.all_dates() if watermark is None else self.dirty_dates(watermark - BUILD_OVERLAP)
+        dates = sorted(dates | {day for _, day in queued})
+
+        if full:
+            with transaction.atomic():
+                self._lock()
+                LeadDailyMetric.objects.exclude(date__in=dates).delete()
+
+        for start in range(0, len(dates), self.days_per_batch):
+            self.build_days(dates[start:start + self.days_per_batch], started)
+
+        LeadMetricDirtyDay.objects.filter(id__in=[queue_id for queue_id, _ in queued]).delete()
+        if dates:
+            report_cache.bump()
+            logger.info(f"Lead metrics rollup: rebuilt {len(dates)} days")
+        return len(dates)
+
+    def build_days(self, dates: List, built_at):
+        """Replace the rollup rows of these days with a recount"""
+        categories = dict(LeadStage.objects.values_list('id', 'category'))
+        cells = {}
+
+        def add(day, source, project_id, assigned_to_id, stage_id, **counts):
+            cell = cells.setdefault(
+                (day, source, project_id, assigned_to_id, stage_id),
+                {'created': 0, 'converted': 0, 'touched': 0}
+            )
+            for name, count in counts.items():
+                cell[name] += count
+
+        leads = Lead.objects.filter(_day_ranges('created_at', dates)).annotate(day=TruncDate('created_at')).order_by()
+        dimensions = ['day', 'source', 'assigned_to_id', 'current_stage_id']
+        for row in leads.values(*dimensions).annotate(count=Count('id')):
+            add(row['day'], row['source'], None, row['assigned_to_id'], row['current_stage_id'], created=row['count'])
+        for row in leads.filter(interested_projects__isnull=False).values(*dimensions, 'interested_projects').annotate(count=Count('id')):
+            add(row['day'], row['source'], row['interested_projects'], row['assigned_to_id'], row['current_stage_id'], created=row['count'])
+
+        history = LeadStageHistory.objects.filter(_day_ranges('changed_at', dates)).annotate(day=TruncDate('changed_at')).order_by()
+        dimensions = ['day', 'lead__source', 'lead__assigned_to_id', 'to_stage_id']
+        moves = {'touched': Count('id'), 'converted': Count('id', filter=Q(to_stage__category='closed'))}
+        for row in history.values(*dimensions).annotate(**moves):
+            add(row['day'], row['lead__source'], None, row['lead__assigned_to_id'], row['to_stage_id'],
+                touched=row['touched'], converted=row['converted'])
+        for row in history.filter(lead__interested_projects__isnull=False).values(*dimensions, 'lead__interested_projects').annotate(**moves):
+            add(row['day'], row['lead__source'], row['lead__interested_projects'], row['lead__assigned_to_id'], row['to_stage_id'],
+                touched=row['touched'], converted=row['converted'])
+
+        metrics = [
+            LeadDailyMetric(
+                date=day, source=source, project_id=project_id, assigned_to_id=assigned_to_id,
+                stage_id=stage_id, stage_category=categories.get(stage_id, ''),
+                built_at=built_at, **counts
+            )
+            for (day, source, project_id, assigned_to_id, stage_id), counts in cells.items()
+        ]
+        with transaction.atomic():
+            self._lock()
+            LeadDailyMetric.objects.filter(date__in=dates).delete()
+            LeadDailyMetric.objects.bulk_create(metrics, batch_size=1000)
+
+    @staticmethod
+    def _lock():
+        """Serialize concurrent builds so two of them can't both insert a day's rows"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [BUILD_LOCK_ID])
+
+
+def _day_ranges(field: str, dates: Iterable) -> Q:
+    """Index-friendly half-open datetime ranges covering each day"""
+    condition = Q(pk__in=[])
+    for day in dates:
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        condition |= Q(**{f'{field}__gte': start, f'{field}__lt': start + timedelta(days=1)})
+    return condition
+
+
+def mark_dirty(days: Iterable):
+    """Queue days (dates or datetimes) for the next build"""
+    days = {timezone.localdate(day) if isinstance(day, datetime) else day for day in days if day}
+    LeadMetricDirtyDay.objects.bulk_create([LeadMetricDirtyDay(date=day) for day in days])
+
+
+def mark_leads_dirty(lead_ids: Iterable[int]):
+    """Queue the creation and stage-history days of these leads, e.g. before their projects or owner change"""
+    lead_ids = list(lead_ids)
+    if lead_ids:
+        mark_dirty(
+            LeadMetricsRollup._days(Lead.objects.filter(id__in=lead_ids), 'created_at')
+            | LeadMetricsRollup._days(LeadStageHistory.objects.filter(lead_id__in=lead_ids), 'changed_at')
+        )
+
+
+def lead_metrics(date_from=None, date_to=None, by_project: bool = False, refresh: bool = False, **filters):
+    """Rollup rows for reports, as of the last build_lead_metrics run
+
+    The all-projects rows by default; by_project=True returns the per-project rows instead.
+    refresh=True brings the rollup up to date first, which is a build and not meant for page views.
+    """
+    if refresh:
+        LeadMetricsRollup().refresh()
+    rows = LeadDailyMetric.objects.filter(project__isnull=not by_project, **filters)
+    if date_from:
+        rows = rows.filter(date__gte=date_from)
+    if date_to:
+        rows = rows.filter(date__lte=date_to)
+    return rows.order_by()
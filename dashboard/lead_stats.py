@@ -0,0 +1,66 @@
+"""
+Lead funnel statistics
+Every stage-category and follow-up bucket in one conditional aggregate,
+optionally scoped by assignee, project or creation date range.
+"""
+from datetime import timedelta
+from typing import Dict
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Lead, LeadStage
+
+ACTIVE_CATEGORIES = LeadStage.ACTIVE_CATEGORIES
+
+
+class LeadStatsService:
+    """Funnel and follow-up counts for a (filtered) set of leads in a single round trip"""
+
+    def __init__(self, leads=None, assigned_to=None, project=None, date_from=None, date_to=None):
+        leads = leads if leads is not None else Lead.objects.all()
+        if assigned_to:
+            leads = leads.filter(assigned_to=assigned_to)
+        if project:
+            leads = leads.filter(interested_projects=project)
+        if date_from:
+            leads = leads.filter(created_at__date__gte=date_from)
+        if date_to:
+            leads = leads.filter(created_at__date__lte=date_to)
+
+        self.leads = leads
+        # The M2M join repeats leads with several projects
+        self.distinct = bool(project)
+
+    def buckets(self) -> Dict[str, Q]:
+        today = timezone.now().date()
+        active = Q(stage_category__in=ACTIVE_CATEGORIES)
+
+        buckets = {
+            category: Q(stage_category=category)
+            for category, _ in LeadStage.STAGE_CATEGORIES
+        }
+        buckets.update({
+            'active': active,
+            'overdue': active & Q(follow_up_date__lt=today),
+            'due_today': active & Q(follow_up_date=today),
+            'upcoming': active & Q(follow_up_date__gt=today, follow_up_date__lte=today + timedelta(days=7)),
+            'callback': active & Q(requires_callback=True),
+            'duplicates': Q(is_duplicate=True),
+            'this_week': Q(created_at__date__gte=today - timedelta(days=7)),
+        })
+        return buckets
+
+    def stats(self, **extra: Q) -> Dict[str, int]:
+        """{'total', <category>..., 'active', 'overdue', 'due_today', 'upcoming', 'callback', 'duplicates', 'this_week'}
+
+        Keyword arguments add caller-specific buckets to the same query, e.g. hot_duplicates=Q(...).
+        """
+        buckets = {**self.buckets(), **extra}
+        return self.leads.order_by().aggregate(
+            total=Count('id', distinct=self.distinct),
+            **{
+                name: Count('id', filter=condition, distinct=self.distinct)
+                for name, condition in buckets.items()
+            }
+        )
@@ -0,0 +1,42 @@
+"""
+Django Management Command: Build the daily lead metrics rollup
+Usage: python manage.py build_lead_metrics [--full] [--interval 300]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.lead_metrics import LeadMetricsRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild LeadDailyMetric rows for days with new, edited or deleted leads or stage history (every day with --full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recount every day, e.g. after a bulk change made outside the ORM'
+        )
+        parser.add_argument(
+            '--days-per-batch',
+            type=int,
+            default=31,
+            help='Days recounted per transaction (default: 31)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Keep running and build incrementally every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        rollup = LeadMetricsRollup(days_per_batch=options['days_per_batch'])
+        full = options['full']
+        while True:
+            days = rollup.refresh(full=full)
+            self.stdout.write(self.style.SUCCESS(f'Lead metrics rollup: {days} days rebuilt'))
+            if not options['interval']:
+                break
+            full = False
+            time.sleep(options['interval'])
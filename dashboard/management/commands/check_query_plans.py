@@ -0,0 +1,116 @@
+"""
+Django Management Command: Check that the CRM's hot queries use their indexes
+Usage: python manage.py check_query_plans [--verbose-plans]
+
+Runs EXPLAIN for the lead, notification, IVR, WhatsApp and attendance queries
+the views issue most and fails if any of them reads its table with a full scan.
+Works on SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN, with sequential
+scans disabled so small tables don't hide a missing index).
+"""
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from dashboard.models import (
+    Attendance, IVRCallLog, Lead, LeadDailyMetric, LeadStage, LeadStageHistory, Notification, WhatsAppMessage
+)
+
+
+def hot_queries():
+    """(label, queryset) pairs mirroring the filters in views, KPIs and workers
+
+    Unsliced entries are counts or lookups, which run without the default ordering.
+    """
+    today = timezone.now().date()
+    since = timezone.now() - timedelta(days=30)
+    active = LeadStage.ACTIVE_CATEGORIES
+    return [
+        ('leads by stage, newest first', Lead.objects.filter(stage_category__in=active).order_by('-created_at')[:25]),
+        ('closed leads', Lead.objects.filter(stage_category='closed').order_by('-updated_at')[:25]),
+        ('follow-up list', Lead.objects.filter(stage_category__in=active, follow_up_date__gte=today).order_by('follow_up_date')[:25]),
+        ('overdue follow-ups', Lead.objects.filter(stage_category__in=active, follow_up_date__lt=today).order_by()),
+        ('callbacks', Lead.objects.filter(stage_category__in=active, requires_callback=True).order_by()),
+        ('assignee leads', Lead.objects.filter(assigned_to_id=1).order_by('-created_at')[:25]),
+        ('team leads this month', Lead.objects.filter(assigned_to_id__in=[1, 2], created_at__gte=since).order_by()),
+        ('source leads in period', Lead.objects.filter(source='website', created_at__gte=since).order_by()),
+        ('leads created since', Lead.objects.filter(created_at__gte=since).order_by()),
+        ('leads updated since', Lead.objects.filter(updated_at__gte=since).order_by()),
+        ('phone match', Lead.objects.matching_phone('9876543210').order_by()),
+        ('email recapture', Lead.objects.filter(email='buyer@example.com').order_by()),
+        ('email duplicates', Lead.objects.annotate(email_key=Lower('email')).filter(email_key='buyer@example.com').order_by()),
+        ('stage history since', LeadStageHistory.objects.filter(changed_at__gte=since).order_by()),
+        ('rollup range', LeadDailyMetric.objects.filter(date__gte=today - timedelta(days=30)).order_by()),
+        ('unread notifications', Notification.objects.filter(recipient_id=1, is_read=False).order_by()),
+        ('notification list', Notification.objects.filter(recipient_id=1).order_by('-created_at')[:20]),
+        ('recent IVR calls', IVRCallLog.objects.order_by('-start_stamp')[:20]),
+        ('unprocessed IVR calls', IVRCallLog.objects.filter(processed=False).order_by('-start_stamp')[:100]),
+        ('WhatsApp status webhook', WhatsAppMessage.objects.filter(message_id='wamid.check').order_by()),
+        ('recent WhatsApp messages', WhatsAppMessage.objects.filter(created_at__gte=since).order_by()),
+        ('failed WhatsApp messages', WhatsAppMessage.objects.filter(status='failed').order_by('-created_at')[:20]),
+        ('attendance today', Attendance.objects.filter(date=today, status='present').order_by()),
+    ]
+
+
+def full_scans(queryset, plan: str) -> list:
+    """Plan lines that read the queryset's whole table (or a whole index of it)
+
+    On SQLite a SCAN through an index only counts as index use when the index
+    is partial, or when it supplies the ORDER BY of a sliced query so the scan
+    stops after the first rows.
+    """
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        return [line.strip() for line in plan.splitlines() if re.search(rf'Seq Scan on {table}\b', line)]
+
+    partial = {index.name for index in queryset.model._meta.indexes if index.condition is not None}
+    ordered_limit = queryset.query.high_mark is not None and 'TEMP B-TREE FOR ORDER BY' not in plan
+    scans = []
+    for line in plan.splitlines():
+        match = re.search(rf'SCAN {table}\b(?: USING (?:COVERING )?INDEX (\w+))?', line)
+        if not match:
+            continue
+        index = match.group(1)
+        if index and (index in partial or ordered_limit):
+            continue
+        scans.append(line.strip())
+    return scans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot CRM queries and fail if any of them scans its whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print every plan, not just the failing ones'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plan checks support SQLite and PostgreSQL, not {connection.vendor}')
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for label, queryset in hot_queries():
+                plan = queryset.explain()
+                scans = full_scans(queryset, plan)
+                if scans:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}'))
+                else:
+                    self.stdout.write(f'index      {label}')
+                if scans or options['verbose_plans']:
+                    self.stdout.write(f'    {plan}'.replace('\n', '\n    '))
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries scan their whole table: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
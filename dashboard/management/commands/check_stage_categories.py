@@ -0,0 +1,46 @@
+"""
+Django Management Command: Check Lead.stage_category against the current stage
+Usage: python manage.py check_stage_categories [--fix]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
+
+from dashboard.models import Lead, LeadStage
+
+
+class Command(BaseCommand):
+    help = "Find leads whose denormalized stage_category doesn't match their current stage's category"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite stage_category on the mismatched leads'
+        )
+
+    def handle(self, *args, **options):
+        mismatched = Lead.objects.exclude(
+            stage_category=Coalesce(F('current_stage__category'), Value(''))
+        ).order_by()
+        counts = list(
+            mismatched.values('current_stage_id', 'current_stage__category', 'stage_category').annotate(count=Count('id'))
+        )
+        if not counts:
+            self.stdout.write(self.style.SUCCESS('All leads carry their stage category'))
+            return
+
+        total = sum(row['count'] for row in counts)
+        for row in counts:
+            self.stdout.write(
+                f"  stage {row['current_stage_id']}: {row['count']} leads marked "
+                f"'{row['stage_category']}' instead of '{row['current_stage__category'] or ''}'"
+            )
+
+        if not options['fix']:
+            raise CommandError(f'{total} leads have a stale stage_category; rerun with --fix to repair them')
+
+        fixed = Lead.objects.filter(current_stage__isnull=True).exclude(stage_category='').update(stage_category='')
+        for stage_id, category in LeadStage.objects.values_list('id', 'category'):
+            fixed += Lead.objects.filter(current_stage_id=stage_id).exclude(stage_category=category).update(stage_category=category)
+        self.stdout.write(self.style.SUCCESS(f'Fixed stage_category on {fixed} leads'))
@@ -0,0 +1,38 @@
+"""
+Django Management Command: Mark duplicate leads
+Usage: python manage.py detect_duplicate_leads [--merge]
+"""
+from django.core.management.base import BaseCommand
+
+from dashboard.lead_dedup import LeadDuplicateDetector, LeadMergeService
+
+
+class Command(BaseCommand):
+    help = 'Cluster leads sharing a phone or email and mark all but the earliest as duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Lead ids per UPDATE statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--merge',
+            action='store_true',
+            help='Merge every marked duplicate into its original after the scan'
+        )
+
+    def handle(self, *args, **options):
+        results = LeadDuplicateDetector(batch_size=options['batch_size']).detect()
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['clusters']} duplicate clusters, {results['duplicate_leads']} duplicate leads "
+            f"({results['duplicates_found']} newly marked)"
+        ))
+
+        if options['merge']:
+            merged = LeadMergeService().merge_marked()
+            self.stdout.write(self.style.SUCCESS(
+                f"Merged {merged['merged_leads']} leads into {merged['clusters']} originals "
+                f"({merged['moved_rows']} related rows moved)"
+            ))
@@ -0,0 +1,68 @@
+"""
+Django Management Command: Backfill normalized phone keys on leads
+Usage: python manage.py normalize_phone_numbers [--rewrite-phone] [--dry-run]
+Replaces fix_phone_numbers.
+"""
+from django.core.management.base import BaseCommand
+
+from dashboard.models import Lead
+from dashboard.phone_numbers import normalize, phone_key
+
+
+class Command(BaseCommand):
+    help = 'Recompute phone_e164/phone_key for every lead (optionally rewriting phone to E.164)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Leads read and updated per batch (default: 2000)'
+        )
+        parser.add_argument(
+            '--rewrite-phone',
+            action='store_true',
+            help='Also replace the stored phone with its E.164 form when it has one'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many leads would change without writing'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = ['phone_e164', 'phone_key']
+        if options['rewrite_phone']:
+            fields.append('phone')
+
+        scanned = 0
+        changed = 0
+        batch = []
+
+        leads = Lead.objects.only('id', 'phone', 'phone_e164', 'phone_key').order_by('id')
+        for lead in leads.iterator(chunk_size=batch_size):
+            scanned += 1
+            phone_e164 = normalize(lead.phone)
+            new_phone = phone_e164 if options['rewrite_phone'] and phone_e164 else lead.phone
+            new_key = phone_key(lead.phone)
+
+            if (lead.phone_e164, lead.phone_key, lead.phone) == (phone_e164, new_key, new_phone):
+                continue
+
+            lead.phone_e164, lead.phone_key, lead.phone = phone_e164, new_key, new_phone
+            batch.append(lead)
+            changed += 1
+
+            if len(batch) >= batch_size:
+                self.flush(batch, fields, options['dry_run'])
+                batch = []
+
+        self.flush(batch, fields, options['dry_run'])
+
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {changed} of {scanned} leads'))
+
+    def flush(self, batch, fields, dry_run):
+        if batch and not dry_run:
+            Lead.objects.bulk_update(batch, fields)
@@ -0,0 +1,67 @@
+"""
+Django Management Command: Process queued bulk lead imports
+Usage: python manage.py process_lead_imports --once
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.lead_import import LeadImportJobRunner
+from dashboard.models import LeadImportJob
+
+
+class Command(BaseCommand):
+    help = 'Import queued lead upload files in checkpointed chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=300,
+            help='Job lease duration before another worker may take over (default: 300)'
+        )
+        parser.add_argument(
+            '--job-id',
+            type=int,
+            help='Process only this job'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no runnable job is left instead of polling'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=5,
+            help='Seconds to wait between polls when idle (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        runner = LeadImportJobRunner(lease_seconds=options['lease_seconds'])
+
+        if options['job_id'] and not LeadImportJob.objects.filter(id=options['job_id']).exists():
+            raise CommandError(f"Lead import job {options['job_id']} does not exist")
+
+        self.stdout.write(self.style.SUCCESS(f'Lead import worker {runner.worker_id} started'))
+
+        while True:
+            job = runner.claim_job(job_id=options['job_id'])
+
+            if job is None:
+                if options['once'] or options['job_id']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Processing lead import job {job.id} ({job.original_name})')
+            job = runner.process_job(job)
+            self.stdout.write(
+                f'Job {job.id} {job.status}: {job.created_count} created, {job.skipped_count} skipped, '
+                f'{job.failed_count} failed of {job.rows_processed} rows'
+            )
+
+            if options['job_id']:
+                break
+
+        self.stdout.write(self.style.SUCCESS('No runnable lead import jobs left'))
@@ -0,0 +1,75 @@
+"""
+Django Management Command: Drain the webhook inbox
+Usage: python manage.py process_webhook_inbox --batch-size 200
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.webhook_inbox import WebhookInboxWorker
+
+
+class Command(BaseCommand):
+    help = 'Process stored TATA WhatsApp and IVR webhooks in leased batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Events claimed per batch (default: 200)'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=120,
+            help='Seconds before events claimed by a dead worker are retried (default: 120)'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            help='Attempts before an event is marked failed (default: WEBHOOK_INBOX_MAX_ATTEMPTS)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the inbox is empty instead of polling'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2,
+            help='Seconds to wait between polls when idle (default: 2)'
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            help='Delete processed events older than this many days before starting'
+        )
+
+    def handle(self, *args, **options):
+        worker = WebhookInboxWorker(
+            batch_size=options['batch_size'],
+            lease_seconds=options['lease_seconds'],
+            max_attempts=options['max_attempts']
+        )
+
+        if options['purge_days'] is not None:
+            purged = worker.purge(options['purge_days'])
+            self.stdout.write(f'Purged {purged} processed webhook events')
+
+        self.stdout.write(self.style.SUCCESS(f'Webhook inbox worker {worker.worker_id} started'))
+
+        while True:
+            events = worker.claim_batch()
+
+            if not events:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            result = worker.process_batch(events)
+            self.stdout.write(f"Processed {len(events)} webhook events: {result['done']} done, {result['failed']} failed")
+
+        self.stdout.write(self.style.SUCCESS('Webhook inbox is empty'))
@@ -0,0 +1,88 @@
+"""
+Django Management Command: Drain queued WhatsApp campaign jobs
+Usage: python manage.py process_whatsapp_campaigns --batch-size 200
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import WhatsAppCampaignJob
+from dashboard.tata_http import get_client
+from dashboard.whatsapp_campaign_queue import WhatsAppCampaignQueue
+
+
+class Command(BaseCommand):
+    help = 'Process queued WhatsApp campaign jobs in leased, checkpointed batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Recipients leased per batch (default: 100)'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=300,
+            help='Job lease duration before another worker may take over (default: 300)'
+        )
+        parser.add_argument(
+            '--job-id',
+            type=int,
+            help='Process only this job'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no runnable job is left instead of polling'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=10,
+            help='Seconds to wait between polls when idle (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        queue = WhatsAppCampaignQueue(
+            batch_size=options['batch_size'],
+            lease_seconds=options['lease_seconds']
+        )
+
+        if options['job_id'] and not WhatsAppCampaignJob.objects.filter(id=options['job_id']).exists():
+            raise CommandError(f"Campaign job {options['job_id']} does not exist")
+
+        self.stdout.write(self.style.SUCCESS(f'WhatsApp campaign worker {queue.worker_id} started'))
+
+        while True:
+            job = queue.claim_job(job_id=options['job_id'])
+
+            if job is None:
+                if options['once'] or options['job_id']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Processing campaign job {job.id} ({job.template_name})')
+            try:
+                job = queue.process_job(job)
+            except Exception as e:
+                # Recorded on the job by the queue; it is retried later or failed after max attempts
+                self.stdout.write(self.style.ERROR(f'Campaign job {job.id} errored: {str(e)}'))
+                continue
+            self.stdout.write(
+                f'Job {job.id} {job.status}: {job.sent_count} sent, {job.failed_count} failed, '
+                f'{job.skipped_count} skipped of {job.total_recipients}'
+            )
+            if options['verbosity'] >= 2:
+                for endpoint, stats in get_client().stats().items():
+                    self.stdout.write(
+                        f"  {endpoint}: {stats['count']} calls, avg {stats['avg_ms']}ms, "
+                        f"max {stats['max_ms']}ms, {stats['errors']} errors, {stats['retries']} retries"
+                    )
+
+            if options['job_id'] and job.status in ['completed', 'failed', 'cancelled']:
+                break
+
+        self.stdout.write(self.style.SUCCESS('No runnable campaign jobs left'))
@@ -0,0 +1,30 @@
+"""
+Django Management Command: Recount the dashboard KPI snapshot
+Usage: python manage.py reconcile_kpis [--interval 900]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard import kpi
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the KPI snapshot counters from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Keep running and reconcile every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            kpis = kpi.reconcile()
+            self.stdout.write(self.style.SUCCESS(
+                f"KPI snapshot reconciled: {kpis['total_leads']} leads, {kpis['overdue_followups']} overdue follow-ups"
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -8,98 +8,48 @@ from datetime import timedelta
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realty_dashboard.settings')
 django.setup()
 
-from dashboard.tata_calls_api import TATACallsAPI
-from dashboard.models import IVRCallLog, Lead
+from dashboard.cdr_sync import CDRSync
+from dashboard.tata_http import get_client
 
 class Command(BaseCommand):
-    help = 'Sync call data from TATA API'
+    help = 'Sync call data from TATA API (incrementally from the last synced call by default)'
     
     def add_arguments(self, parser):
-        parser.add_argument('--days', type=int, default=7, help='Number of days to sync (default: 7)')
+        parser.add_argument('--days', type=int, help='Re-sync this many days instead of resuming from the watermark')
         parser.add_argument('--full-sync', action='store_true', help='Perform full sync (30 days)')
+        parser.add_argument('--workers', type=int, help='Pages fetched concurrently (default: TATA_CDR_SYNC_WORKERS)')
+        parser.add_argument('--reset', action='store_true', help='Forget the watermark before syncing')
     
     def handle(self, *args, **options):
         self.stdout.write('Starting TATA data sync...')
         
+        sync = CDRSync(workers=options['workers'])
+        if options['reset']:
+            sync.reset()
+        
         days = 30 if options['full_sync'] else options['days']
+        since = timezone.now() - timedelta(days=days) if days else None
+        
+        result = sync.run(since=since)
+        
+        if result['status'] == 'busy':
+            self.stdout.write(self.style.WARNING('Another TATA sync is running; skipped'))
+            return
+        
+        self.stdout.write(f"Synced {result['from']:%Y-%m-%d %H:%M} to {result['to']:%Y-%m-%d %H:%M} in {result['pages']} pages")
+        if options['verbosity'] >= 2:
+            for endpoint, stats in get_client().stats().items():
+                self.stdout.write(f"  {endpoint}: {stats['count']} calls, avg {stats['avg_ms']}ms, max {stats['max_ms']}ms, {stats['retries']} retries")
         
-        try:
-            tata_api = TATACallsAPI()
-            
-            # Calculate date range
-            to_date = timezone.now()
-            from_date = to_date - timedelta(days=days)
-            
-            self.stdout.write(f'Syncing data from {from_date.date()} to {to_date.date()}')
-            
-            # Fetch call records
-            page = 1
-            total_synced = 0
-            
-            while True:
-                result = tata_api.get_call_records(
-                    from_date.strftime('%Y-%m-%d %H:%M:%S'),
-                    to_date.strftime('%Y-%m-%d %H:%M:%S'),
-                    page=page,
-                    limit=100
-                )
-                
-                if not result.get('success', True) or not result.get('results'):
-                    break
-                
-                calls = result.get('results', [])
-                
-                for call_data in calls:
-                    try:
-                        # Create or update call log
-                        call_log, created = IVRCallLog.objects.get_or_create(
-                            uuid=call_data.get('uuid', call_data.get('call_id')),
-                            defaults={
-                                'call_to_number': call_data.get('did_number', ''),
-                                'caller_id_number': call_data.get('client_number', ''),
-                                'call_id': call_data.get('call_id', ''),
-                                'start_stamp': self.parse_datetime(call_data.get('date'), call_data.get('time')),
-                                'duration': call_data.get('call_duration', 0),
-                                'status': call_data.get('status', 'unknown'),
-                                'raw_data': call_data,
-                                'billing_circle': call_data.get('circle', {}).get('circle', ''),
-                                'customer_no_with_prefix': call_data.get('client_number', '')
-                            }
-                        )
-                        
-                        if created:
-                            # Try to associate with existing lead
-                            call_log.associate_with_lead()
-                            total_synced += 1
-                            
-                    except Exception as e:
-                        self.stdout.write(f'Error processing call {call_data.get("call_id")}: {e}')
-                
-                # Check if there are more pages
-                if len(calls) < 100:
-                    break
-                
-                page += 1
-                
-                if page > 50:  # Safety limit
-                    break
-            
+        if result['status'] == 'failed':
             self.stdout.write(
-                self.style.SUCCESS(f'Successfully synced {total_synced} new call records')
+                self.style.ERROR(f"Error during sync: {result['error']} ({result['created']} new call records kept)")
             )
-            
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Error during sync: {e}')
+            return
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully synced {result['created']} new call records "
+                f"({result['updated']} refreshed, watermark {result['watermark']})"
             )
-    
-    def parse_datetime(self, date_str, time_str):
-        """Parse TATA date/time format"""
-        try:
-            from datetime import datetime
-            if date_str and time_str:
-                datetime_str = f"{date_str} {time_str}"
-                return datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-        except:
-            pass
-        return timezone.now()
\ No newline at end of file
+        )
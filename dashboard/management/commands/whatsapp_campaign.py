@@ -9,6 +9,7 @@ import json
 import csv
 import sys
 from dashboard.tata_whatsapp_service import TataWhatsAppCampaignService
+from dashboard.whatsapp_campaign_queue import WhatsAppCampaignQueue
 from dashboard.models import Project, Lead
 
 class Command(BaseCommand):
@@ -89,6 +90,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip confirmation prompts'
         )
+        
+        parser.add_argument(
+            '--enqueue-only',
+            action='store_true',
+            help='Queue the campaign for the process_whatsapp_campaigns worker and exit'
+        )
 
     def handle(self, *args, **options):
         try:
@@ -109,8 +116,8 @@ class Command(BaseCommand):
                 raise CommandError('Template name cannot be empty')
             
             # Validate media parameters
-            media_url = options.get('header_media_url', '').strip()
-            media_type = options.get('header_media_type', '').strip()
+            media_url = (options.get('header_media_url') or '').strip()
+            media_type = (options.get('header_media_type') or '').strip()
             
             if media_url and not media_type:
                 raise CommandError('Media type required when media URL provided')
@@ -148,17 +155,42 @@ class Command(BaseCommand):
             # Execute campaign
             self.stdout.write(self.style.HTTP_INFO('Executing campaign...'))
             
-            results = campaign_service.run_campaign(
-                project_names=options.get('projects', []),
-                from_date=from_date,
-                to_date=to_date,
-                template_name=template_name,
-                language=options['language'],
-                header_media_url=media_url or None,
-                header_media_type=media_type or None,
-                dry_run=options['dry_run'],
-                limit=options['limit']
-            )
+            if options['dry_run']:
+                results = campaign_service.run_campaign(
+                    project_names=options.get('projects', []),
+                    from_date=from_date,
+                    to_date=to_date,
+                    template_name=template_name,
+                    language=options['language'],
+                    header_media_url=media_url or None,
+                    header_media_type=media_type or None,
+                    dry_run=True,
+                    limit=options['limit']
+                )
+            else:
+                # Live sends go through the persistent job queue so an interrupted run can resume
+                queue = WhatsAppCampaignQueue()
+                job = queue.enqueue(
+                    template_name=template_name,
+                    from_date=from_date,
+                    to_date=to_date,
+                    project_names=options.get('projects') or [],
+                    language=options['language'],
+                    header_media_url=media_url or None,
+                    header_media_type=media_type or None,
+                    limit=options['limit']
+                )
+                self.stdout.write(f"Queued campaign job {job.id}")
+                
+                if options['enqueue_only']:
+                    self.stdout.write(f"Run 'python manage.py process_whatsapp_campaigns --job-id {job.id}' to send it")
+                    return
+                
+                claimed = queue.claim_job(job_id=job.id)
+                if claimed is None:
+                    raise CommandError(f'Campaign job {job.id} is leased by another worker')
+                job = queue.process_job(claimed)
+                results = queue.job_results(job)
             
             # Display results
             self.display_results(results, options)
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:43
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of the E.164 normalizer, so later changes to dashboard.phone_numbers don't change this backfill
+E164_PATTERN = re.compile(r'^\+[1-9]\d{6,15}$')
+NON_PHONE_CHARS = re.compile(r'[^\d+]')
+
+
+def to_e164(phone):
+    clean_phone = NON_PHONE_CHARS.sub('', str(phone or ''))
+    if not clean_phone.startswith('+'):
+        if clean_phone.startswith('91') and len(clean_phone) == 12:
+            clean_phone = '+' + clean_phone
+        elif len(clean_phone) == 10:
+            clean_phone = '+91' + clean_phone
+        elif clean_phone.startswith('0') and len(clean_phone) == 11:
+            clean_phone = '+91' + clean_phone[1:]
+        else:
+            return ''
+    return clean_phone if E164_PATTERN.match(clean_phone) else ''
+
+
+def backfill_phone_e164(apps, schema_editor):
+    Lead = apps.get_model('dashboard', 'Lead')
+    batch = []
+    for lead in Lead.objects.only('id', 'phone').iterator(chunk_size=2000):
+        lead.phone_e164 = to_e164(lead.phone)
+        if lead.phone_e164:
+            batch.append(lead)
+        if len(batch) >= 2000:
+            Lead.objects.bulk_update(batch, ['phone_e164'])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_whatsapp_campaign_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WhatsAppOptOut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(help_text='E.164 format', max_length=20, unique=True)),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Normalized phone, maintained on save', max_length=20),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:49
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of the match key, so later changes to dashboard.phone_numbers don't change this backfill
+NON_DIGITS = re.compile(r'\D')
+
+
+def phone_key(phone):
+    return NON_DIGITS.sub('', str(phone or ''))[-10:]
+
+
+def backfill_phone_key(apps, schema_editor):
+    Lead = apps.get_model('dashboard', 'Lead')
+    batch = []
+    for lead in Lead.objects.only('id', 'phone').iterator(chunk_size=2000):
+        lead.phone_key = phone_key(lead.phone)
+        if lead.phone_key:
+            batch.append(lead)
+        if len(batch) >= 2000:
+            Lead.objects.bulk_update(batch, ['phone_key'])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ['phone_key'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_lead_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Last 10 digits of phone for matching, maintained on save', max_length=10),
+        ),
+        migrations.RunPython(backfill_phone_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_lead_phone_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPISnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Last full recount by the reconciler')),
+            ],
+            options={
+                'ordering': ['key'],
+            },
+        ),
+    ]
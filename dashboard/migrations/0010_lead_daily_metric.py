@@ -0,0 +1,50 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboard', '0009_kpi_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lead',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='lead',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='leadstagehistory',
+            name='changed_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='LeadDailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('source', models.CharField(max_length=30)),
+                ('stage_category', models.CharField(blank=True, max_length=20)),
+                ('created', models.PositiveIntegerField(default=0, help_text='Leads created this day, by their current stage and assignee')),
+                ('converted', models.PositiveIntegerField(default=0, help_text='Moves into a closed stage this day')),
+                ('touched', models.PositiveIntegerField(default=0, help_text='Stage changes this day')),
+                ('built_at', models.DateTimeField(db_index=True)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_lead_metrics', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_lead_metrics', to='dashboard.project')),
+                ('stage', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_lead_metrics', to='dashboard.leadstage')),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
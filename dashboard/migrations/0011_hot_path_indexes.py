@@ -0,0 +1,74 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:21
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_lead_daily_metric'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ivrcalllog',
+            index=models.Index(fields=['-start_stamp'], name='ivr_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ivrcalllog',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['-start_stamp'], name='ivr_unprocessed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['current_stage', '-created_at'], name='lead_stage_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['follow_up_date', 'current_stage'], name='lead_followup_stage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(condition=models.Q(('requires_callback', True)), fields=['current_stage'], name='lead_callback_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['assigned_to', '-created_at'], name='lead_assignee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['source', 'created_at'], name='lead_source_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['email'], name='lead_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='lead_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='whatsappmessage',
+            index=models.Index(fields=['message_id'], name='wa_message_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='whatsappmessage',
+            index=models.Index(fields=['-created_at'], name='wa_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='whatsappmessage',
+            index=models.Index(fields=['status', '-created_at'], name='wa_status_created_idx'),
+        ),
+    ]
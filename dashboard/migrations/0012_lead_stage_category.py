@@ -0,0 +1,54 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:22
+
+from django.db import migrations, models
+
+
+def backfill_stage_category(apps, schema_editor):
+    Lead = apps.get_model('dashboard', 'Lead')
+    LeadStage = apps.get_model('dashboard', 'LeadStage')
+    for stage_id, category in LeadStage.objects.values_list('id', 'category'):
+        Lead.objects.filter(current_stage_id=stage_id).update(stage_category=category)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lead',
+            name='lead_stage_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lead',
+            name='lead_followup_stage_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lead',
+            name='lead_callback_idx',
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='stage_category',
+            field=models.CharField(blank=True, choices=[('new', 'New'), ('hot', 'Hot'), ('warm', 'Warm'), ('cold', 'Cold'), ('closed', 'Closed'), ('dead', 'Dead/Junk')], editable=False, help_text='Category of current_stage, maintained on save', max_length=20),
+        ),
+        migrations.RunPython(backfill_stage_category, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['stage_category', '-created_at'], name='lead_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['stage_category', '-updated_at'], name='lead_category_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['stage_category', 'follow_up_date'], name='lead_category_followup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(condition=models.Q(('requires_callback', True)), fields=['stage_category'], name='lead_callback_idx'),
+        ),
+    ]
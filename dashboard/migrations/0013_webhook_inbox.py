@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_lead_stage_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('tata_whatsapp', 'Tata WhatsApp (entry format)'), ('whatsapp_status', 'WhatsApp Delivery Status'), ('whatsapp_message', 'WhatsApp Incoming Message'), ('ivr_call', 'IVR Call'), ('ivr_call_log', 'IVR Call Log')], max_length=20)),
+                ('idempotency_key', models.CharField(help_text='Provider event id (or payload hash); retries of the same event are dropped', max_length=255, unique=True)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('lease_owner', models.CharField(blank=True, max_length=100)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['received_at'],
+                'indexes': [models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['id'], name='webhook_event_backlog_idx'), models.Index(fields=['status', 'processed_at'], name='webhook_event_status_idx')],
+            },
+        ),
+    ]
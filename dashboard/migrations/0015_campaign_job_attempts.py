@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0014_sync_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsappcampaignjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Worker runs that ended in an error; the job is failed after WHATSAPP_CAMPAIGN_MAX_ATTEMPTS'),
+        ),
+    ]
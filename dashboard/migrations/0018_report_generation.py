@@ -0,0 +1,20 @@
+# Generated by Django 4.2.16 on 2026-10-17 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0017_lead_metric_dirty_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
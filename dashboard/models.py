@@ -3,10 +3,62 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 import os
 from datetime import time, datetime, timedelta
-from django.db.models import Q, Count, Case, When, FloatField, F, ExpressionWrapper, fields
+from django.db.models import Q, Count, Sum, Case, When, FloatField, F, ExpressionWrapper, fields, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower
+from django.conf import settings
+from django.core.files.storage import storages
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 import json
+from .phone_numbers import normalize as to_e164, phone_key
+
+class ProjectQuerySet(models.QuerySet):
+    def with_lead_metrics(self, source=None, from_rollup=None):
+        """Annotate total_leads, converted_leads, active_leads and lead_conversion_rate in one query
+
+        from_rollup reads the per-project LeadDailyMetric rows (as of their last build) instead
+        of joining every interested lead; it defaults to settings.PROJECT_METRICS_FROM_ROLLUP.
+        """
+        if from_rollup is None:
+            from_rollup = getattr(settings, 'PROJECT_METRICS_FROM_ROLLUP', False)
+        
+        closed = Q(stage_category='closed') if from_rollup else Q(interested_leads__stage_category='closed')
+        active = (
+            Q(stage_category__in=LeadStage.ACTIVE_CATEGORIES) if from_rollup
+            else Q(interested_leads__stage_category__in=LeadStage.ACTIVE_CATEGORIES)
+        )
+        
+        if from_rollup:
+            rows = LeadDailyMetric.objects.filter(project=OuterRef('pk'))
+            if source:
+                rows = rows.filter(source=source)
+            
+            def rollup_sum(condition=Q()):
+                return Coalesce(
+                    Subquery(rows.filter(condition).order_by().values('project').annotate(total=Sum('created')).values('total')),
+                    0
+                )
+            
+            queryset = self.annotate(
+                total_leads=rollup_sum(),
+                converted_leads=rollup_sum(closed),
+                active_leads=rollup_sum(active)
+            )
+        else:
+            in_source = Q(interested_leads__source=source) if source else Q()
+            queryset = self.annotate(
+                total_leads=Count('interested_leads', filter=in_source),
+                converted_leads=Count('interested_leads', filter=in_source & closed),
+                active_leads=Count('interested_leads', filter=in_source & active)
+            )
+        
+        return queryset.annotate(
+            lead_conversion_rate=Case(
+                When(total_leads=0, then=Value(0.0)),
+                default=ExpressionWrapper(F('converted_leads') * 100.0 / F('total_leads'), output_field=FloatField()),
+                output_field=FloatField()
+            )
+        )
 
 def project_image_upload_path(instance, filename):
     """Generate upload path for project images"""
@@ -86,6 +138,8 @@ class Project(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_projects')
     
+    objects = ProjectQuerySet.as_manager()
+    
     def __str__(self):
         return self.name
     
@@ -98,10 +152,12 @@ class Project(models.Model):
 
     @property
     def conversion_rate(self):
+        if hasattr(self, 'lead_conversion_rate'):  # annotated by with_lead_metrics()
+            return self.lead_conversion_rate
         total_leads = self.interested_leads.count()
         if total_leads == 0:
             return 0
-        converted_leads = self.interested_leads.filter(current_stage__category='closed').count()
+        converted_leads = self.interested_leads.filter(stage_category='closed').count()
         return (converted_leads / total_leads) * 100
     
     class Meta:
@@ -152,6 +208,8 @@ class LeadStage(models.Model):
         ('closed', 'Closed'),
         ('dead', 'Dead/Junk'),
     ]
+    # Categories whose leads are still being worked
+    ACTIVE_CATEGORIES = ['warm', 'hot']
     
     name = models.CharField(max_length=100, unique=True)
     category = models.CharField(max_length=20, choices=STAGE_CATEGORIES)
@@ -171,6 +229,14 @@ class LeadStage(models.Model):
     class Meta:
         ordering = ['category', 'order']
 
+class LeadQuerySet(models.QuerySet):
+    def matching_phone(self, phone):
+        """Leads whose phone matches in any format, resolved with an index seek on phone_key"""
+        key = phone_key(phone)
+        if not key:
+            return self.none()
+        return self.filter(phone_key=key)
+
 # Enhanced Lead Model with Advanced Tracking
 class Lead(models.Model):
     SOURCE_CHOICES = [
@@ -225,6 +291,8 @@ class Lead(models.Model):
     name = models.CharField(max_length=255)
     email = models.EmailField()
     phone = models.CharField(max_length=20)
+    phone_e164 = models.CharField(max_length=20, blank=True, db_index=True, editable=False, help_text="Normalized phone, maintained on save")
+    phone_key = models.CharField(max_length=10, blank=True, db_index=True, editable=False, help_text="Last 10 digits of phone for matching, maintained on save")
     
     # Alternative Contact Information
     alternative_phone = models.CharField(max_length=20, blank=True)
@@ -250,6 +318,7 @@ class Lead(models.Model):
     current_stage = models.ForeignKey(LeadStage, on_delete=models.SET_NULL, null=True, related_name='leads')
     previous_stage = models.ForeignKey(LeadStage, on_delete=models.SET_NULL, null=True, blank=True, related_name='previous_leads')
     stage_changed_at = models.DateTimeField(auto_now_add=True)
+    stage_category = models.CharField(max_length=20, choices=LeadStage.STAGE_CATEGORIES, blank=True, editable=False, help_text="Category of current_stage, maintained on save")
     
     # Lead Classification
     is_recapture = models.BooleanField(default=False, help_text="Lead from multiple sources")
@@ -292,12 +361,36 @@ class Lead(models.Model):
     original_lead = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True)
     
     # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    objects = LeadQuerySet.as_manager()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Loaded values let the KPI signal handlers see stage/follow-up changes without a query
+        if 'current_stage_id' in instance.__dict__ and 'follow_up_date' in instance.__dict__:
+            instance._loaded_kpi_state = (instance.current_stage_id, instance.follow_up_date)
+        return instance
     
     def __str__(self):
         return f"{self.name} - {self.current_stage.name if self.current_stage else 'No Stage'}"
     
+    def save(self, *args, **kwargs):
+        self.phone_e164 = to_e164(self.phone)
+        self.phone_key = phone_key(self.phone)
+        self.stage_category = self.current_stage.category if self.current_stage_id else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'phone' in update_fields:
+                update_fields |= {'phone_e164', 'phone_key'}
+            if update_fields & {'current_stage', 'current_stage_id'}:
+                update_fields.add('stage_category')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+    
     def move_to_stage(self, new_stage, user=None, notes=''):
         """Move lead to a new stage with tracking"""
         if self.current_stage != new_stage:
@@ -317,8 +410,9 @@ class Lead(models.Model):
     
     def check_recapture(self):
         """Check if this is a recapture lead"""
+        phone_match = Q(phone_key=self.phone_key) if self.phone_key else Q(phone=self.phone)
         existing_leads = Lead.objects.filter(
-            Q(email=self.email) | Q(phone=self.phone)
+            Q(email=self.email) | phone_match
         ).exclude(id=self.id)
         
         if existing_leads.exists():
@@ -349,9 +443,123 @@ class Lead(models.Model):
             return (timezone.now().date() - self.last_contact_date).days
         return (timezone.now().date() - self.created_at.date()).days
     
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Stage lists (active/hot/closed) by recency, and follow-up lists by date within a category
+            models.Index(fields=['stage_category', '-created_at'], name='lead_category_created_idx'),
+            models.Index(fields=['stage_category', '-updated_at'], name='lead_category_updated_idx'),
+            models.Index(fields=['stage_category', 'follow_up_date'], name='lead_category_followup_idx'),
+            models.Index(fields=['stage_category'], condition=Q(requires_callback=True), name='lead_callback_idx'),
+            # Per-assignee and per-source counts over a period
+            models.Index(fields=['assigned_to', '-created_at'], name='lead_assignee_created_idx'),
+            models.Index(fields=['source', 'created_at'], name='lead_source_created_idx'),
+            # Recapture (exact) and duplicate detection (case-insensitive) on email
+            models.Index(fields=['email'], name='lead_email_idx'),
+            models.Index(Lower('email'), name='lead_email_lower_idx'),
+        ]
+
+def import_storage():
+    """Storage for import uploads; the importer worker runs as its own service, so it must be shared"""
+    return storages['imports']
+
+class LeadImportJob(models.Model):
+    """Bulk lead upload processed in the background by the process_lead_imports worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    file = models.FileField(upload_to='imports/', storage=import_storage)
+    original_name = models.CharField(max_length=255)
+    default_source = models.CharField(max_length=30, default='website')
+    default_status = models.CharField(max_length=20, default='warm')
+    skip_duplicates = models.BooleanField(default=True)
+    
+    # Progress checkpoint
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Worker lease
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='lead_import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Import #{self.id} {self.original_name} - {self.status}"
+    
+    @property
+    def rows_per_second(self):
+        """Import throughput since the worker picked the job up"""
+        if not self.started_at or not self.rows_processed:
+            return 0
+        elapsed = ((self.completed_at or timezone.now()) - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else 0
+    
     class Meta:
         ordering = ['-created_at']
 
+class LeadImportError(models.Model):
+    """A spreadsheet row that could not be imported"""
+    job = models.ForeignKey(LeadImportJob, on_delete=models.CASCADE, related_name='row_errors')
+    row_number = models.PositiveIntegerField()
+    message = models.TextField()
+    
+    def __str__(self):
+        return f"Import #{self.job_id} row {self.row_number}: {self.message}"
+    
+    class Meta:
+        ordering = ['row_number']
+
+class StoredFile(models.Model):
+    """File kept in the database by DatabaseStorage, readable from every service"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    chunk_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.size} bytes)"
+
+class StoredFileChunk(models.Model):
+    """One fixed-size slice of a StoredFile (only the last one may be shorter)"""
+    file = models.ForeignKey(StoredFile, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    data = models.BinaryField()
+    
+    class Meta:
+        unique_together = ['file', 'index']
+
+class KPISnapshot(models.Model):
+    """Precomputed dashboard counter, adjusted by Lead signals and rebuilt by the reconciler"""
+    key = models.CharField(max_length=50, unique=True)
+    value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    refreshed_at = models.DateTimeField(default=timezone.now, help_text="Last full recount by the reconciler")
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+    
+    class Meta:
+        ordering = ['key']
+
+class ReportGeneration(models.Model):
+    """Single-row counter of report data changes; cached report pages from an older value are stale"""
+    value = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Report generation {self.value}"
+
 class Client(models.Model):
     SOURCE_CHOICES = [
         ('internal', 'Internal'),
@@ -376,7 +584,7 @@ class LeadStageHistory(models.Model):
     from_stage = models.ForeignKey(LeadStage, on_delete=models.SET_NULL, null=True, blank=True, related_name='from_history')
     to_stage = models.ForeignKey(LeadStage, on_delete=models.SET_NULL, null=True, related_name='to_history')
     changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
-    changed_at = models.DateTimeField(auto_now_add=True)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
     notes = models.TextField(blank=True)
     duration_in_previous_stage = models.PositiveIntegerField(null=True, blank=True, help_text="Days in previous stage")
     
@@ -521,6 +729,111 @@ class WhatsAppMessage(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Delivery-status webhooks look messages up by provider id
+            models.Index(fields=['message_id'], name='wa_message_id_idx'),
+            models.Index(fields=['-created_at'], name='wa_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='wa_status_created_idx'),
+        ]
+
+class WhatsAppOptOut(models.Model):
+    """Phone numbers that must never receive WhatsApp campaigns"""
+    phone_number = models.CharField(max_length=20, unique=True, help_text="E.164 format")
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def save(self, *args, **kwargs):
+        self.phone_number = to_e164(self.phone_number) or self.phone_number
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return self.phone_number
+    
+    class Meta:
+        ordering = ['-created_at']
+
+class WhatsAppCampaignJob(models.Model):
+    """Persistent WhatsApp template campaign drained by the process_whatsapp_campaigns worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    # Campaign parameters
+    template_name = models.CharField(max_length=100)
+    language = models.CharField(max_length=10, default='en')
+    project_names = models.JSONField(default=list, blank=True)
+    from_date = models.DateTimeField()
+    to_date = models.DateTimeField()
+    header_media_url = models.URLField(blank=True)
+    header_media_type = models.CharField(max_length=20, blank=True)
+    limit = models.PositiveIntegerField(null=True, blank=True)
+    
+    # Progress checkpoint
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Worker lease
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0, help_text="Worker runs that ended in an error; the job is failed after WHATSAPP_CAMPAIGN_MAX_ATTEMPTS")
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='whatsapp_campaign_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Campaign #{self.id} {self.template_name} - {self.status}"
+    
+    @property
+    def processed_count(self):
+        return self.sent_count + self.failed_count + self.skipped_count
+    
+    @property
+    def progress_percentage(self):
+        if self.total_recipients:
+            return (self.processed_count / self.total_recipients) * 100
+        return 100 if self.status == 'completed' else 0
+    
+    class Meta:
+        ordering = ['-created_at']
+
+class WhatsAppCampaignRecipient(models.Model):
+    """Per-recipient send state for a campaign job"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('in_flight', 'In Flight'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+    
+    job = models.ForeignKey(WhatsAppCampaignJob, on_delete=models.CASCADE, related_name='recipients')
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='campaign_recipients')
+    phone_number = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    whatsapp_message = models.ForeignKey(WhatsAppMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='campaign_recipients')
+    error = models.TextField(blank=True)
+    leased_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.job_id} -> {self.phone_number} ({self.status})"
+    
+    class Meta:
+        # One message per phone per campaign, whatever happens to the worker
+        unique_together = ['job', 'phone_number']
+        indexes = [models.Index(fields=['job', 'status'])]
+        ordering = ['id']
 
 class IVRCallLog(models.Model):
     CALL_STATUS_CHOICES = [
@@ -567,11 +880,7 @@ class IVRCallLog(models.Model):
     def associate_with_lead(self):
         """Associate call with existing lead"""
         if not self.associated_lead:
-            clean_caller = self.caller_id_number.replace('+91', '').replace(' ', '').replace('-', '')
-            
-            lead = Lead.objects.filter(
-                Q(phone__icontains=clean_caller[-10:])
-            ).first()
+            lead = Lead.objects.matching_phone(self.caller_id_number).first()
             
             if lead:
                 self.associated_lead = lead
@@ -593,6 +902,76 @@ class IVRCallLog(models.Model):
     
     class Meta:
         ordering = ['-start_stamp']
+        indexes = [
+            models.Index(fields=['-start_stamp'], name='ivr_start_idx'),
+            # The lead-creation backlog stays small, so index only the unprocessed calls
+            models.Index(fields=['-start_stamp'], condition=Q(processed=False), name='ivr_unprocessed_idx'),
+        ]
+
+class WebhookEvent(models.Model):
+    """Provider webhook stored verbatim on receipt and processed by the process_webhook_inbox worker"""
+    SOURCE_CHOICES = [
+        ('tata_whatsapp', 'Tata WhatsApp (entry format)'),
+        ('whatsapp_status', 'WhatsApp Delivery Status'),
+        ('whatsapp_message', 'WhatsApp Incoming Message'),
+        ('ivr_call', 'IVR Call'),
+        ('ivr_call_log', 'IVR Call Log'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    idempotency_key = models.CharField(max_length=255, unique=True, help_text="Provider event id (or payload hash); retries of the same event are dropped")
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Worker lease
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.get_source_display()} event #{self.id} - {self.status}"
+    
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            # The worker only ever scans the unfinished backlog
+            models.Index(fields=['id'], condition=Q(status__in=['pending', 'processing']), name='webhook_event_backlog_idx'),
+            models.Index(fields=['status', 'processed_at'], name='webhook_event_status_idx'),
+        ]
+
+class SyncWatermark(models.Model):
+    """High-water mark of an incremental pull from an external API (e.g. TATA call records)"""
+    name = models.CharField(max_length=50, unique=True)
+    watermark = models.DateTimeField(null=True, blank=True, help_text="Timestamp of the newest record synced so far")
+    
+    # Last run
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    last_synced_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Worker lease, so overlapping cron runs don't pull the same window twice
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.watermark}"
+    
+    class Meta:
+        ordering = ['name']
 
 class TeamMember(models.Model):
     ROLE_CHOICES = [
@@ -634,107 +1013,34 @@ class TeamMember(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.get_role_display()}"
     
+    def _metric(self, name):
+        """One section of this member's TeamMetricsService output (precomputed when attached)"""
+        metrics = getattr(self, '_team_metrics', None)
+        if metrics is not None:
+            return metrics[name]
+        from .team_metrics import TeamMetricsService
+        service = TeamMetricsService([self])
+        section = {
+            'performance': service.performance,
+            'leave_balance': service.leave_balances,
+            'compoff_balance': service.compoff_balances,
+        }[name]()
+        return section[self.user_id]
+    
     @property
     def monthly_performance(self):
         """Get current month performance"""
-        from django.db.models import Count, Sum
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        
-        leads_assigned = Lead.objects.filter(
-            assigned_to=self.user,
-            created_at__month=current_month,
-            created_at__year=current_year
-        ).count()
-        
-        site_visits = LeadNote.objects.filter(
-            created_by=self.user,
-            call_type='site_visit',
-            created_at__month=current_month,
-            created_at__year=current_year
-        ).count()
-        
-        closures = Lead.objects.filter(
-            assigned_to=self.user,
-            current_stage__name='Deal Closed',
-            updated_at__month=current_month,
-            updated_at__year=current_year
-        ).count()
-        
-        return {
-            'leads': leads_assigned,
-            'site_visits': site_visits,
-            'closures': closures,
-            'lead_target_percentage': (leads_assigned / self.target_leads_monthly * 100) if self.target_leads_monthly else 0,
-            'site_visit_percentage': (site_visits / self.target_site_visits_monthly * 100) if self.target_site_visits_monthly else 0,
-            'closure_percentage': (closures / self.target_closures_monthly * 100) if self.target_closures_monthly else 0,
-        }
+        return self._metric('performance')
     
     @property
     def leave_balance(self):
         """Get current leave balance"""
-        current_year = timezone.now().year
-        
-        # Default leave types if none exist
-        default_balance = {
-            'annual_leave': {'allowed': 12, 'used': 0, 'remaining': 12},
-            'sick_leave': {'allowed': 8, 'used': 0, 'remaining': 8},
-            'casual_leave': {'allowed': 6, 'used': 0, 'remaining': 6}
-        }
-        
-        try:
-            from .models import LeaveType, LeaveApplication
-            # Get all leave types
-            leave_types = LeaveType.objects.all()
-            balance = {}
-            
-            for leave_type in leave_types:
-                # Calculate used leaves this year
-                used_leaves = LeaveApplication.objects.filter(
-                    employee=self.user,
-                    leave_type=leave_type,
-                    status='approved',
-                    from_date__year=current_year
-                ).aggregate(total=Sum('days_requested'))['total'] or 0
-                
-                balance[leave_type.name.lower().replace(' ', '_')] = {
-                    'allowed': leave_type.days_allowed_per_year,
-                    'used': used_leaves,
-                    'remaining': leave_type.days_allowed_per_year - used_leaves
-                }
-            
-            return balance if balance else default_balance
-        except:
-            return default_balance
+        return self._metric('leave_balance')
     
     @property
     def compoff_balance(self):
         """Get comp-off balance"""
-        current_year = timezone.now().year
-        
-        try:
-            from .models import CompOffRequest
-            # Approved comp-offs earned
-            earned = CompOffRequest.objects.filter(
-                employee=self.user,
-                status='approved',
-                worked_date__year=current_year
-            ).count()
-            
-            # Comp-offs used (attendance marked as comp_off)
-            used = Attendance.objects.filter(
-                employee=self.user,
-                status='comp_off',
-                date__year=current_year
-            ).count()
-            
-            return {
-                'earned': earned,
-                'used': used,
-                'remaining': earned - used
-            }
-        except:
-            return {'earned': 0, 'used': 0, 'remaining': 0}
+        return self._metric('compoff_balance')
     
     class Meta:
         ordering = ['user__first_name', 'user__last_name']
@@ -838,26 +1144,64 @@ class LeadSource(models.Model):
     
     @property
     def monthly_leads(self):
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        return Lead.objects.filter(
+        from .lead_metrics import lead_metrics
+        today = timezone.now().date()
+        return lead_metrics(
             source=self.name.lower().replace(' ', '_'),
-            created_at__month=current_month,
-            created_at__year=current_year
-        ).count()
+            date__gte=today.replace(day=1),
+            date__lte=today
+        ).aggregate(total=Sum('created'))['total'] or 0
     
     @property
     def conversion_rate(self):
-        total_leads = Lead.objects.filter(source=self.name.lower().replace(' ', '_')).count()
-        converted_leads = Lead.objects.filter(
-            source=self.name.lower().replace(' ', '_'),
-            current_stage__name='Deal Closed'
-        ).count()
+        from .lead_metrics import lead_metrics
+        totals = lead_metrics(source=self.name.lower().replace(' ', '_')).aggregate(
+            total_leads=Sum('created'),
+            converted_leads=Sum('created', filter=Q(stage__name='Deal Closed'))
+        )
+        total_leads = totals['total_leads'] or 0
+        converted_leads = totals['converted_leads'] or 0
         
         if total_leads > 0:
             return (converted_leads / total_leads) * 100
         return 0
 
+class LeadDailyMetric(models.Model):
+    """Daily lead rollup per source x project x assignee x stage, maintained by build_lead_metrics
+    
+    Rows with no project count every lead once; project rows count the leads interested
+    in that project, so a lead with several projects appears in each of them.
+    """
+    date = models.DateField(db_index=True)
+    source = models.CharField(max_length=30)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_lead_metrics')
+    assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_lead_metrics')
+    stage = models.ForeignKey(LeadStage, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_lead_metrics')
+    stage_category = models.CharField(max_length=20, blank=True)
+    
+    created = models.PositiveIntegerField(default=0, help_text="Leads created this day, by their current stage and assignee")
+    converted = models.PositiveIntegerField(default=0, help_text="Moves into a closed stage this day")
+    touched = models.PositiveIntegerField(default=0, help_text="Stage changes this day")
+    built_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.date} {self.source} {self.stage_category}: {self.created}"
+    
+    class Meta:
+        ordering = ['date']
+
+class LeadMetricDirtyDay(models.Model):
+    """A day queued for the next LeadDailyMetric build by a change that leaves no timestamp behind
+    
+    Lead deletes (including merges) and project-interest edits; build_lead_metrics
+    consumes the rows. Duplicates are allowed so a day marked mid-build is kept.
+    """
+    date = models.DateField()
+    marked_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.date} (marked {self.marked_at})"
+
 # Expense and CPL Tracking
 class MarketingExpense(models.Model):
     """Track marketing expenses for CPL calculation"""
@@ -1121,6 +1465,11 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread badge counts and the recipient's newest-first list
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_read_idx'),
+            models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+        ]
 
 # Leave Management
 class LeaveType(models.Model):
@@ -1271,3 +1620,4 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ['employee', 'date']
         ordering = ['-date', 'employee__first_name']
+        indexes = [models.Index(fields=['date', 'status'], name='attendance_date_status_idx')]
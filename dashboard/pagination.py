@@ -0,0 +1,219 @@
+"""
+Keyset pagination
+Cursor-based paging for the big listings: each page seeks past the last row of
+the previous one on an indexed (sort key, id) ordering, so page 5,000 costs
+the same as page 1 and no COUNT(*)/OFFSET runs over the whole table.
+"""
+import base64
+import json
+import logging
+from functools import reduce
+from operator import and_, or_
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.http import QueryDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 25
+
+
+def page_size(request, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """rows_per_page from the query string, clamped to 1..MAX_PAGE_SIZE"""
+    ceiling = getattr(settings, 'MAX_PAGE_SIZE', 100)
+    try:
+        size = int(request.GET.get('rows_per_page', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, ceiling))
+
+
+def estimated_count(queryset) -> int:
+    """Row count from the planner on PostgreSQL, else an exact count capped at ESTIMATED_COUNT_CAP"""
+    if connection.vendor == 'postgresql':
+        try:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            logger.warning(f"Planner row estimate failed, counting instead: {str(e)}")
+    cap = getattr(settings, 'ESTIMATED_COUNT_CAP', 10000)
+    return queryset.order_by()[:cap].count()
+
+
+class CursorPage:
+    """One page of a keyset listing; iterates like a Django Page"""
+
+    def __init__(self, object_list: List, has_next: bool, has_previous: bool,
+                 next_cursor: str = '', previous_cursor: str = '',
+                 count: Optional[int] = None, count_is_estimate: bool = False, query=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_estimate = count_is_estimate
+        self.query = query if query is not None else QueryDict(mutable=True)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def _url(self, cursor: str) -> str:
+        query = self.query.copy()
+        query['cursor'] = cursor
+        return f'?{query.urlencode()}'
+
+    @property
+    def next_url(self) -> str:
+        return self._url(self.next_cursor)
+
+    @property
+    def previous_url(self) -> str:
+        return self._url(self.previous_cursor)
+
+
+class KeysetPaginator:
+    """Pages a queryset on an ordering whose last key is unique, e.g. ['-created_at', '-id']
+
+    Nullable keys sort their NULLs last in both directions. count is 'estimate'
+    (planner/capped count), 'exact' or None (no count query at all).
+    """
+
+    def __init__(self, queryset, keys: Sequence[str], per_page: int = DEFAULT_PAGE_SIZE, count: Optional[str] = 'estimate'):
+        self.queryset = queryset
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in keys]
+        self.per_page = per_page
+        self.count = count
+
+    def _field(self, path: str):
+        model = self.queryset.model
+        parts = path.split('__')
+        for part in parts[:-1]:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(parts[-1])
+
+    def _ordering(self, reverse: bool = False):
+        """The page ordering, or its mirror image for walking backwards"""
+        ordering = []
+        for path, descending in self.keys:
+            expression = F(path).desc if descending != reverse else F(path).asc
+            ordering.append(expression(nulls_first=True) if reverse else expression(nulls_last=True))
+        return ordering
+
+    def _values(self, obj) -> List:
+        values = []
+        for path, _ in self.keys:
+            value = obj
+            for part in path.split('__'):
+                value = getattr(value, part) if value is not None else None
+            values.append(value)
+        return values
+
+    def encode(self, obj, direction: str) -> str:
+        values = [_serialize(value) for value in self._values(obj)]
+        payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode(self, cursor: str):
+        """(direction, values) from a cursor, or None when it is malformed"""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            values = [
+                None if value is None else self._field(path).to_python(value)
+                for (path, _), value in zip(self.keys, payload['v'])
+            ]
+            if payload['d'] not in ('next', 'prev') or len(values) != len(self.keys):
+                return None
+            return payload['d'], values
+        except Exception:
+            return None
+
+    def _seek(self, values: List, before: bool) -> Q:
+        """Rows strictly after (or before) the row with these key values in the page ordering"""
+        nothing = Q(pk__in=[])
+        conditions = []
+        for index, ((path, descending), value) in enumerate(zip(self.keys, values)):
+            nullable = self._field(path).null
+            if value is None:
+                # NULLs sort last: everything non-null precedes them, nothing follows
+                strict = Q(**{f'{path}__isnull': False}) if before else nothing
+            else:
+                lookup = 'lt' if descending != before else 'gt'
+                strict = Q(**{f'{path}__{lookup}': value})
+                if nullable and not before:
+                    strict |= Q(**{f'{path}__isnull': True})
+            ties = [
+                Q(**{f'{tie_path}__isnull': True}) if tie_value is None else Q(**{tie_path: tie_value})
+                for (tie_path, _), tie_value in zip(self.keys[:index], values[:index])
+            ]
+            conditions.append(reduce(and_, ties + [strict]))
+        return reduce(or_, conditions)
+
+    def page(self, cursor: str = '', query=None) -> CursorPage:
+        decoded = self.decode(cursor) if cursor else None
+        direction, values = decoded if decoded else ('next', None)
+        backwards = direction == 'prev'
+
+        rows = self.queryset
+        if values is not None:
+            rows = rows.filter(self._seek(values, before=backwards))
+        rows = list(rows.order_by(*self._ordering(reverse=backwards))[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        if backwards and not more:
+            # Walked back to the start; serve a full first page instead of a short one
+            return self.page('', query)
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = more if not backwards else True
+        has_previous = values is not None if not backwards else more
+        count = None
+        if self.count == 'exact':
+            count = self.queryset.count()
+        elif self.count == 'estimate':
+            count = estimated_count(self.queryset)
+
+        return CursorPage(
+            rows,
+            has_next=bool(rows) and has_next,
+            has_previous=bool(rows) and has_previous,
+            next_cursor=self.encode(rows[-1], 'next') if rows else '',
+            previous_cursor=self.encode(rows[0], 'prev') if rows else '',
+            count=count,
+            count_is_estimate=self.count == 'estimate',
+            query=query,
+        )
+
+
+def _serialize(value):
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def paginate(request, queryset, keys: Sequence[str], per_page: int = None, count: str = None) -> CursorPage:
+    """The requested page of a listing, with next/previous links that keep the other filters
+
+    count is 'estimate', 'exact' or 'none'; it defaults to settings.LISTING_COUNT_MODE.
+    """
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    query.pop('page', None)
+    count = count or getattr(settings, 'LISTING_COUNT_MODE', 'estimate')
+    paginator = KeysetPaginator(
+        queryset,
+        keys,
+        per_page=per_page or page_size(request),
+        count=None if count == 'none' else count,
+    )
+    return paginator.page(request.GET.get('cursor', ''), query=query)
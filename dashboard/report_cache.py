@@ -0,0 +1,112 @@
+"""
+Report page cache
+Heavy report/analytics contexts cached per view and filter parameters. Each
+entry records the data generation it was computed at; Lead, stage history,
+note and marketing expense writes bump the generation (a single-row counter in
+the database, at most once per transaction) so the next request recomputes
+(or, with stale-while-revalidate, refreshes in the background).
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Dict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import ReportGeneration
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'reports'
+REFRESH_LOCK_SECONDS = 300
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _seed():
+    """Create the counter, seeded from the clock so a reset table never reuses an old generation"""
+    return ReportGeneration.objects.get_or_create(pk=1, defaults={'value': time.time_ns()})[0].value
+
+
+def generation() -> int:
+    """Current data generation"""
+    value = ReportGeneration.objects.filter(pk=1).values_list('value', flat=True).first()
+    return _seed() if value is None else value
+
+
+def _bump_now():
+    # One atomic UPDATE, so concurrent bumps never collapse into one
+    if not ReportGeneration.objects.filter(pk=1).update(value=F('value') + 1):
+        _seed()
+
+
+def bump():
+    """Invalidate every cached report once the current transaction commits
+
+    Repeated bumps in one transaction (e.g. a signal per saved row) share a single UPDATE.
+    """
+    db = transaction.get_connection()
+    if db.in_atomic_block and any(callback is _bump_now for _, callback, *_ in db.run_on_commit):
+        return
+    transaction.on_commit(_bump_now)
+
+
+def cache_key(view_name: str, params: Dict) -> str:
+    query = urlencode(sorted((key, str(value)) for key, value in params.items() if value not in (None, '')))
+    return f'reports:{view_name}:{hashlib.md5(query.encode()).hexdigest()}'
+
+
+def cached(view_name: str, params: Dict, compute: Callable[[], Dict]) -> Dict:
+    """compute() for these parameters, served from the cache while the data generation hasn't moved"""
+    ttl = getattr(settings, 'REPORT_CACHE_SECONDS', 600)
+    if not ttl:
+        return compute()
+    stale_seconds = getattr(settings, 'REPORT_CACHE_STALE_SECONDS', 0)
+
+    key = cache_key(view_name, params)
+    current = generation()
+    entry = _cache().get(key)
+    if entry is not None:
+        entry_generation, computed_at, data = entry
+        if entry_generation == current and time.time() - computed_at < ttl:
+            logger.debug(f"Report cache hit: {view_name}")
+            return data
+        if stale_seconds:
+            # Entries outlive their TTL by the stale window; serve this one and refresh behind it
+            _revalidate(key, view_name, compute, ttl + stale_seconds)
+            return data
+
+    logger.debug(f"Report cache miss: {view_name}")
+    return _store(key, current, compute, ttl + stale_seconds)
+
+
+def _store(key: str, current: int, compute: Callable[[], Dict], timeout: int) -> Dict:
+    # `current` is read before computing, so writes made meanwhile leave the entry stale
+    data = compute()
+    _cache().set(key, (current, time.time(), data), timeout=timeout)
+    return data
+
+
+def _revalidate(key: str, view_name: str, compute: Callable[[], Dict], timeout: int):
+    lock_key = f'{key}:refresh'
+    if not _cache().add(lock_key, 1, timeout=REFRESH_LOCK_SECONDS):
+        return  # another request is already refreshing this entry
+
+    def refresh():
+        try:
+            _store(key, generation(), compute, timeout)
+            logger.debug(f"Report cache refreshed: {view_name}")
+        except Exception as e:
+            logger.error(f"Report cache refresh failed for {view_name}: {str(e)}")
+        finally:
+            _cache().delete(lock_key)
+            connection.close()  # the thread's own connection
+
+    threading.Thread(target=refresh, name=f'report-refresh-{view_name}', daemon=True).start()
@@ -0,0 +1,115 @@
+"""
+Signal handlers
+Keep the KPI snapshot counters in step with Lead writes, carry stage category
+changes onto the leads' denormalized stage_category, queue lead metric days
+that deletes and project-interest edits change, and invalidate cached report
+pages when the data behind them changes.
+"""
+import logging
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import kpi, lead_metrics, report_cache
+from .models import Lead, LeadDailyMetric, LeadNote, LeadStage, LeadStageHistory, MarketingExpense
+
+logger = logging.getLogger(__name__)
+
+
+def _state(stage_id, follow_up_date, categories):
+    return categories.get(stage_id), follow_up_date
+
+
+def _categories(*stage_ids):
+    stage_ids = {stage_id for stage_id in stage_ids if stage_id}
+    if not stage_ids:
+        return {}
+    return dict(LeadStage.objects.filter(id__in=stage_ids).values_list('id', 'category'))
+
+
+@receiver(post_save, sender=Lead)
+def update_kpis_on_lead_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not {'current_stage', 'current_stage_id', 'follow_up_date'} & set(update_fields):
+        return
+
+    after = (instance.current_stage_id, instance.follow_up_date)
+    before = None if created else getattr(instance, '_loaded_kpi_state', None)
+    if not created and (before is None or before == after):
+        # Unchanged, or an instance whose loaded state is unknown (left to the reconciler)
+        instance._loaded_kpi_state = after
+        return
+
+    categories = _categories(after[0], before[0] if before else None)
+    kpi.adjust(kpi.lead_deltas(
+        before=_state(*before, categories) if before else None,
+        after=_state(*after, categories)
+    ))
+    instance._loaded_kpi_state = after
+
+
+@receiver(post_delete, sender=Lead)
+def update_kpis_on_lead_delete(sender, instance, **kwargs):
+    state = getattr(instance, '_loaded_kpi_state', None)
+    if state is None:
+        return
+    kpi.adjust(kpi.lead_deltas(before=_state(*state, _categories(state[0]))))
+
+
+@receiver(pre_save, sender=LeadStage)
+def remember_stage_category(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._previous_category = LeadStage.objects.filter(pk=instance.pk).values_list('category', flat=True).first()
+
+
+@receiver(post_save, sender=LeadStage)
+def sync_stage_category(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_category', None)
+    if raw or created or previous is None or previous == instance.category:
+        return
+    leads = Lead.objects.filter(current_stage=instance).update(stage_category=instance.category)
+    LeadDailyMetric.objects.filter(stage=instance).update(stage_category=instance.category)
+    instance._previous_category = instance.category
+    report_cache.bump()
+    # KPI category counters catch up on the next reconcile
+    logger.info(f"Stage {instance.name} moved from {previous} to {instance.category}: {leads} leads updated")
+
+
+@receiver(pre_delete, sender=LeadStage)
+def clear_stage_category(sender, instance, **kwargs):
+    # on_delete=SET_NULL clears current_stage with a bulk update that skips Lead.save()
+    Lead.objects.filter(current_stage=instance).update(stage_category='')
+
+
+@receiver(post_delete, sender=Lead)
+def queue_metrics_on_lead_delete(sender, instance, **kwargs):
+    lead_metrics.mark_dirty([instance.created_at])
+
+
+@receiver(post_delete, sender=LeadStageHistory)
+def queue_metrics_on_history_delete(sender, instance, **kwargs):
+    lead_metrics.mark_dirty([instance.changed_at])
+
+
+@receiver(m2m_changed, sender=Lead.interested_projects.through)
+def queue_metrics_on_project_interest(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        lead_ids = [instance.pk]
+    elif action == 'pre_clear':
+        lead_ids = instance.interested_leads.values_list('id', flat=True)
+    else:
+        lead_ids = pk_set or []
+    lead_metrics.mark_leads_dirty(lead_ids)
+
+
+@receiver([post_save, post_delete], sender=Lead)
+@receiver([post_save, post_delete], sender=LeadStageHistory)
+@receiver([post_save, post_delete], sender=LeadNote)
+@receiver([post_save, post_delete], sender=MarketingExpense)
+def invalidate_report_cache(sender, raw=False, **kwargs):
+    if not raw:
+        report_cache.bump()
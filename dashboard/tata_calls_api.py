@@ -1,8 +1,8 @@
-import requests
 import json
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.utils import timezone
+from .tata_http import get_client
 
 class TATACallsAPI:
     """TATA API integration for call details, recordings, and reports"""
@@ -14,6 +14,7 @@ class TATACallsAPI:
         self.whatsapp_token = getattr(settings, 'TATA_WHATSAPP_TOKEN', '')
         self.phone_number = getattr(settings, 'TATA_PHONE_NUMBER', '+919355421616')
         self.phone_number_id = getattr(settings, 'TATA_PHONE_NUMBER_ID', '100551679754887')
+        self.http = get_client()
     
     def get_headers(self):
         """Get authorization headers"""
@@ -45,7 +46,7 @@ class TATACallsAPI:
                 'limit': limit
             }
             
-            response = requests.get(url, params=params, headers=self.get_headers())
+            response = self.http.get(url, params=params, headers=self.get_headers())
             
             if response.status_code == 200:
                 return response.json()
@@ -58,7 +59,7 @@ class TATACallsAPI:
         """Fetch active/live calls"""
         try:
             url = f"{self.base_url}/live_calls"
-            response = requests.get(url, headers=self.get_headers())
+            response = self.http.get(url, headers=self.get_headers())
             
             if response.status_code == 200:
                 return {'success': True, 'data': response.json()}
@@ -71,7 +72,7 @@ class TATACallsAPI:
         """Get recording upload status"""
         try:
             url = f"{self.base_url}/recording/batch_status/{batch_id}"
-            response = requests.get(url, headers=self.get_headers())
+            response = self.http.get(url, headers=self.get_headers())
             
             if response.status_code == 200:
                 return response.json()
@@ -93,7 +94,7 @@ class TATACallsAPI:
                 'call_end_min': str(duration)
             }
             
-            response = requests.post(url, json=payload, headers=self.get_headers())
+            response = self.http.post(url, json=payload, headers=self.get_headers())
             
             if response.status_code == 200:
                 return response.json()
@@ -106,7 +107,7 @@ class TATACallsAPI:
         """Fetch all time groups"""
         try:
             url = f"{self.base_url}/timegroups"
-            response = requests.get(url, headers=self.get_headers())
+            response = self.http.get(url, headers=self.get_headers())
             
             if response.status_code == 200:
                 return {'success': True, 'data': response.json()}
@@ -173,7 +174,7 @@ class TATACallsAPI:
                 "text": {"body": message_text}
             }
             
-            response = requests.post(url, json=payload, headers=self.get_whatsapp_headers())
+            response = self.http.post(url, json=payload, headers=self.get_whatsapp_headers())
             
             if response.status_code == 200:
                 return {'success': True, 'data': response.json()}
@@ -186,7 +187,7 @@ class TATACallsAPI:
         """Get WhatsApp messages"""
         try:
             url = f"{self.whatsapp_url}/v1/{self.phone_number_id}/messages"
-            response = requests.get(url, headers=self.get_whatsapp_headers())
+            response = self.http.get(url, headers=self.get_whatsapp_headers())
             
             if response.status_code == 200:
                 return {'success': True, 'data': response.json()}
@@ -15,8 +15,9 @@ from datetime import datetime, timedelta
 import json
 import csv
 import logging
-from .models import Lead, Project, WhatsAppMessage
+from .models import Lead, Project, WhatsAppMessage, WhatsAppCampaignJob
 from .tata_whatsapp_service import TataWhatsAppCampaignService, TataWhatsAppService
+from .whatsapp_campaign_queue import WhatsAppCampaignQueue
 
 logger = logging.getLogger(__name__)
 
@@ -110,10 +111,34 @@ def run_whatsapp_campaign(request):
         if header_media_type and header_media_type not in ['image', 'video', 'document']:
             return JsonResponse({'success': False, 'error': 'Invalid media type. Use: image, video, document'})
         
+        if not dry_run:
+            # Live sends are handed to the process_whatsapp_campaigns worker
+            queue = WhatsAppCampaignQueue()
+            job = queue.enqueue(
+                template_name=template_name,
+                from_date=from_date,
+                to_date=to_date,
+                project_names=project_names,
+                language=language,
+                header_media_url=header_media_url or None,
+                header_media_type=header_media_type or None,
+                limit=limit,
+                user=request.user
+            )
+            
+            logger.info(f"WhatsApp campaign job {job.id} queued by {request.user.username}")
+            
+            return JsonResponse({
+                'success': True,
+                'queued': True,
+                'job_id': job.id,
+                'results': queue.job_results(job, include_messages=False)
+            })
+        
         # Initialize campaign service
         campaign_service = TataWhatsAppCampaignService()
         
-        # Run campaign
+        # Dry runs send nothing, so they still execute inline
         results = campaign_service.run_campaign(
             project_names=project_names,
             from_date=from_date,
@@ -303,6 +328,39 @@ def campaign_status(request, campaign_id=None):
         logger.error(f"Status check error: {str(e)}")
         return JsonResponse({'success': False, 'error': str(e)})
 
+def _visible_campaign_jobs(user):
+    """Campaign jobs a user may see or cancel: their own, or every job for staff"""
+    jobs = WhatsAppCampaignJob.objects.all()
+    return jobs if user.is_staff else jobs.filter(created_by=user)
+
+@login_required
+def campaign_job_status(request, job_id):
+    """Progress of a queued campaign job"""
+    
+    try:
+        job = _visible_campaign_jobs(request.user).get(id=job_id)
+    except WhatsAppCampaignJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Campaign job not found'}, status=404)
+    
+    # The per-recipient lists are only needed for CSV exports
+    results = WhatsAppCampaignQueue().job_results(job, include_messages=False)
+    
+    return JsonResponse({
+        'success': True,
+        'results': results
+    })
+
+@login_required
+@require_http_methods(["POST"])
+def cancel_campaign_job(request, job_id):
+    """Stop a queued or running campaign job after its current batch"""
+    
+    updated = _visible_campaign_jobs(request.user).filter(
+        id=job_id, status__in=['queued', 'running']
+    ).update(status='cancelled', completed_at=timezone.now())
+    
+    return JsonResponse({'success': bool(updated)})
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def webhook_delivery_status(request):
@@ -312,44 +370,10 @@ def webhook_delivery_status(request):
         # Parse webhook payload
         data = json.loads(request.body)
         
-        # Extract status information (based on Tata webhook format)
-        statuses = data.get('statuses', [])
-        
-        for status_data in statuses:
-            message_id = status_data.get('id')
-            status = status_data.get('status')  # sent, delivered, read, failed
-            timestamp = status_data.get('timestamp')
-            recipient_id = status_data.get('recipient_id')
-            
-            if not message_id or not status:
-                continue
-            
-            # Find and update message record
-            try:
-                whatsapp_msg = WhatsAppMessage.objects.get(message_id=message_id)
-                whatsapp_msg.status = status
-                
-                # Update timestamps based on status
-                status_time = datetime.fromtimestamp(int(timestamp)) if timestamp else timezone.now()
-                
-                if status == 'delivered' and not whatsapp_msg.delivered_at:
-                    whatsapp_msg.delivered_at = status_time
-                elif status == 'read' and not whatsapp_msg.read_at:
-                    whatsapp_msg.read_at = status_time
-                elif status == 'failed' and not whatsapp_msg.failed_at:
-                    whatsapp_msg.failed_at = status_time
-                    # Extract failure reason if available
-                    error_info = status_data.get('errors', [])
-                    if error_info:
-                        whatsapp_msg.failure_reason = str(error_info[0])
-                
-                whatsapp_msg.save()
-                
-                logger.info(f"Updated message {message_id} status to {status}")
-                
-            except WhatsAppMessage.DoesNotExist:
-                logger.warning(f"WhatsApp message not found for ID: {message_id}")
-                continue
+        # Same inbox and batched, regression-safe path as the main WhatsApp webhook
+        from .tata_webhook_handler import enqueue_webhook, webhook_handler
+        if not enqueue_webhook('whatsapp_status', data, request.body):
+            webhook_handler.handle_delivery_status(data)
         
         return JsonResponse({'success': True})
         
@@ -0,0 +1,159 @@
+"""
+Shared HTTP client for the Tata APIs
+One pooled keep-alive requests.Session per process with per-host connection
+limits, default timeouts, retries with backoff on 429/5xx and per-endpoint
+latency stats, used by every Tata WhatsApp, IVR and call records integration.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+ID_SEGMENT = re.compile(r'/(?=[^/]*\d)[^/]+')
+
+
+def endpoint_label(method: str, url: str) -> str:
+    """METHOD host/path with id-like path segments collapsed, e.g. 'GET api.example.com/recording/batch_status/:id'"""
+    parsed = urlparse(url)
+    return f"{method.upper()} {parsed.netloc}{ID_SEGMENT.sub('/:id', parsed.path)}"
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'retries': self.retries,
+            'avg_ms': round(1000 * self.total_seconds / self.count, 1) if self.count else 0.0,
+            'max_ms': round(1000 * self.max_seconds, 1),
+        }
+
+
+class TataHTTPClient:
+    """Pooled session with uniform timeouts, 429/5xx retries and latency stats
+
+    POSTs (message sends) are only retried on 429 or when the connection could not
+    be opened, so a send the provider may have accepted is never repeated.
+    """
+
+    def __init__(self, pool_size: int = None, connect_timeout: float = None, read_timeout: float = None,
+                 retries: int = None, backoff: float = None):
+        self.timeout = (
+            connect_timeout or getattr(settings, 'TATA_HTTP_CONNECT_TIMEOUT', 5),
+            read_timeout or getattr(settings, 'TATA_HTTP_READ_TIMEOUT', 30),
+        )
+        self.retries = getattr(settings, 'TATA_HTTP_RETRIES', 3) if retries is None else retries
+        self.backoff = getattr(settings, 'TATA_HTTP_BACKOFF', 0.5) if backoff is None else backoff
+        self.slow_seconds = getattr(settings, 'TATA_HTTP_SLOW_SECONDS', 5)
+
+        # pool_block caps open connections per host; extra threads wait for a free one
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=pool_size or getattr(settings, 'TATA_HTTP_POOL_SIZE', 10),
+            pool_block=True,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def request(self, method: str, url: str, endpoint: str = None, **kwargs) -> requests.Response:
+        method = method.upper()
+        label = endpoint or endpoint_label(method, url)
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                self._record(label, time.monotonic() - started, error=True, retried=attempt > 0)
+                safe = method in IDEMPOTENT_METHODS or isinstance(e, requests.ConnectTimeout)
+                if safe and attempt < self.retries:
+                    attempt += 1
+                    logger.warning(f"{label} failed ({str(e)}), retry {attempt}/{self.retries}")
+                    time.sleep(self._delay(attempt))
+                    continue
+                raise
+
+            elapsed = time.monotonic() - started
+            self._record(label, elapsed, error=response.status_code >= 400, retried=attempt > 0)
+            if elapsed > self.slow_seconds:
+                logger.warning(f"Slow Tata API call {label}: {elapsed:.2f}s")
+
+            retryable = response.status_code == 429 or (
+                response.status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+            )
+            if not retryable or attempt >= self.retries:
+                return response
+
+            attempt += 1
+            delay = self._delay(attempt, response.headers.get('Retry-After'))
+            logger.warning(f"{label} returned {response.status_code}, retry {attempt}/{self.retries} in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request('HEAD', url, **kwargs)
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff, or the provider's Retry-After seconds when it sends them"""
+        try:
+            if retry_after:
+                return min(float(retry_after), 60.0)
+        except ValueError:
+            pass
+        return self.backoff * (2 ** (attempt - 1))
+
+    def _record(self, label: str, seconds: float, error: bool, retried: bool):
+        with self._stats_lock:
+            stats = self._stats.setdefault(label, EndpointStats())
+            stats.count += 1
+            stats.errors += int(error)
+            stats.retries += int(retried)
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-endpoint call counts and latency for this process"""
+        with self._stats_lock:
+            return {label: stats.as_dict() for label, stats in sorted(self._stats.items())}
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_client() -> TataHTTPClient:
+    """Process-wide client, so every Tata integration shares one connection pool"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = TataHTTPClient()
+        return _shared_client
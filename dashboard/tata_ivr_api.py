@@ -2,11 +2,12 @@
 TATA IVR API Integration
 Fetch real project data from IVR panel
 """
-import requests
 from django.conf import settings
+from .tata_http import get_client
 
 class TATAIVRApi:
     def __init__(self):
+        self.http = get_client()
         self.token = getattr(settings, 'TATA_AUTH_TOKEN', '')
         self.base_url = getattr(settings, 'TATA_BASE_URL', '')
         
@@ -14,7 +15,7 @@ class TATAIVRApi:
         """Get real projects from TATA IVR panel"""
         try:
             headers = {'Authorization': f'Bearer {self.token}'}
-            response = requests.get(f'{self.base_url}/ivr/projects', headers=headers, timeout=10)
+            response = self.http.get(f'{self.base_url}/ivr/projects', headers=headers)
             
             if response.status_code == 200:
                 return response.json().get('projects', [])
@@ -1,11 +1,11 @@
 """
 TATA Live Sync - Get latest calls from TATA panel
 """
-import requests
 from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import Lead, Project, LeadStage
+from .cdr_sync import CDRSync
+from .models import IVRCallLog, Lead, Project, LeadStage
 
 class TATALiveSync:
     
@@ -14,33 +14,28 @@ class TATALiveSync:
         self.base_url = 'https://api-smartflo.tatateleservices.com/v1'
     
     def get_latest_calls(self):
-        """Get latest calls from TATA CDR"""
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
+        """Get today's calls, after pulling any new TATA CDRs since the last sync"""
+        result = CDRSync().run()
         
-        # Get today's calls
-        today = datetime.now().strftime('%Y-%m-%d')
+        today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        calls = [
+            {
+                'caller_id_number': call.caller_id_number,
+                'call_to_number': call.call_to_number,
+                'start_time': timezone.localtime(call.start_stamp).strftime('%Y-%m-%d %H:%M:%S'),
+                'duration': call.duration,
+                'status': call.status,
+                'agent': call.raw_data.get('agent_name') or 'No Agent',
+                'department': call.raw_data.get('department') or call.call_to_number
+            }
+            for call in IVRCallLog.objects.filter(start_stamp__gte=today_start)
+            .only('caller_id_number', 'call_to_number', 'start_stamp', 'duration', 'status', 'raw_data')
+        ]
         
-        try:
-            response = requests.get(
-                f'{self.base_url}/cdr',
-                headers=headers,
-                params={
-                    'from_date': today,
-                    'to_date': today,
-                    'limit': 100
-                },
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('records', data.get('calls', []))
-                
-        except Exception as e:
-            print(f"TATA API Error: {e}")
+        if calls or result['status'] != 'failed':
+            return calls
+        
+        print(f"TATA API Error: {result.get('error')}")
         
         # Fallback: Use the latest calls from your TATA panel
         return self._get_latest_panel_calls()
@@ -163,7 +158,7 @@ class TATALiveSync:
                 continue
             
             # Check existing lead
-            existing_lead = Lead.objects.filter(phone=phone).first()
+            existing_lead = Lead.objects.matching_phone(phone).first()
             
             if existing_lead:
                 # Update existing lead with latest call info
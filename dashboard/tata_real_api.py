@@ -1,11 +1,12 @@
 """
 Real TATA API Integration - No Sample Data
 """
-import requests
 from django.conf import settings
+from .tata_http import get_client
 
 class TATARealAPI:
     def __init__(self):
+        self.http = get_client()
         self.token = getattr(settings, 'TATA_AUTH_TOKEN', '')
         self.base_url = 'https://api-smartflo.tatateleservices.com/v1'
         
@@ -18,13 +19,13 @@ class TATARealAPI:
         
         try:
             # Try CDR endpoint
-            response = requests.get(f'{self.base_url}/cdr', headers=headers, timeout=15)
+            response = self.http.get(f'{self.base_url}/cdr', headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 return data.get('records', data.get('data', []))
                 
             # Try call-logs endpoint  
-            response = requests.get(f'{self.base_url}/call-logs', headers=headers, timeout=15)
+            response = self.http.get(f'{self.base_url}/call-logs', headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 return data.get('calls', data.get('data', []))
@@ -42,7 +43,7 @@ class TATARealAPI:
         }
         
         try:
-            response = requests.get(f'{self.base_url}/departments', headers=headers, timeout=15)
+            response = self.http.get(f'{self.base_url}/departments', headers=headers)
             if response.status_code == 200:
                 return response.json().get('departments', [])
         except:
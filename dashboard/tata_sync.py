@@ -3,10 +3,12 @@ import json
 from django.conf import settings
 from django.utils import timezone
 from .models import WhatsAppMessage, WhatsAppTemplate, Lead, LeadNote
+from .tata_http import get_client
 from datetime import datetime, timedelta
 
 class TATASync:
     def __init__(self):
+        self.http = get_client()
         self.base_url = "https://wb.omni.tatatelebusiness.com"
         self.headers = {
             'Authorization': f'Bearer {settings.TATA_AUTH_TOKEN}',
@@ -38,7 +40,7 @@ class TATASync:
             
             for url in possible_endpoints:
                 try:
-                    response = requests.get(url, headers=self.headers, timeout=10)
+                    response = self.http.get(url, headers=self.headers)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -178,14 +180,14 @@ class TATASync:
                 }
             }
             
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self.http.post(url, headers=self.headers, json=payload)
             
             if response.status_code == 200:
                 result = response.json()
                 message_id = result.get('id')
                 
                 # Find or create lead for this phone number
-                lead = Lead.objects.filter(phone=to_number).first()
+                lead = Lead.objects.matching_phone(to_number).first()
                 if not lead:
                     lead = Lead.objects.create(
                         name=f"WhatsApp Lead {to_number}",
@@ -224,14 +226,14 @@ class TATASync:
                 }
             }
             
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self.http.post(url, headers=self.headers, json=payload)
             
             if response.status_code == 200:
                 result = response.json()
                 message_id = result.get('id')
                 
                 # Find or create lead for this phone number
-                lead = Lead.objects.filter(phone=to_number).first()
+                lead = Lead.objects.matching_phone(to_number).first()
                 if not lead:
                     lead = Lead.objects.create(
                         name=f"WhatsApp Lead {to_number}",
@@ -271,7 +273,7 @@ class TATASync:
                 
                 if latest_message:
                     # Get lead info if exists
-                    lead = Lead.objects.filter(phone=phone_number).first()
+                    lead = Lead.objects.matching_phone(phone_number).first()
                     
                     conversations.append({
                         'phone_number': phone_number,
@@ -2,27 +2,95 @@
 Tata WhatsApp Webhook Handler
 Handles delivery status updates and message events
 """
+import atexit
 import json
 import logging
 import hashlib
 import hmac
+import threading
 from datetime import datetime
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
+from . import report_cache, webhook_inbox
 from .models import WhatsAppMessage, Lead, LeadNote
 import requests
 
 logger = logging.getLogger(__name__)
 
+# Lifecycle order of message statuses; a status never moves backwards
+STATUS_RANK = {'pending': 0, 'sent': 1, 'delivered': 2, 'read': 3, 'failed': 3}
+STATUS_TIMESTAMP_FIELDS = {'pending': 'sent_at', 'sent': 'sent_at', 'delivered': 'delivered_at', 'read': 'read_at', 'failed': 'failed_at'}
+
+
+class DeliveryStatusBatcher:
+    """Holds status events for a short window so bursts of webhooks are applied in one batch
+    
+    Events still held when the process dies are lost, so keep the window short.
+    """
+    
+    def __init__(self, handler, window, max_events):
+        self.handler = handler
+        self.window = window
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        atexit.register(self.flush)
+    
+    def add(self, statuses):
+        with self._lock:
+            self._pending.extend(statuses)
+            if len(self._pending) >= self.max_events:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self._flush_from_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._apply(batch)
+    
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._apply(batch)
+    
+    def _take(self):
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+    
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()  # the timer thread's own connection
+    
+    def _apply(self, batch):
+        try:
+            self.handler.apply_statuses(batch)
+        except Exception as e:
+            logger.error(f"Error applying {len(batch)} batched WhatsApp statuses: {str(e)}")
+
+
 class TataWebhookHandler:
     """Handle Tata WhatsApp webhooks for delivery status and messages"""
     
     def __init__(self):
         self.verify_token = getattr(settings, 'WHATSAPP_WEBHOOK_VERIFY_TOKEN', '')
+        window = getattr(settings, 'WHATSAPP_STATUS_BATCH_SECONDS', 0)
+        self.status_batcher = DeliveryStatusBatcher(
+            self, window, getattr(settings, 'WHATSAPP_STATUS_BATCH_SIZE', 500)
+        ) if window else None
     
     def verify_webhook_signature(self, payload, signature):
         """Verify webhook signature using partner token"""
@@ -46,71 +114,95 @@ class TataWebhookHandler:
             return False
     
     def handle_delivery_status(self, webhook_data):
-        """Handle message delivery status updates"""
-        try:
-            statuses = webhook_data.get('statuses', [])
-            updated_count = 0
+        """Handle message delivery status updates
+        
+        With WHATSAPP_STATUS_BATCH_SECONDS set, statuses are held briefly and applied
+        together with those of other webhooks arriving in the same window.
+        """
+        statuses = webhook_data.get('statuses', [])
+        if self.status_batcher:
+            self.status_batcher.add(statuses)
+            return {'updated_count': 0, 'queued_count': len(statuses)}
+        return self.apply_statuses(statuses)
+    
+    def apply_statuses(self, statuses):
+        """Apply a batch of status events: one lookup query, one bulk update, one bulk note insert"""
+        events = []
+        for status_data in statuses:
+            message_id = status_data.get('id')
+            status = status_data.get('status')  # sent, delivered, read, failed
+            if not message_id or status not in STATUS_RANK:
+                logger.warning(f"Invalid status data: {status_data}")
+                continue
+            timestamp = status_data.get('timestamp')
+            try:
+                status_time = timezone.make_aware(datetime.fromtimestamp(int(timestamp))) if timestamp else timezone.now()
+            except (TypeError, ValueError, OverflowError):
+                status_time = timezone.now()
+            events.append((message_id, status, status_time, status_data))
+        
+        # Per message, apply events in lifecycle order so a batch holding both delivered and read ends at read
+        events.sort(key=lambda event: (event[0], STATUS_RANK[event[1]], event[2]))
+        
+        updated_count = ignored_count = 0
+        with transaction.atomic():
+            messages = {}
+            for message in (
+                WhatsAppMessage.objects.select_for_update()
+                .filter(message_id__in={event[0] for event in events})
+                .only('id', 'lead_id', 'message_id', 'status', 'sent_at', 'delivered_at', 'read_at', 'failed_at', 'failure_reason')
+                .order_by('id')
+            ):
+                messages.setdefault(message.message_id, []).append(message)
             
-            for status_data in statuses:
-                message_id = status_data.get('id')
-                status = status_data.get('status')  # sent, delivered, read, failed
-                timestamp = status_data.get('timestamp')
-                recipient_id = status_data.get('recipient_id')
-                custom_callback_data = status_data.get('custom_callback_data')
-                
-                if not message_id or not status:
-                    logger.warning(f"Invalid status data: {status_data}")
+            changed = {}
+            notes = []
+            for message_id, status, status_time, status_data in events:
+                if message_id not in messages:
+                    logger.warning(f"WhatsApp message not found for ID: {message_id}")
                     continue
-                
-                # Find message record
-                try:
-                    whatsapp_msg = WhatsAppMessage.objects.get(message_id=message_id)
-                    
-                    # Update status
-                    old_status = whatsapp_msg.status
-                    whatsapp_msg.status = status
-                    
-                    # Update timestamps
-                    if timestamp:
-                        status_time = datetime.fromtimestamp(int(timestamp))
-                        status_time = timezone.make_aware(status_time)
-                    else:
-                        status_time = timezone.now()
-                    
-                    if status == 'delivered' and not whatsapp_msg.delivered_at:
-                        whatsapp_msg.delivered_at = status_time
-                    elif status == 'read' and not whatsapp_msg.read_at:
-                        whatsapp_msg.read_at = status_time
-                    elif status == 'failed' and not whatsapp_msg.failed_at:
-                        whatsapp_msg.failed_at = status_time
-                        
-                        # Extract failure reason
+                for whatsapp_msg in messages[message_id]:
+                    timestamp_field = STATUS_TIMESTAMP_FIELDS[status]
+                    if getattr(whatsapp_msg, timestamp_field) is None:
+                        setattr(whatsapp_msg, timestamp_field, status_time)
+                        changed[whatsapp_msg.pk] = whatsapp_msg
                         errors = status_data.get('errors', [])
-                        if errors:
+                        if status == 'failed' and errors:
                             error_info = errors[0]
                             whatsapp_msg.failure_reason = f"{error_info.get('code', 'UNKNOWN')}: {error_info.get('title', 'Unknown error')}"
                     
-                    whatsapp_msg.save()
-                    updated_count += 1
+                    if STATUS_RANK[status] <= STATUS_RANK.get(whatsapp_msg.status, 0):
+                        # Duplicate or out-of-order callback (e.g. delivered after read)
+                        ignored_count += 1
+                        continue
                     
-                    logger.info(f"Updated message {message_id}: {old_status} -> {status}")
+                    logger.debug(f"Updated message {message_id}: {whatsapp_msg.status} -> {status}")
+                    whatsapp_msg.status = status
+                    changed[whatsapp_msg.pk] = whatsapp_msg
+                    updated_count += 1
                     
-                    # Create lead note for status change
-                    if whatsapp_msg.lead and status in ['delivered', 'read', 'failed']:
-                        self.create_status_note(whatsapp_msg, status, status_time)
-                
-                except WhatsAppMessage.DoesNotExist:
-                    logger.warning(f"WhatsApp message not found for ID: {message_id}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error updating message {message_id}: {str(e)}")
-                    continue
-            
-            return {'updated_count': updated_count}
+                    # Lead note for status change
+                    if whatsapp_msg.lead_id and status in ['delivered', 'read', 'failed']:
+                        notes.append(self.build_status_note(whatsapp_msg, status))
             
-        except Exception as e:
-            logger.error(f"Error handling delivery status: {str(e)}")
-            raise
+            WhatsAppMessage.objects.bulk_update(
+                changed.values(),
+                ['status', 'sent_at', 'delivered_at', 'read_at', 'failed_at', 'failure_reason'],
+                batch_size=500
+            )
+        
+        # Notes go in their own transaction so a failed insert can't roll back the statuses
+        if notes:
+            try:
+                with transaction.atomic():
+                    LeadNote.objects.bulk_create(notes, batch_size=500)
+                    # bulk_create skips the post_save cache invalidation
+                    report_cache.bump()
+            except Exception as e:
+                logger.error(f"Error adding {len(notes)} WhatsApp status notes: {str(e)}")
+        
+        logger.info(f"Applied {len(events)} WhatsApp statuses: {updated_count} updated, {ignored_count} ignored")
+        return {'updated_count': updated_count, 'ignored_count': ignored_count}
     
     def handle_incoming_message(self, webhook_data):
         """Handle incoming WhatsApp messages from users"""
@@ -173,52 +265,27 @@ class TataWebhookHandler:
             logger.error(f"Error handling incoming message: {str(e)}")
             raise
     
-    def create_status_note(self, whatsapp_msg, status, timestamp):
-        """Create lead note for WhatsApp status updates"""
-        try:
-            status_messages = {
-                'delivered': 'WhatsApp message delivered',
-                'read': 'WhatsApp message read by customer',
-                'failed': f'WhatsApp message failed: {whatsapp_msg.failure_reason}'
-            }
-            
-            note_content = status_messages.get(status, f'WhatsApp status: {status}')
-            
-            LeadNote.objects.create(
-                lead=whatsapp_msg.lead,
-                call_type='whatsapp',
-                call_outcome=status,
-                note=note_content,
-                created_by_id=1  # System user
-            )
-            
-        except Exception as e:
-            logger.error(f"Error creating status note: {str(e)}")
+    def build_status_note(self, whatsapp_msg, status):
+        """Unsaved lead note for a WhatsApp status update"""
+        status_messages = {
+            'delivered': 'WhatsApp message delivered',
+            'read': 'WhatsApp message read by customer',
+            'failed': f'WhatsApp message failed: {whatsapp_msg.failure_reason}'
+        }
+        
+        return LeadNote(
+            lead_id=whatsapp_msg.lead_id,
+            call_type='whatsapp',
+            call_outcome=status,
+            note=status_messages.get(status, f'WhatsApp status: {status}'),
+            created_by_id=1  # System user
+        )
     
     def find_lead_by_phone(self, phone_number):
-        """Find lead by phone number with fuzzy matching"""
+        """Find lead by phone number in any format"""
         try:
-            # Clean phone number
-            clean_phone = phone_number.replace('+91', '').replace(' ', '').replace('-', '')
-            
-            # Try exact match first
-            lead = Lead.objects.filter(phone=phone_number).first()
-            if lead:
-                return lead
-            
-            # Try with +91 prefix
-            lead = Lead.objects.filter(phone=f'+91{clean_phone}').first()
-            if lead:
-                return lead
-            
-            # Try fuzzy match on last 10 digits
-            if len(clean_phone) >= 10:
-                last_10 = clean_phone[-10:]
-                lead = Lead.objects.filter(phone__icontains=last_10).first()
-                if lead:
-                    return lead
-            
-            return None
+            # Any format of the number resolves to the same indexed phone_key
+            return Lead.objects.matching_phone(phone_number).first()
             
         except Exception as e:
             logger.error(f"Error finding lead by phone {phone_number}: {str(e)}")
@@ -227,6 +294,13 @@ class TataWebhookHandler:
 # Webhook view functions
 webhook_handler = TataWebhookHandler()
 
+def enqueue_webhook(source, webhook_data, body):
+    """Store a webhook in the inbox; returns its idempotency key, or None when it must be processed inline"""
+    messages = webhook_data.get('messages')
+    event_id = messages.get('id', '') if source == 'whatsapp_message' and isinstance(messages, dict) else ''
+    key = webhook_inbox.idempotency_key(source, event_id, body)
+    return key if webhook_inbox.accept(source, webhook_data, key) else None
+
 @csrf_exempt
 @require_http_methods(["POST", "GET"])
 def whatsapp_webhook(request):
@@ -257,6 +331,12 @@ def whatsapp_webhook(request):
             webhook_data = json.loads(request.body)
             
             # Determine webhook type and handle accordingly
+            source = 'whatsapp_status' if 'statuses' in webhook_data else 'whatsapp_message' if 'messages' in webhook_data else None
+            if source:
+                key = enqueue_webhook(source, webhook_data, request.body)
+                if key:
+                    return JsonResponse({'success': True, 'accepted': key})
+            
             if 'statuses' in webhook_data:
                 # Delivery status update
                 result = webhook_handler.handle_delivery_status(webhook_data)
@@ -294,6 +374,9 @@ def whatsapp_delivery_webhook(request):
         
         # Parse and handle delivery status
         webhook_data = json.loads(request.body)
+        key = enqueue_webhook('whatsapp_status', webhook_data, request.body)
+        if key:
+            return JsonResponse({'success': True, 'accepted': key})
         result = webhook_handler.handle_delivery_status(webhook_data)
         
         return JsonResponse({'success': True, 'updated': result['updated_count']})
@@ -316,6 +399,9 @@ def whatsapp_message_webhook(request):
         
         # Parse and handle incoming message
         webhook_data = json.loads(request.body)
+        key = enqueue_webhook('whatsapp_message', webhook_data, request.body)
+        if key:
+            return JsonResponse({'success': True, 'accepted': key})
         result = webhook_handler.handle_incoming_message(webhook_data)
         
         return JsonResponse({'success': True, 'result': result})
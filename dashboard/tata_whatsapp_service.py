@@ -10,14 +10,72 @@ from datetime import datetime, timedelta
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
-from .models import Lead, Project, WhatsAppMessage, IVRCallLog
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+from .models import Lead, Project, WhatsAppMessage, WhatsAppOptOut, IVRCallLog
+from . import phone_numbers
+from .tata_http import get_client
 import re
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from urllib.parse import urlparse
 import mimetypes
 
 logger = logging.getLogger(__name__)
 
+
+class TokenBucket:
+    """Thread-safe token bucket limiter shared by all WhatsApp senders"""
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate  # tokens added per second
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def acquire(self) -> float:
+        """Block until a token is available, return seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                sleep_time = (1 - self.tokens) / self.rate
+            time.sleep(sleep_time)
+            waited += sleep_time
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter() -> TokenBucket:
+    """Process-wide limiter sized from the provider's WHATSAPP_DAILY_LIMIT
+
+    The bucket lives in this process only. The daily quota spread evenly over the day
+    is split across WHATSAPP_SENDER_PROCESSES, so that setting must match the number
+    of processes sending campaigns (one campaign worker by default).
+    """
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            daily_limit = getattr(settings, 'WHATSAPP_DAILY_LIMIT', 100000)
+            processes = max(getattr(settings, 'WHATSAPP_SENDER_PROCESSES', 1), 1)
+            rate = float(daily_limit) / 86400 / processes
+            burst = getattr(settings, 'WHATSAPP_RATE_LIMIT_BURST', 1)
+            _shared_limiter = TokenBucket(rate=rate, capacity=burst)
+        return _shared_limiter
+
+
 class TataWhatsAppService:
     """Production WhatsApp service using exact Tata API specifications"""
     
@@ -41,6 +99,7 @@ class TataWhatsAppService:
     }
     
     def __init__(self):
+        self.http = get_client()
         self.base_url = settings.TATA_BASE_URL
         self.auth_token = settings.TATA_AUTH_TOKEN
         self.whatsapp_number = settings.WHATSAPP_PHONE_NUMBER
@@ -49,30 +108,12 @@ class TataWhatsAppService:
             'Content-Type': 'application/json'
         }
         
-        # Rate limiting: 100k/24h = ~1.15 msg/sec, using 0.8 msg/sec for safety
-        self.rate_limit_delay = 1.25  # seconds between messages
-        self.last_send_time = 0
+        # Rate limiting: 100k/24h = ~1.15 msg/sec across every sending process
+        self.rate_limiter = get_shared_rate_limiter()
         
     def validate_phone_number(self, phone: str) -> Tuple[bool, str]:
         """Validate E.164 phone number format"""
-        # Clean phone number
-        clean_phone = re.sub(r'[^\d+]', '', phone)
-        
-        # Ensure E.164 format
-        if not clean_phone.startswith('+'):
-            if clean_phone.startswith('91') and len(clean_phone) == 12:
-                clean_phone = '+' + clean_phone
-            elif len(clean_phone) == 10:
-                clean_phone = '+91' + clean_phone
-            else:
-                return False, "Invalid phone number format"
-        
-        # Validate E.164 pattern
-        e164_pattern = r'^\+[1-9]\d{6,15}$'
-        if not re.match(e164_pattern, clean_phone):
-            return False, "Phone number must be in E.164 format"
-            
-        return True, clean_phone
+        return phone_numbers.validate(phone)
     
     def validate_media_url(self, media_url: str, media_type: str) -> Tuple[bool, str, Dict]:
         """Validate media URL with HEAD request to check content-type and size"""
@@ -86,7 +127,7 @@ class TataWhatsAppService:
                 return False, "Invalid media URL format", {}
             
             # HEAD request to validate
-            response = requests.head(media_url, timeout=10, allow_redirects=True)
+            response = self.http.head(media_url, allow_redirects=True)
             response.raise_for_status()
             
             content_type = response.headers.get('content-type', '').lower()
@@ -180,16 +221,10 @@ class TataWhatsAppService:
         return payload
     
     def rate_limit_check(self):
-        """Enforce rate limiting"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_send_time
-        
-        if time_since_last < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last
-            logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-        
-        self.last_send_time = time.time()
+        """Enforce rate limiting via the shared token bucket"""
+        waited = self.rate_limiter.acquire()
+        if waited:
+            logger.debug(f"Rate limiting: waited {waited:.2f} seconds for a send token")
     
     def send_template_message(self, 
                             to: str,
@@ -198,7 +233,8 @@ class TataWhatsAppService:
                             body_variables: List[str] = None,
                             header_media_url: str = None,
                             header_media_type: str = None,
-                            lead_id: int = None) -> Tuple[bool, str, Dict]:
+                            lead_id: int = None,
+                            media_validated: bool = False) -> Tuple[bool, str, Dict]:
         """Send WhatsApp template message using exact Tata API"""
         
         try:
@@ -217,11 +253,12 @@ class TataWhatsAppService:
                 if not header_media_type:
                     return False, "ERR_MEDIA_TYPE_REQUIRED: header_media_type required when header_media_url provided", {}
                 
-                media_valid, media_error, media_info = self.validate_media_url(header_media_url, header_media_type)
-                if not media_valid:
-                    return False, f"ERR_MEDIA_UNSUPPORTED: {media_error}", {}
-                
-                logger.info(f"Media validated: {media_info}")
+                if not media_validated:
+                    media_valid, media_error, media_info = self.validate_media_url(header_media_url, header_media_type)
+                    if not media_valid:
+                        return False, f"ERR_MEDIA_UNSUPPORTED: {media_error}", {}
+                    
+                    logger.info(f"Media validated: {media_info}")
             
             # Check for button variables (not supported)
             if body_variables:
@@ -248,7 +285,7 @@ class TataWhatsAppService:
             url = f"{self.base_url}/whatsapp-cloud/messages"
             logger.info(f"Sending WhatsApp message to {clean_phone} with template {template_name}")
             
-            response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            response = self.http.post(url, headers=self.headers, json=payload)
             response_data = response.json()
             
             if response.status_code == 200:
@@ -271,13 +308,9 @@ class TataWhatsAppService:
     def check_dnd_status(self, phone: str) -> bool:
         """Check if phone number is in DND list"""
         # This would integrate with Tata's DND API if available
-        # For now, check our internal DND list
+        # For now, check our internal opt-out list
         try:
-            # Check if lead has opted out
-            lead = Lead.objects.filter(phone=phone).first()
-            if lead and hasattr(lead, 'whatsapp_opt_out') and lead.whatsapp_opt_out:
-                return True
-            return False
+            return WhatsAppOptOut.objects.filter(phone_number=phone).exists()
         except:
             return False
     
@@ -304,8 +337,10 @@ class TataWhatsAppService:
 class TataWhatsAppCampaignService:
     """Campaign service for bulk WhatsApp messaging"""
     
-    def __init__(self):
+    def __init__(self, max_in_flight: int = None):
         self.whatsapp_service = TataWhatsAppService()
+        # Bounded pool of concurrent API requests; throughput is governed by the shared token bucket
+        self.max_in_flight = max_in_flight or getattr(settings, 'WHATSAPP_MAX_IN_FLIGHT', 8)
     
     def get_ivr_leads(self, 
                      project_names: List[str],
@@ -314,11 +349,11 @@ class TataWhatsAppCampaignService:
                      limit: int = None) -> List[Lead]:
         """Get leads filtered by project and date range (all sources)"""
         
-        # Build query for ALL leads (not just IVR)
+        # Build query for ALL leads (not just IVR); phone_e164 is blank for invalid phones
         query = Lead.objects.filter(
             created_at__gte=from_date,
             created_at__lte=to_date
-        )
+        ).exclude(phone_e164='')
         
         # Filter by project names if specified
         if project_names:
@@ -326,38 +361,24 @@ class TataWhatsAppCampaignService:
                 interested_projects__name__in=project_names
             )
         
-        # Exclude DND and invalid phones
-        query = query.exclude(
-            phone__isnull=True
-        ).exclude(
-            phone__exact=''
+        # Anti-join against the opt-out list
+        query = query.filter(
+            ~Exists(WhatsAppOptOut.objects.filter(phone_number=OuterRef('phone_e164')))
         )
         
-        # Deduplicate by phone number (keep latest)
-        leads = []
-        seen_phones = set()
+        # Deduplicate by phone number (keep latest) in the database; portable across SQLite and PostgreSQL
+        query = query.annotate(
+            phone_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('phone_e164')],
+                order_by=[F('created_at').desc(), F('id').desc()]
+            )
+        ).filter(phone_rank=1).order_by('-created_at', '-id')
         
-        for lead in query.order_by('-created_at'):
-            # Validate phone format
-            is_valid, clean_phone = self.whatsapp_service.validate_phone_number(lead.phone)
-            if not is_valid:
-                continue
-                
-            # Skip if phone already processed
-            if clean_phone in seen_phones:
-                continue
-                
-            # Check DND status
-            if self.whatsapp_service.check_dnd_status(clean_phone):
-                continue
-                
-            seen_phones.add(clean_phone)
-            leads.append(lead)
-            
-            if limit and len(leads) >= limit:
-                break
+        if limit:
+            query = query[:limit]
         
-        return leads
+        return list(query.select_related('current_stage').prefetch_related('interested_projects'))
     
     def prepare_template_variables(self, lead: Lead, project: Project = None) -> List[str]:
         """Prepare template variables from lead and project data"""
@@ -367,11 +388,12 @@ class TataWhatsAppCampaignService:
         # Variable 1: Lead name
         variables.append(lead.name or 'Customer')
         
-        # Variable 2: Project name
+        # Variable 2: Project name (reads the prefetch cache when present)
+        interested_projects = list(lead.interested_projects.all()) if not project else []
         if project:
             variables.append(project.name)
-        elif lead.interested_projects.exists():
-            variables.append(lead.interested_projects.first().name)
+        elif interested_projects:
+            variables.append(interested_projects[0].name)
         else:
             variables.append('our premium projects')
         
@@ -391,7 +413,7 @@ class TataWhatsAppCampaignService:
                     header_media_type: str = None,
                     dry_run: bool = False,
                     limit: int = None) -> Dict:
-        """Run WhatsApp template campaign"""
+        """Run WhatsApp template campaign with a bounded pool of in-flight sends"""
         
         results = {
             'total_leads': 0,
@@ -400,8 +422,12 @@ class TataWhatsAppCampaignService:
             'failed_count': 0,
             'errors': [],
             'sent_messages': [],
-            'failed_messages': []
+            'failed_messages': [],
+            'lead_results': {},
+            'elapsed_seconds': 0,
+            'messages_per_second': 0
         }
+        started_at = time.monotonic()
         
         try:
             # Get filtered leads
@@ -412,93 +438,176 @@ class TataWhatsAppCampaignService:
                 results['errors'].append("No valid leads found for the specified criteria")
                 return results
             
-            logger.info(f"Starting WhatsApp campaign for {len(leads)} leads")
+            # Validate header media once for the whole campaign instead of per message
+            if header_media_url and not dry_run:
+                if not header_media_type:
+                    results['errors'].append("ERR_MEDIA_TYPE_REQUIRED: header_media_type required when header_media_url provided")
+                    return results
+                media_valid, media_error, media_info = self.whatsapp_service.validate_media_url(header_media_url, header_media_type)
+                if not media_valid:
+                    results['errors'].append(f"ERR_MEDIA_UNSUPPORTED: {media_error}")
+                    return results
+                logger.info(f"Media validated: {media_info}")
             
-            # Process each lead
-            for lead in leads:
-                try:
-                    # Validate phone
-                    is_valid, clean_phone = self.whatsapp_service.validate_phone_number(lead.phone)
-                    if not is_valid:
-                        results['errors'].append(f"Invalid phone for {lead.name}: {clean_phone}")
-                        continue
-                    
-                    results['valid_leads'] += 1
-                    
-                    # Get associated project
-                    project = lead.interested_projects.first()
-                    
-                    # Prepare variables
-                    variables = self.prepare_template_variables(lead, project)
-                    
-                    # Build message content for logging
-                    message_content = f"Template: {template_name}, Variables: {variables}"
-                    
-                    if dry_run:
-                        results['sent_messages'].append({
-                            'lead_id': lead.id,
-                            'lead_name': lead.name,
-                            'phone': clean_phone,
-                            'template': template_name,
-                            'variables': variables,
-                            'project': project.name if project else None,
-                            'status': 'dry_run'
-                        })
-                        results['sent_count'] += 1
-                        continue
-                    
-                    # Send message
-                    success, message_id_or_error, api_response = self.whatsapp_service.send_template_message(
-                        to=clean_phone,
-                        template_name=template_name,
-                        language=language,
-                        body_variables=variables,
-                        header_media_url=header_media_url,
-                        header_media_type=header_media_type,
-                        lead_id=lead.id
-                    )
-                    
-                    # Create message record
-                    whatsapp_msg = self.whatsapp_service.create_whatsapp_message_record(
-                        lead=lead,
-                        template_name=template_name,
-                        message_content=message_content,
-                        phone_number=clean_phone,
-                        message_id=message_id_or_error if success else None,
-                        api_response=api_response
-                    )
+            logger.info(f"Starting WhatsApp campaign for {len(leads)} leads ({self.max_in_flight} in flight)")
+            
+            def prepared_sends():
+                for lead in leads:
+                    try:
+                        # Validate phone
+                        is_valid, clean_phone = self.whatsapp_service.validate_phone_number(lead.phone)
+                        if not is_valid:
+                            results['errors'].append(f"Invalid phone for {lead.name}: {clean_phone}")
+                            results['lead_results'][lead.id] = 'invalid_phone'
+                            continue
+                        
+                        results['valid_leads'] += 1
+                        
+                        # Get associated project
+                        projects = list(lead.interested_projects.all())
+                        project = projects[0] if projects else None
+                        
+                        # Prepare variables
+                        variables = self.prepare_template_variables(lead, project)
+                        
+                        if dry_run:
+                            results['sent_messages'].append({
+                                'lead_id': lead.id,
+                                'lead_name': lead.name,
+                                'phone': clean_phone,
+                                'template': template_name,
+                                'variables': variables,
+                                'project': project.name if project else None,
+                                'status': 'dry_run'
+                            })
+                            results['sent_count'] += 1
+                            results['lead_results'][lead.id] = 'dry_run'
+                            continue
+                        
+                        yield (lead, clean_phone, variables), clean_phone, variables, lead.id
                     
-                    if success:
-                        results['sent_count'] += 1
-                        results['sent_messages'].append({
-                            'lead_id': lead.id,
-                            'lead_name': lead.name,
-                            'phone': clean_phone,
-                            'message_id': message_id_or_error,
-                            'whatsapp_record_id': whatsapp_msg.id
-                        })
-                        logger.info(f"Message sent to {lead.name} ({clean_phone}): {message_id_or_error}")
-                    else:
+                    except Exception as e:
                         results['failed_count'] += 1
-                        results['failed_messages'].append({
-                            'lead_id': lead.id,
-                            'lead_name': lead.name,
-                            'phone': clean_phone,
-                            'error': message_id_or_error
-                        })
-                        logger.error(f"Failed to send to {lead.name} ({clean_phone}): {message_id_or_error}")
-                
-                except Exception as e:
-                    results['failed_count'] += 1
-                    error_msg = f"Error processing lead {lead.id}: {str(e)}"
-                    results['errors'].append(error_msg)
-                    logger.error(error_msg)
+                        results['lead_results'][lead.id] = 'error'
+                        error_msg = f"Error processing lead {lead.id}: {str(e)}"
+                        results['errors'].append(error_msg)
+                        logger.error(error_msg)
             
-            logger.info(f"Campaign completed: {results['sent_count']} sent, {results['failed_count']} failed")
+            for job, outcome in self.iter_send_results(
+                prepared_sends(),
+                template_name=template_name,
+                language=language,
+                header_media_url=header_media_url,
+                header_media_type=header_media_type
+            ):
+                self._record_send_result(outcome, job, template_name, results)
+            
+            results['elapsed_seconds'] = round(time.monotonic() - started_at, 2)
+            if results['elapsed_seconds'] > 0:
+                results['messages_per_second'] = round(results['sent_count'] / results['elapsed_seconds'], 2)
+            
+            logger.info(f"Campaign completed: {results['sent_count']} sent, {results['failed_count']} failed "
+                        f"in {results['elapsed_seconds']}s")
             
         except Exception as e:
             error_msg = f"Campaign failed: {str(e)}"
             results['errors'].append(error_msg)
             logger.error(error_msg)
         
-        return results
\ No newline at end of file
+        return results
+    
+    def iter_send_results(self,
+                          sends,
+                          template_name: str,
+                          language: str = 'en',
+                          header_media_url: str = None,
+                          header_media_type: str = None):
+        """Send (key, phone, variables, lead_id) items through the bounded pool.
+        
+        Yields (key, outcome) as sends finish, where outcome is the
+        (success, message_id_or_error, api_response) tuple or the exception raised.
+        Worker threads only talk to the API; callers do DB writes on their own thread.
+        Header media must already be validated by the caller.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            pending = {}
+            
+            def drain(futures):
+                for future in futures:
+                    key = pending.pop(future)
+                    try:
+                        yield key, future.result()
+                    except Exception as e:
+                        yield key, e
+            
+            for key, clean_phone, variables, lead_id in sends:
+                future = executor.submit(
+                    self.whatsapp_service.send_template_message,
+                    to=clean_phone,
+                    template_name=template_name,
+                    language=language,
+                    body_variables=variables,
+                    header_media_url=header_media_url,
+                    header_media_type=header_media_type,
+                    lead_id=lead_id,
+                    media_validated=True
+                )
+                pending[future] = key
+                
+                # Keep the submission window bounded so memory stays flat on large campaigns
+                if len(pending) >= self.max_in_flight * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from drain(done)
+            
+            yield from drain(as_completed(list(pending)))
+    
+    def _record_send_result(self, outcome, job: Tuple, template_name: str, results: Dict):
+        """Persist the outcome of one completed send and update per-lead accounting"""
+        lead, clean_phone, variables = job
+        
+        try:
+            if isinstance(outcome, Exception):
+                raise outcome
+            success, message_id_or_error, api_response = outcome
+            
+            # Build message content for logging
+            message_content = f"Template: {template_name}, Variables: {variables}"
+            
+            # Create message record
+            whatsapp_msg = self.whatsapp_service.create_whatsapp_message_record(
+                lead=lead,
+                template_name=template_name,
+                message_content=message_content,
+                phone_number=clean_phone,
+                message_id=message_id_or_error if success else None,
+                api_response=api_response
+            )
+            
+            if success:
+                results['sent_count'] += 1
+                results['lead_results'][lead.id] = 'sent'
+                results['sent_messages'].append({
+                    'lead_id': lead.id,
+                    'lead_name': lead.name,
+                    'phone': clean_phone,
+                    'message_id': message_id_or_error,
+                    'whatsapp_record_id': whatsapp_msg.id
+                })
+                logger.info(f"Message sent to {lead.name} ({clean_phone}): {message_id_or_error}")
+            else:
+                results['failed_count'] += 1
+                results['lead_results'][lead.id] = 'failed'
+                results['failed_messages'].append({
+                    'lead_id': lead.id,
+                    'lead_name': lead.name,
+                    'phone': clean_phone,
+                    'error': message_id_or_error
+                })
+                logger.error(f"Failed to send to {lead.name} ({clean_phone}): {message_id_or_error}")
+        
+        except Exception as e:
+            results['failed_count'] += 1
+            results['lead_results'][lead.id] = 'error'
+            error_msg = f"Error processing lead {lead.id}: {str(e)}"
+            results['errors'].append(error_msg)
+            logger.error(error_msg)
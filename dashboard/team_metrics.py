@@ -0,0 +1,132 @@
+"""
+Team metrics
+Monthly performance, leave balances and comp-off balances for any number of
+team members in a fixed handful of grouped queries, keyed by user id.
+"""
+from typing import Dict, Iterable
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Attendance, CompOffRequest, Lead, LeadNote, LeaveApplication, LeaveType, TeamMember
+
+DEFAULT_LEAVE_BALANCE = {
+    'annual_leave': {'allowed': 12, 'used': 0, 'remaining': 12},
+    'sick_leave': {'allowed': 8, 'used': 0, 'remaining': 8},
+    'casual_leave': {'allowed': 6, 'used': 0, 'remaining': 6},
+}
+
+
+class TeamMetricsService:
+    """Per-member metrics for a set of TeamMember rows"""
+
+    def __init__(self, members: Iterable[TeamMember] = None, today=None):
+        self.members = list(members if members is not None else TeamMember.objects.all())
+        self.user_ids = [member.user_id for member in self.members]
+        self.today = today or timezone.now().date()
+
+    def performance(self) -> Dict[int, Dict]:
+        """Leads assigned, site visits and closures this month, with target percentages"""
+        month, year = self.today.month, self.today.year
+        created = Q(created_at__month=month, created_at__year=year)
+        closed = Q(current_stage__name='Deal Closed', updated_at__month=month, updated_at__year=year)
+
+        lead_counts = {
+            row['assigned_to_id']: row
+            for row in Lead.objects.filter(assigned_to_id__in=self.user_ids).filter(created | closed)
+            .order_by().values('assigned_to_id')
+            .annotate(leads=Count('id', filter=created), closures=Count('id', filter=closed))
+        }
+        site_visits = dict(
+            LeadNote.objects.filter(
+                created_by_id__in=self.user_ids,
+                call_type='site_visit',
+                created_at__month=month,
+                created_at__year=year
+            ).order_by().values('created_by_id').annotate(count=Count('id')).values_list('created_by_id', 'count')
+        )
+
+        performance = {}
+        for member in self.members:
+            counts = lead_counts.get(member.user_id, {})
+            leads = counts.get('leads', 0)
+            closures = counts.get('closures', 0)
+            visits = site_visits.get(member.user_id, 0)
+            performance[member.user_id] = {
+                'leads': leads,
+                'site_visits': visits,
+                'closures': closures,
+                'lead_target_percentage': (leads / member.target_leads_monthly * 100) if member.target_leads_monthly else 0,
+                'site_visit_percentage': (visits / member.target_site_visits_monthly * 100) if member.target_site_visits_monthly else 0,
+                'closure_percentage': (closures / member.target_closures_monthly * 100) if member.target_closures_monthly else 0,
+            }
+        return performance
+
+    def leave_balances(self) -> Dict[int, Dict]:
+        """Allowed/used/remaining days per leave type for this year"""
+        leave_types = list(LeaveType.objects.all())
+        if not leave_types:
+            return {user_id: {name: dict(balance) for name, balance in DEFAULT_LEAVE_BALANCE.items()} for user_id in self.user_ids}
+
+        used = {
+            (row['employee_id'], row['leave_type_id']): row['total']
+            for row in LeaveApplication.objects.filter(
+                employee_id__in=self.user_ids,
+                status='approved',
+                from_date__year=self.today.year
+            ).order_by().values('employee_id', 'leave_type_id').annotate(total=Sum('days_requested'))
+        }
+
+        balances = {}
+        for user_id in self.user_ids:
+            balance = {}
+            for leave_type in leave_types:
+                used_leaves = used.get((user_id, leave_type.id)) or 0
+                balance[leave_type.name.lower().replace(' ', '_')] = {
+                    'allowed': leave_type.days_allowed_per_year,
+                    'used': used_leaves,
+                    'remaining': leave_type.days_allowed_per_year - used_leaves
+                }
+            balances[user_id] = balance
+        return balances
+
+    def compoff_balances(self) -> Dict[int, Dict]:
+        """Approved comp-offs earned this year against comp-off attendance days"""
+        year = self.today.year
+        earned = dict(
+            CompOffRequest.objects.filter(employee_id__in=self.user_ids, status='approved', worked_date__year=year)
+            .order_by().values('employee_id').annotate(count=Count('id')).values_list('employee_id', 'count')
+        )
+        used = dict(
+            Attendance.objects.filter(employee_id__in=self.user_ids, status='comp_off', date__year=year)
+            .order_by().values('employee_id').annotate(count=Count('id')).values_list('employee_id', 'count')
+        )
+        return {
+            user_id: {
+                'earned': earned.get(user_id, 0),
+                'used': used.get(user_id, 0),
+                'remaining': earned.get(user_id, 0) - used.get(user_id, 0),
+            }
+            for user_id in self.user_ids
+        }
+
+    def metrics(self) -> Dict[int, Dict]:
+        """{user_id: {'performance': ..., 'leave_balance': ..., 'compoff_balance': ...}}"""
+        performance = self.performance()
+        leave_balances = self.leave_balances()
+        compoff_balances = self.compoff_balances()
+        return {
+            user_id: {
+                'performance': performance[user_id],
+                'leave_balance': leave_balances[user_id],
+                'compoff_balance': compoff_balances[user_id],
+            }
+            for user_id in self.user_ids
+        }
+
+    def attach(self) -> Dict[int, Dict]:
+        """Compute metrics and hand them to each member, so its properties don't query again"""
+        metrics = self.metrics()
+        for member in self.members:
+            member._team_metrics = metrics[member.user_id]
+        return metrics
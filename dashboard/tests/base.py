@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from dashboard.models import Lead, LeadStage, Project
+
+
+class CRMTestCase(TestCase):
+    """Seeds the system user and a stage that webhooks, imports and ingestion rely on"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Notes and projects written by webhooks and ingestion belong to the system user (id 1)
+        cls.system_user = User.objects.create_user(id=1, username='system')
+        cls.stage = LeadStage.objects.create(name='New Lead', category='new', order=1)
+
+    def make_lead(self, phone, **kwargs):
+        kwargs.setdefault('name', f"Lead {phone[-4:]}")
+        kwargs.setdefault('email', f"lead{phone[-4:]}@example.com")
+        kwargs.setdefault('source', 'website')
+        kwargs.setdefault('current_stage', self.stage)
+        return Lead.objects.create(phone=phone, **kwargs)
+
+    def make_project(self, name, **kwargs):
+        kwargs.setdefault('location', 'Gurugram')
+        kwargs.setdefault('description', name)
+        kwargs.setdefault('bhk_options', '2BHK, 3BHK')
+        kwargs.setdefault('price_min', 5000000)
+        kwargs.setdefault('price_max', 9000000)
+        kwargs.setdefault('created_by', self.system_user)
+        return Project.objects.create(name=name, **kwargs)
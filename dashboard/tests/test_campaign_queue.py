@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.models import WhatsAppCampaignJob, WhatsAppCampaignRecipient
+from dashboard.whatsapp_campaign_queue import INTERRUPTED_ERROR, WhatsAppCampaignQueue
+
+from .base import CRMTestCase
+
+
+class CampaignQueueTests(CRMTestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.job = WhatsAppCampaignJob.objects.create(
+            template_name='project_intro', from_date=now - timedelta(days=7), to_date=now, status='running'
+        )
+        for index in range(3):
+            lead = self.make_lead(f"98765432{index:02d}")
+            WhatsAppCampaignRecipient.objects.create(job=self.job, lead=lead, phone_number=lead.phone_e164)
+        self.queue = WhatsAppCampaignQueue(batch_size=2, worker_id='worker-a')
+
+    def send_ok(self, **kwargs):
+        return True, f"wamid.{kwargs['to']}", {}
+
+    def test_claim_is_exclusive_until_the_lease_expires(self):
+        self.assertEqual(self.queue.claim_job().id, self.job.id)
+        other = WhatsAppCampaignQueue(worker_id='worker-b')
+        self.assertIsNone(other.claim_job())
+
+        WhatsAppCampaignJob.objects.filter(id=self.job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(other.claim_job().id, self.job.id)
+        self.assertFalse(self.queue.renew_lease(self.job))
+
+    def test_batches_checkpoint_every_recipient(self):
+        job = self.queue.claim_job()
+        with mock.patch.object(self.queue.whatsapp_service, 'send_template_message', side_effect=self.send_ok):
+            job = self.queue.process_job(job)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.sent_count, 3)
+        self.assertEqual(job.recipients.filter(status='sent', whatsapp_message__isnull=False).count(), 3)
+        self.assertEqual(job.lease_owner, '')
+
+    def test_lost_lease_stops_the_batch(self):
+        job = self.queue.claim_job()
+        batch = self.queue.lease_batch(job)
+        self.queue.lease_seconds = 0  # renew after every send
+        with mock.patch.object(self.queue.whatsapp_service, 'send_template_message', side_effect=self.send_ok), \
+                mock.patch.object(self.queue, 'renew_lease', return_value=False):
+            counts = self.queue.process_batch(job, batch)
+
+        self.assertTrue(counts['lease_lost'])
+        self.assertEqual(counts['sent'], 1)
+        self.assertEqual(job.recipients.filter(status='in_flight').count(), 1)
+
+    def test_interrupted_sends_are_failed_not_resent(self):
+        self.queue.lease_batch(self.job)
+        self.assertEqual(self.queue.recover_interrupted(self.job), 2)
+        self.assertEqual(self.job.recipients.filter(status='failed', error=INTERRUPTED_ERROR).count(), 2)
+        self.assertEqual(self.job.recipients.filter(status='pending').count(), 1)
+
+    def test_cancelled_job_stays_cancelled(self):
+        WhatsAppCampaignJob.objects.filter(id=self.job.id).update(status='cancelled')
+        self.queue._finish(self.job, 'completed')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'cancelled')
+        self.assertIsNone(self.job.completed_at)
+
+    def test_poison_job_is_failed_after_max_attempts(self):
+        self.queue.max_attempts = 2
+        other = WhatsAppCampaignJob.objects.create(
+            template_name='project_intro', from_date=self.job.from_date, to_date=self.job.to_date
+        )
+        with mock.patch.object(self.queue, 'recover_interrupted', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.queue.process_job(self.queue.claim_job(self.job.id))
+
+            # Backed off, so the next claim goes to another job instead of the poison one
+            self.job.refresh_from_db()
+            self.assertEqual((self.job.attempts, self.job.status, self.job.lease_owner), (1, 'running', ''))
+            self.assertEqual(self.queue.claim_job().id, other.id)
+
+            WhatsAppCampaignJob.objects.filter(id=self.job.id).update(lease_expires_at=None)
+            with self.assertRaises(RuntimeError):
+                self.queue.process_job(self.queue.claim_job(self.job.id))
+
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.attempts, self.job.status, self.job.last_error), (2, 'failed', 'boom'))
+        self.assertIsNone(self.queue.claim_job(self.job.id))
+
+    def test_job_views_are_limited_to_the_creator_and_staff(self):
+        owner = User.objects.create_user('owner')
+        WhatsAppCampaignJob.objects.filter(id=self.job.id).update(created_by=owner)
+        status_url = reverse('campaign_job_status', args=[self.job.id])
+        cancel_url = reverse('cancel_campaign_job', args=[self.job.id])
+
+        self.client.force_login(User.objects.create_user('other'))
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+        self.assertFalse(self.client.post(cancel_url).json()['success'])
+
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+        self.assertEqual(self.client.get(status_url).status_code, 200)
+
+        self.client.force_login(owner)
+        self.assertTrue(self.client.post(cancel_url).json()['success'])
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'cancelled')
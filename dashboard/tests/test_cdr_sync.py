@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from dashboard.cdr_sync import CDRSync
+from dashboard.models import IVRCallLog, SyncWatermark
+
+from .base import CRMTestCase
+
+
+def cdr_record(uuid, started=None):
+    record = {'uuid': uuid, 'call_id': uuid, 'did_number': '+919654444333', 'client_number': '9876543210',
+              'call_duration': 30, 'status': 'answered'}
+    if started is not None:
+        started = timezone.localtime(started)
+        record.update(date=started.strftime('%Y-%m-%d'), time=started.strftime('%H:%M:%S'))
+    return record
+
+
+class FakeCallRecords:
+    """Stand-in for TATACallsAPI serving the records inside the requested window page by page"""
+
+    def __init__(self, records, report_total=True, fail_page=None):
+        self.records = records
+        self.report_total = report_total
+        self.fail_page = fail_page
+        self.requests = []
+
+    @property
+    def pages(self):
+        return [page for _, page in self.requests]
+
+    def get_call_records(self, from_date, to_date, page=1, limit=100):
+        self.requests.append(((from_date, to_date), page))
+        if page == self.fail_page:
+            return {'success': False, 'error': 'timeout'}
+        records = [
+            record for record in self.records
+            if 'date' not in record or from_date <= f"{record['date']} {record['time']}" <= to_date
+        ]
+        result = {'results': records[(page - 1) * limit:page * limit]}
+        if self.report_total:
+            result['count'] = len(records)
+        return result
+
+
+class CDRSyncTests(CRMTestCase):
+    def setUp(self):
+        self.base = (timezone.now() - timedelta(hours=2)).replace(microsecond=0)
+        self.records = [cdr_record(f"cdr-{index}", self.base + timedelta(minutes=index)) for index in range(25)]
+
+    def sync(self, api, **kwargs):
+        kwargs.setdefault('page_size', 10)
+        kwargs.setdefault('workers', 2)
+        return CDRSync(api=api, worker_id='sync', **kwargs)
+
+    def test_watermark_advances_to_the_newest_call(self):
+        api = FakeCallRecords(self.records)
+        result = self.sync(api).run()
+
+        self.assertEqual((result['status'], result['created'], result['windows']), ('ok', 25, 1))
+        self.assertEqual(sorted(api.pages), [1, 2, 3])
+        self.assertEqual(SyncWatermark.objects.get().watermark, self.base + timedelta(minutes=24))
+
+        again = self.sync(FakeCallRecords(self.records)).run(since=self.base - timedelta(minutes=1))
+        self.assertEqual((again['created'], again['updated']), (0, 25))
+
+    def test_pages_without_a_total_stop_at_the_first_short_page(self):
+        api = FakeCallRecords(self.records, report_total=False)
+        self.assertEqual(self.sync(api, workers=1).run()['created'], 25)
+        self.assertEqual(api.pages, [1, 2, 3])
+
+    def test_failed_page_keeps_the_watermark(self):
+        result = self.sync(FakeCallRecords(self.records, fail_page=2)).run()
+
+        state = SyncWatermark.objects.get()
+        self.assertEqual(result['status'], 'failed')
+        self.assertIsNone(state.watermark)
+        self.assertIn('timeout', state.last_error)
+        self.assertEqual(state.lease_owner, '')
+
+    def test_undated_record_does_not_move_the_watermark(self):
+        self.sync(FakeCallRecords(self.records[:5] + [cdr_record('cdr-undated')])).run()
+        self.assertEqual(SyncWatermark.objects.get().watermark, self.base + timedelta(minutes=4))
+
+    def test_window_over_the_page_cap_is_split(self):
+        for report_total in (True, False):
+            IVRCallLog.objects.all().delete()
+            SyncWatermark.objects.all().delete()
+            api = FakeCallRecords(self.records, report_total=report_total)
+            result = self.sync(api, max_pages=2).run()
+
+            self.assertEqual((result['created'], result['capped']), (25, False))
+            self.assertGreater(result['windows'], 1)
+            self.assertLessEqual(max(api.pages), 2)
+            self.assertEqual(SyncWatermark.objects.get().watermark, self.base + timedelta(minutes=24))
+
+            # Windows are contiguous from the start of the sync to its end
+            windows = sorted({window for window, _ in api.requests})
+            ends = {end for _, end in windows}
+            self.assertTrue(all(start in ends for start, _ in windows if start != windows[0][0]))
+
+    def test_finished_windows_keep_their_watermark_when_a_later_one_fails(self):
+        sync = self.sync(FakeCallRecords(self.records), max_pages=2)
+        original = sync.sync_window
+
+        def fail_late_windows(window_start, window_end, stats):
+            if window_start > self.base + timedelta(minutes=5):
+                raise RuntimeError('timeout')
+            return original(window_start, window_end, stats)
+
+        sync.sync_window = fail_late_windows
+        self.assertEqual(sync.run()['status'], 'failed')
+        watermark = SyncWatermark.objects.get().watermark
+        self.assertIsNotNone(watermark)
+        self.assertLess(watermark, self.base + timedelta(minutes=24))
+
+    def test_running_sync_is_not_entered_twice(self):
+        SyncWatermark.objects.create(name=CDRSync.name, lease_owner='other', lease_expires_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(self.sync(FakeCallRecords(self.records)).run(), {'status': 'busy'})
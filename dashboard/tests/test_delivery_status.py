@@ -0,0 +1,39 @@
+from unittest import mock
+
+from dashboard.models import LeadNote, WhatsAppMessage
+from dashboard.tata_webhook_handler import webhook_handler
+
+from .base import CRMTestCase
+
+
+class DeliveryStatusTests(CRMTestCase):
+    def setUp(self):
+        self.lead = self.make_lead('9876543210')
+        self.message = WhatsAppMessage.objects.create(
+            lead=self.lead, message_content='Template: project_intro', phone_number=self.lead.phone_e164,
+            status='sent', message_id='wamid.status'
+        )
+
+    def test_late_delivered_does_not_regress_read(self):
+        webhook_handler.apply_statuses([{'id': 'wamid.status', 'status': 'read', 'timestamp': '1729161300'}])
+        result = webhook_handler.apply_statuses([{'id': 'wamid.status', 'status': 'delivered', 'timestamp': '1729161290'}])
+
+        self.message.refresh_from_db()
+        self.assertEqual(result, {'updated_count': 0, 'ignored_count': 1})
+        self.assertEqual(self.message.status, 'read')
+        self.assertIsNotNone(self.message.delivered_at)
+
+    def test_out_of_order_batch_ends_at_the_furthest_status(self):
+        webhook_handler.apply_statuses([
+            {'id': 'wamid.status', 'status': 'read', 'timestamp': '1729161300'},
+            {'id': 'wamid.status', 'status': 'delivered', 'timestamp': '1729161290'},
+        ])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, 'read')
+        self.assertEqual(LeadNote.objects.filter(lead=self.lead).count(), 2)
+
+    def test_note_failure_keeps_the_statuses(self):
+        with mock.patch.object(LeadNote.objects, 'bulk_create', side_effect=RuntimeError('notes down')):
+            webhook_handler.apply_statuses([{'id': 'wamid.status', 'status': 'delivered', 'timestamp': '1729161290'}])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, 'delivered')
@@ -0,0 +1,42 @@
+from dashboard.ivr_ingest import UPDATE_FIELDS, call_from_cdr, call_from_webhook, ingest_calls
+from dashboard.ivr_webhook_handler import process_ivr_call
+from dashboard.models import IVRCallLog, Lead, LeadNote
+
+from .base import CRMTestCase
+
+
+class IVRIngestTests(CRMTestCase):
+    payload = {
+        'uuid': 'call-1', 'caller_id_number': '9876543210', 'call_to_number': '+919654444333',
+        'start_stamp': '2026-10-01 10:00:00', 'duration': '75', 'status': 'answered'
+    }
+
+    def test_redelivered_call_updates_the_same_row(self):
+        first = ingest_calls([call_from_webhook(self.payload)])
+        second = ingest_calls([call_from_webhook(dict(self.payload, duration='80'))])
+
+        self.assertEqual((first['created'], second['created'], second['updated']), (1, 0, 1))
+        self.assertEqual(IVRCallLog.objects.get(uuid='call-1').duration, 80)
+
+    def test_new_call_is_linked_to_the_newest_matching_lead(self):
+        self.make_lead('+91 98765 43210')
+        newest = self.make_lead('9876543210')
+
+        result = ingest_calls([call_from_webhook(self.payload)])
+        self.assertEqual(result['associated'], 1)
+        self.assertEqual(IVRCallLog.objects.get(uuid='call-1').associated_lead, newest)
+        self.assertEqual(LeadNote.objects.filter(lead=newest, call_type='ivr_call').count(), 1)
+
+    def test_replayed_webhook_is_a_duplicate(self):
+        self.assertEqual(process_ivr_call(self.payload)['status'], 'success')
+        self.assertEqual(process_ivr_call(self.payload)['status'], 'duplicate')
+        self.assertEqual(Lead.objects.filter(source='ivr_call').count(), 1)
+
+    def test_call_synced_from_cdr_first_is_still_processed(self):
+        record = {'uuid': 'call-1', 'did_number': '+919654444333', 'client_number': '9876543210',
+                  'date': '2026-10-01', 'time': '10:00:00', 'call_duration': 75, 'status': 'answered'}
+        ingest_calls([call_from_cdr(record)], update_fields=UPDATE_FIELDS + ['start_stamp'])
+        self.assertFalse(IVRCallLog.objects.get(uuid='call-1').processed)
+
+        self.assertEqual(process_ivr_call(self.payload)['status'], 'success')
+        self.assertTrue(IVRCallLog.objects.get(uuid='call-1').processed)
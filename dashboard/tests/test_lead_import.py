@@ -0,0 +1,138 @@
+import io
+from unittest import mock
+
+import pandas as pd
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from dashboard.db_storage import DatabaseStorage
+from dashboard.lead_import import LeadImportJobRunner, LeadImportPipeline
+from dashboard.models import Lead, LeadImportJob, StoredFile
+
+from .base import CRMTestCase
+
+
+def csv_upload(rows, name='leads.csv', repeat_first=False):
+    lines = ['name,email,phone'] + [f"Lead {index},lead{index}@example.com,98765{index:05d}" for index in range(rows)]
+    if repeat_first:
+        lines.append(lines[1])
+    return SimpleUploadedFile(name, ('\n'.join(lines) + '\n').encode())
+
+
+class DatabaseStorageTests(CRMTestCase):
+    def test_reader_seeks_across_chunks(self):
+        storage = DatabaseStorage(chunk_size=4)
+        name = storage.save('imports/digits.txt', ContentFile(b'0123456789'))
+
+        self.assertEqual(storage.size(name), 10)
+        with storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'0123456789')
+            stored.seek(3)
+            self.assertEqual(stored.read(3), b'345')
+            stored.seek(-2, io.SEEK_END)
+            self.assertEqual(stored.read(), b'89')
+
+        self.assertNotEqual(storage.save('imports/digits.txt', ContentFile(b'x')), name)
+        storage.delete(name)
+        self.assertFalse(storage.exists(name))
+        with self.assertRaises(FileNotFoundError):
+            storage.open(name)
+
+
+class LeadImportJobTests(CRMTestCase):
+    def test_upload_is_read_back_from_shared_storage(self):
+        job = LeadImportJobRunner.enqueue(csv_upload(3))
+        self.assertTrue(StoredFile.objects.filter(name=job.file.name).exists())
+
+        runner = LeadImportJobRunner(worker_id='importer')
+        job = runner.process_job(runner.claim_job(job.id))
+
+        self.assertEqual((job.status, job.rows_processed, job.created_count), ('completed', 3, 3))
+        self.assertEqual(Lead.objects.count(), 3)
+        # An imported upload is removed from storage
+        self.assertFalse(job.file)
+        self.assertFalse(StoredFile.objects.exists())
+
+    @override_settings(UPLOAD_CHUNK_ROWS=100)
+    def test_crashed_import_resumes_after_the_last_committed_chunk(self):
+        for skip_duplicates in (False, True):
+            Lead.objects.all().delete()
+            job = LeadImportJobRunner.enqueue(csv_upload(10, repeat_first=True), skip_duplicates=skip_duplicates)
+            runner = LeadImportJobRunner(chunk_size=4, worker_id='importer')
+            original = runner.checkpoint
+            calls = []
+
+            def crash_on_second_chunk(*args):
+                calls.append(args)
+                if len(calls) == 2:
+                    raise RuntimeError('worker killed')
+                original(*args)
+
+            with mock.patch.object(runner, 'checkpoint', side_effect=crash_on_second_chunk):
+                job = runner.process_job(runner.claim_job(job.id))
+
+            # The second chunk rolled back together with its checkpoint
+            self.assertEqual((job.status, job.rows_processed, Lead.objects.count()), ('failed', 4, 4))
+
+            # A crashed worker leaves its job running for the next one
+            LeadImportJob.objects.filter(id=job.id).update(status='running')
+            job = runner.process_job(runner.claim_job(job.id))
+
+            self.assertEqual(job.status, 'completed')
+            self.assertEqual(job.rows_processed, 11)
+            if skip_duplicates:
+                # The repeat of row 2 is skipped although row 2 was imported by the first run
+                self.assertEqual((job.created_count, job.skipped_count, Lead.objects.count()), (10, 1, 10))
+            else:
+                self.assertEqual((job.created_count, job.skipped_count, Lead.objects.count()), (11, 0, 11))
+
+    def test_remembered_rows_are_in_file_duplicates(self):
+        rows = pd.DataFrame({'name': ['Asha', ''], 'email': ['ASHA@example.com', 'x@example.com'], 'phone': ['9876500001', '9876500002']})
+        pipeline = LeadImportPipeline()
+        pipeline.remember(rows)
+
+        self.assertEqual(pipeline.seen_emails, {'asha@example.com'})
+        pipeline.process_dataframe(rows.iloc[:1].assign(phone='9876500003'))
+        self.assertEqual((pipeline.counts['created'], pipeline.counts['skipped']), (0, 1))
+
+
+class UploadRowNumberTests(CRMTestCase):
+    def xlsx_upload(self, rows):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['name', 'email', 'phone'])
+        for row in rows:
+            sheet.append(row)
+        # Formatted-but-empty rows trailing the data
+        for index in range(len(rows) + 2, len(rows) + 12):
+            sheet.cell(row=index, column=1).number_format = '@'
+        content = io.BytesIO()
+        workbook.save(content)
+        return SimpleUploadedFile('leads.xlsx', content.getvalue())
+
+    def csv_upload(self, rows):
+        lines = ['name,email,phone'] + [','.join(value or '' for value in row) if any(row) else '' for row in rows]
+        return SimpleUploadedFile('leads.csv', ('\n'.join(lines) + '\n').encode())
+
+    def test_blank_rows_keep_errors_on_their_sheet_row(self):
+        for name, upload in (('xlsx', self.xlsx_upload), ('csv', self.csv_upload)):
+            with self.subTest(name):
+                Lead.objects.all().delete()
+                rows = [
+                    ('Asha', 'asha@example.com', '9876500001'),
+                    (None, None, None),
+                    (None, None, None),
+                    ('Ravi', 'ravi@example.com', '9876500002'),
+                    ('R' * 300, 'long@example.com', '9876500003'),
+                ]
+                job = LeadImportJobRunner.enqueue(upload(rows))
+                runner = LeadImportJobRunner(chunk_size=2, worker_id='importer')
+                job = runner.process_job(runner.claim_job(job.id))
+
+                self.assertEqual((job.status, job.rows_processed, job.created_count), ('completed', 5, 2))
+                # Header is row 1, so the fifth data row is sheet row 6
+                self.assertEqual(list(job.row_errors.values_list('row_number', flat=True)), [6])
@@ -0,0 +1,68 @@
+from django.utils import timezone
+
+from dashboard.lead_dedup import LeadDuplicateDetector, LeadMergeService
+from dashboard.models import Event, EventRegistration, Lead, LeadNote
+
+from .base import CRMTestCase
+
+
+class LeadMergeTests(CRMTestCase):
+    def setUp(self):
+        self.original = self.make_lead('9876543210', email='asha@example.com', notes='Prefers 3BHK')
+        self.duplicate = self.make_lead('+91 98765 43210', email='ASHA.K@example.com')
+        self.other = self.make_lead('9876500000', email='asha.k@example.com')
+        self.event = Event.objects.create(
+            name='Launch', event_type='property_launch', description='Launch', start_date=timezone.now(),
+            end_date=timezone.now(), location='Gurugram', venue_address='Sector 65', created_by=self.system_user
+        )
+
+    def test_detect_links_leads_sharing_any_key_to_the_earliest(self):
+        result = LeadDuplicateDetector().detect()
+
+        self.assertEqual((result['clusters'], result['duplicates_found']), (1, 2))
+        self.assertEqual(
+            set(Lead.objects.filter(is_duplicate=True).values_list('original_lead_id', flat=True)), {self.original.id}
+        )
+        self.assertEqual(LeadDuplicateDetector().detect()['duplicates_found'], 0)
+
+    def test_merge_repoints_related_rows_and_unions_projects(self):
+        skyline, harbour = self.make_project('Skyline'), self.make_project('Harbour')
+        self.original.interested_projects.add(skyline)
+        self.duplicate.interested_projects.add(skyline, harbour)
+        note = LeadNote.objects.create(lead=self.duplicate, note='Asked for a site visit', created_by=self.system_user)
+        kept = EventRegistration.objects.create(event=self.event, lead=self.original)
+        EventRegistration.objects.create(event=self.event, lead=self.duplicate)
+
+        LeadDuplicateDetector().detect()
+        result = LeadMergeService().merge_marked()
+
+        self.assertEqual((result['clusters'], result['merged_leads']), (1, 2))
+        self.assertEqual(list(Lead.objects.values_list('id', flat=True)), [self.original.id])
+        note.refresh_from_db()
+        self.assertEqual(note.lead_id, self.original.id)
+        # The duplicate's registration for the same event would violate unique_together
+        self.assertEqual(list(EventRegistration.objects.values_list('id', flat=True)), [kept.id])
+        self.assertEqual(set(self.original.interested_projects.all()), {skyline, harbour})
+
+        self.original.refresh_from_db()
+        self.assertTrue(self.original.notes.startswith('Prefers 3BHK'))
+        self.assertIn(f"Merged with duplicate lead: {self.duplicate.name}", self.original.notes)
+
+    def test_failed_cluster_rolls_back_its_batch(self):
+        note = LeadNote.objects.create(lead=self.duplicate, note='Call back', created_by=self.system_user)
+        spare = self.make_lead('9876511111')
+        service = LeadMergeService()
+        merge_cluster = service._merge_cluster
+
+        def fail_on_other(original_id, duplicate_ids):
+            if original_id == self.other.id:
+                raise RuntimeError('deadlock')
+            return merge_cluster(original_id, duplicate_ids)
+
+        service._merge_cluster = fail_on_other
+        with self.assertRaises(RuntimeError):
+            service.merge_clusters({self.original.id: [self.duplicate.id], self.other.id: [spare.id]})
+
+        self.assertEqual(Lead.objects.count(), 4)
+        note.refresh_from_db()
+        self.assertEqual(note.lead_id, self.duplicate.id)
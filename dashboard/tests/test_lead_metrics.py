@@ -0,0 +1,50 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from dashboard.lead_metrics import LeadMetricsRollup
+from dashboard.models import Lead, LeadDailyMetric, LeadMetricDirtyDay
+
+from .base import CRMTestCase
+
+
+class LeadMetricsRollupTests(CRMTestCase):
+    def setUp(self):
+        self.day = timezone.now() - timedelta(days=10)
+        self.leads = [self.make_lead(f"98765000{index:02d}") for index in range(3)]
+        # Old leads, so only queued days (not timestamps) bring their day into an incremental build
+        Lead.objects.update(created_at=self.day, updated_at=self.day)
+        for lead in self.leads:
+            lead.refresh_from_db()
+        self.project = self.make_project('Skyline')
+        self.rollup = LeadMetricsRollup()
+        self.rollup.refresh(full=True)
+
+    def created(self, **filters):
+        return LeadDailyMetric.objects.filter(**filters).aggregate(total=Sum('created'))['total'] or 0
+
+    def test_deleted_lead_is_removed_on_the_next_incremental_build(self):
+        self.leads[0].delete()
+
+        with mock.patch('dashboard.lead_metrics.report_cache.bump') as bump:
+            self.assertEqual(self.rollup.refresh(), 1)
+        bump.assert_called_once()
+        self.assertEqual(self.created(project__isnull=True), 2)
+        self.assertFalse(LeadMetricDirtyDay.objects.exists())
+
+    def test_project_interest_edits_are_rebuilt(self):
+        self.leads[0].interested_projects.add(self.project)
+        self.project.interested_leads.add(self.leads[1])
+        self.rollup.refresh()
+        self.assertEqual(self.created(project=self.project), 2)
+
+        self.project.interested_leads.clear()
+        self.rollup.refresh()
+        self.assertEqual(self.created(project=self.project), 0)
+
+    def test_unchanged_rollup_is_not_rebuilt(self):
+        with mock.patch('dashboard.lead_metrics.report_cache.bump') as bump:
+            self.assertEqual(self.rollup.refresh(), 0)
+        bump.assert_not_called()
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from dashboard.models import Attendance, Lead
+from dashboard.pagination import KeysetPaginator
+
+from .base import CRMTestCase
+
+
+def walk(paginator):
+    """Every page front to back, then back to front again through the previous cursors"""
+    forward = [paginator.page()]
+    while forward[-1].has_next:
+        forward.append(paginator.page(forward[-1].next_cursor))
+    backward = [forward[-1]]
+    while backward[-1].has_previous:
+        backward.append(paginator.page(backward[-1].previous_cursor))
+    return [[row.id for row in page] for page in forward], [[row.id for row in page] for page in reversed(backward)]
+
+
+class KeysetPaginatorTests(CRMTestCase):
+    def setUp(self):
+        today = date.today()
+        created = timezone.now() - timedelta(days=3)
+        follow_ups = [today, None, today + timedelta(days=1), today, None, None, today + timedelta(days=1), today]
+        for index, follow_up in enumerate(follow_ups):
+            lead = self.make_lead(f"98765000{index:02d}")
+            # Pairs of leads share created_at, so the id key has to break the tie
+            Lead.objects.filter(id=lead.id).update(follow_up_date=follow_up, created_at=created + timedelta(hours=index // 2))
+
+    def expected(self):
+        leads = list(Lead.objects.all())
+        leads.sort(key=lambda lead: -lead.id)
+        leads.sort(key=lambda lead: lead.created_at, reverse=True)
+        leads.sort(key=lambda lead: (lead.follow_up_date is None, lead.follow_up_date or date.min))
+        return [lead.id for lead in leads]
+
+    def test_pages_cover_a_nullable_key_in_order_both_ways(self):
+        paginator = KeysetPaginator(Lead.objects.all(), ['follow_up_date', '-created_at', '-id'], per_page=3, count=None)
+        forward, backward = walk(paginator)
+
+        expected = self.expected()
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(forward, [expected[0:3], expected[3:6], expected[6:8]])
+        # Walking back re-serves the same pages, the first one full
+        self.assertEqual(backward, forward)
+
+    def test_related_key_ties_are_broken_by_id(self):
+        names = ['Meera', 'Arjun', 'Meera', 'Arjun', 'Zoya']
+        employees = [User.objects.create_user(f"user{index}", first_name=name) for index, name in enumerate(names)]
+        for day in (date(2026, 1, 2), date(2026, 1, 1)):
+            for employee in employees:
+                Attendance.objects.create(employee=employee, date=day, created_by=self.system_user)
+
+        paginator = KeysetPaginator(
+            Attendance.objects.select_related('employee'), ['-date', 'employee__first_name', 'id'], per_page=4, count='exact'
+        )
+        forward, backward = walk(paginator)
+
+        expected = list(Attendance.objects.order_by('-date', 'employee__first_name', 'id').values_list('id', flat=True))
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward)
+        self.assertEqual(paginator.page().count, 10)
+
+    def test_malformed_cursor_serves_the_first_page(self):
+        paginator = KeysetPaginator(Lead.objects.all(), ['-created_at', '-id'], per_page=3, count=None)
+        first = paginator.page()
+        self.assertEqual([lead.id for lead in paginator.page('not-a-cursor')], [lead.id for lead in first])
+        self.assertFalse(first.has_previous)
@@ -0,0 +1,23 @@
+from django.urls import reverse
+
+from dashboard.models import LeadStage
+
+from .base import CRMTestCase
+
+
+class ProjectDetailsTests(CRMTestCase):
+    def test_lead_stats_come_from_one_aggregate(self):
+        hot = LeadStage.objects.create(name='Hot', category='hot', order=2)
+        closed = LeadStage.objects.create(name='Booked', category='closed', order=3)
+        project, other = self.make_project('Skyline'), self.make_project('Harbour')
+        for index, stage in enumerate([hot, hot, closed, self.stage]):
+            lead = self.make_lead(f"98765000{index:02d}", current_stage=stage)
+            # A lead interested in several projects is still counted once
+            lead.interested_projects.add(project, other)
+        self.make_lead('9876511111', current_stage=hot).interested_projects.add(other)
+
+        self.client.force_login(self.system_user)
+        response = self.client.get(reverse('project_details', args=[project.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['lead_stats'], {'total': 4, 'hot': 2, 'warm': 0, 'cold': 0, 'converted': 1})
@@ -0,0 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        call_command('check_query_plans', stdout=StringIO())
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.test import override_settings
+
+from dashboard import report_cache
+from dashboard.models import ReportGeneration
+
+from .base import CRMTestCase
+
+
+@override_settings(REPORT_CACHE_SECONDS=600, REPORT_CACHE_STALE_SECONDS=0)
+class ReportCacheTests(CRMTestCase):
+    def test_bump_invalidates_cached_reports(self):
+        computed = []
+
+        def compute():
+            computed.append(1)
+            return {'leads': len(computed)}
+
+        self.assertEqual(report_cache.cached('reports', {'days': 30}, compute), {'leads': 1})
+        self.assertEqual(report_cache.cached('reports', {'days': 30}, compute), {'leads': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report_cache.bump()
+        self.assertEqual(report_cache.cached('reports', {'days': 30}, compute), {'leads': 2})
+
+    def test_bumps_in_one_transaction_share_one_increment(self):
+        start = report_cache.generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for _ in range(5):
+                report_cache.bump()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(report_cache.generation(), start + 1)
+        self.assertEqual(ReportGeneration.objects.get().value, start + 1)
+
+    def test_rolled_back_bump_does_not_block_a_later_one(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    report_cache.bump()
+                    raise RuntimeError('rolled back')
+            except RuntimeError:
+                pass
+            report_cache.bump()
+        self.assertEqual(len(callbacks), 1)
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from dashboard.models import WebhookEvent, WhatsAppMessage
+from dashboard.webhook_inbox import WebhookInboxWorker
+
+from .base import CRMTestCase
+
+
+class WebhookInboxTests(CRMTestCase):
+    def setUp(self):
+        self.lead = self.make_lead('9876543210')
+        self.message = WhatsAppMessage.objects.create(
+            lead=self.lead, message_content='Template: project_intro', phone_number=self.lead.phone_e164,
+            status='sent', message_id='wamid.inbox'
+        )
+
+    def status_event(self, key, status):
+        return WebhookEvent.objects.create(
+            source='whatsapp_status', idempotency_key=key,
+            payload={'statuses': [{'id': 'wamid.inbox', 'status': status, 'timestamp': '1729161280'}]}
+        )
+
+    def test_claim_is_exclusive_until_the_lease_expires(self):
+        self.status_event('status:1', 'delivered')
+        first = WebhookInboxWorker(worker_id='worker-a')
+        self.assertEqual(len(first.claim_batch()), 1)
+        self.assertEqual(WebhookInboxWorker(worker_id='worker-b').claim_batch(), [])
+
+        WebhookEvent.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        reclaimed = WebhookInboxWorker(worker_id='worker-b').claim_batch()
+        self.assertEqual([event.attempts for event in reclaimed], [2])
+
+    def test_batch_applies_statuses_and_marks_events_done(self):
+        self.status_event('status:1', 'delivered')
+        self.status_event('status:2', 'read')
+        worker = WebhookInboxWorker(worker_id='worker-a')
+
+        self.assertEqual(worker.process_batch(worker.claim_batch()), {'done': 2, 'failed': 0})
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, 'read')
+        self.assertEqual(WebhookEvent.objects.filter(status='done', lease_owner='').count(), 2)
+
+    def test_failing_event_is_parked_after_max_attempts(self):
+        WebhookEvent.objects.create(source='ivr_call', idempotency_key='ivr_call:bad', payload={})
+        worker = WebhookInboxWorker(max_attempts=2, worker_id='worker-a')
+
+        worker.process_batch(worker.claim_batch())
+        self.assertEqual(WebhookEvent.objects.get().status, 'pending')
+        worker.process_batch(worker.claim_batch())
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'failed')
+        self.assertIn('No phone number', event.last_error)
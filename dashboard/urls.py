@@ -23,6 +23,8 @@ urlpatterns = [
     path('whatsapp-campaigns/run/', tata_campaign_views.run_whatsapp_campaign, name='run_whatsapp_campaign'),
     path('whatsapp-campaigns/preview/', tata_campaign_views.campaign_preview, name='campaign_preview'),
     path('whatsapp-campaigns/status/', tata_campaign_views.campaign_status, name='campaign_status'),
+    path('whatsapp-campaigns/jobs/<int:job_id>/', tata_campaign_views.campaign_job_status, name='campaign_job_status'),
+    path('whatsapp-campaigns/jobs/<int:job_id>/cancel/', tata_campaign_views.cancel_campaign_job, name='cancel_campaign_job'),
     path('whatsapp-campaigns/analytics/', tata_campaign_views.campaign_analytics, name='campaign_analytics'),
     
     # Template and Media Validation
@@ -81,6 +83,8 @@ urlpatterns = [
     path('leads/followup/', views.followup_leads, name='followup_leads'),
     path('leads/closed/', views.closed_leads, name='closed_leads'),
     path('leads/bulk-upload/', views.bulk_upload_leads, name='bulk_upload_leads'),
+    path('leads/import-jobs/<int:job_id>/', views.lead_import_job_status, name='lead_import_job_status'),
+    path('leads/import-jobs/<int:job_id>/errors.csv', views.lead_import_errors_csv, name='lead_import_errors_csv'),
     path('ajax/create-brochure-lead/', views.create_brochure_lead, name='create_brochure_lead'),
     
     # Lead Management
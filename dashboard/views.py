@@ -5,7 +5,8 @@ from django.contrib.auth.models import User
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
 from django.db.models import Q, Count, Sum, Avg, F, fields, ExpressionWrapper
 from django.db import models
 from django.db.models.functions import TruncMonth, TruncDate
@@ -16,10 +17,20 @@ from .models import (Project, ProjectImage, Lead, TeamMember, Meeting, Earning,
                      Task, TaskStage, TaskCategory, CalendarEvent, Notification, 
                      Attendance, LeadNote, IVRCallLog, LeadStage, WhatsAppTemplate, 
                      Client, ProjectUnit, MarketingExpense, WhatsAppMessage, 
-                     LeaveType, LeaveApplication, CompOffRequest)
+                     LeaveType, LeaveApplication, CompOffRequest, LeadImportJob)
 from .tata_sync import TATASync
+from .lead_import import LeadImportPipeline, LeadImportJobRunner
+from .lead_dedup import LeadDuplicateDetector, LeadMergeService
+from . import ivr_ingest, kpi, report_cache, webhook_inbox
+from .lead_stats import LeadStatsService
+from .lead_metrics import lead_metrics
+from .team_metrics import TeamMetricsService
+from .pagination import page_size, paginate
+from .upload_streaming import iter_upload_chunks
+import csv
 import json
 from urllib.parse import urlencode
+from itertools import chain
 import pandas as pd
 import smtplib
 from email.mime.text import MIMEText
@@ -38,27 +49,25 @@ from django.db.models.functions import TruncMonth, TruncDate
 
 @login_required
 def dashboard(request):
-    # Get statistics
-    total_projects = Project.objects.filter(is_active=True).count()
-    total_leads = Lead.objects.count()
+    # Get statistics (precomputed counters, one query)
+    kpis = kpi.snapshot()
+    total_projects = kpis['total_projects']
+    total_leads = kpis['total_leads']
     
     # Get leads by stage category
-    hot_leads = Lead.objects.filter(current_stage__category='hot').count()
-    warm_leads = Lead.objects.filter(current_stage__category='warm').count()
-    cold_leads = Lead.objects.filter(current_stage__category='cold').count()
-    converted_leads = Lead.objects.filter(current_stage__category='closed').count()
+    hot_leads = kpis['leads_hot']
+    warm_leads = kpis['leads_warm']
+    cold_leads = kpis['leads_cold']
+    converted_leads = kpis['leads_closed']
     
     # Latest projects for carousel (ordered by latest updated first)
     latest_projects = Project.objects.filter(is_active=True).order_by('-updated_at', '-created_at')[:12]
     
     # Featured projects
-    featured_projects = Project.objects.filter(status='featured', is_active=True)[:3]
+    featured_projects = Project.objects.filter(status='featured', is_active=True).with_lead_metrics()[:3]
     
     # Monthly earnings
-    current_month = timezone.now().month
-    monthly_earnings = Earning.objects.filter(
-        date_earned__month=current_month
-    ).aggregate(total=Sum('commission_amount'))['total'] or 0
+    monthly_earnings = kpis['monthly_earnings']
     
     # Lead status distribution for chart
     lead_stats = {
@@ -76,12 +85,9 @@ def dashboard(request):
     
     if request.user.is_authenticated:
         unread_notifications = Notification.objects.filter(recipient=request.user, is_read=False).count()
-        active_leads = Lead.objects.filter(current_stage__category__in=['warm', 'hot']).count()
-        overdue_followups = Lead.objects.filter(
-            follow_up_date__lt=timezone.now().date(),
-            current_stage__category__in=['warm', 'hot']
-        ).count()
-        closed_leads = Lead.objects.filter(current_stage__category='closed').count()
+        active_leads = warm_leads + hot_leads
+        overdue_followups = kpis['overdue_followups']
+        closed_leads = converted_leads
     
     context = {
         'total_projects': total_projects,
@@ -140,7 +146,7 @@ def projects(request):
     search_query = request.GET.get('search', '')
     
     # Start with all active projects
-    projects_list = Project.objects.filter(is_active=True).prefetch_related('images')
+    projects_list = Project.objects.filter(is_active=True).prefetch_related('images').with_lead_metrics()
     
     # Apply filters
     if status_filter:
@@ -260,13 +266,14 @@ def project_details(request, project_id):
     if project.features:
         features_list = [feature.strip() for feature in project.features.split(',') if feature.strip()]
     
-    # Lead statistics for this project
+    # Lead statistics for this project, in one aggregate
+    stats = LeadStatsService(project=project).stats()
     lead_stats = {
-        'total': interested_leads.count(),
-        'hot': interested_leads.filter(current_stage__category='hot').count(),
-        'warm': interested_leads.filter(current_stage__category='warm').count(),
-        'cold': interested_leads.filter(current_stage__category='cold').count(),
-        'converted': interested_leads.filter(current_stage__category='closed').count(),
+        'total': stats['total'],
+        'hot': stats['hot'],
+        'warm': stats['warm'],
+        'cold': stats['cold'],
+        'converted': stats['closed'],
     }
     
     context = {
@@ -321,8 +328,8 @@ def create_brochure_lead(request):
         
         try:
             # Check if lead already exists
-            existing_lead = Lead.objects.filter(
-                Q(email=data['email']) | Q(phone=data['phone'])
+            existing_lead = (
+                Lead.objects.filter(email=data['email']) | Lead.objects.matching_phone(data['phone'])
             ).first()
             
             if existing_lead:
@@ -360,14 +367,14 @@ def leads(request):
     status_filter = request.GET.get('stage', '')
     source_filter = request.GET.get('source', '')
     search_query = request.GET.get('search', '')
-    rows_per_page = int(request.GET.get('rows_per_page', 25))
+    rows_per_page = page_size(request)
     
     # Start with all leads
     leads_list = Lead.objects.all().select_related('assigned_to', 'current_stage').prefetch_related('interested_projects')
     
     # Apply filters
     if status_filter:
-        leads_list = leads_list.filter(current_stage__category=status_filter)
+        leads_list = leads_list.filter(stage_category=status_filter)
     
     if source_filter:
         leads_list = leads_list.filter(source=source_filter)
@@ -379,10 +386,8 @@ def leads(request):
             Q(phone__icontains=search_query)
         )
     
-    # Pagination
-    paginator = Paginator(leads_list, rows_per_page)
-    page_number = request.GET.get('page')
-    leads = paginator.get_page(page_number)
+    # Keyset pagination, newest first
+    leads = paginate(request, leads_list, ['-created_at', '-id'], per_page=rows_per_page)
     
     # Get all team members for assignment
     team_members = User.objects.filter(teammember__isnull=False)
@@ -395,6 +400,7 @@ def leads(request):
         'current_stage': status_filter,
         'current_source': source_filter,
         'search_query': search_query,
+        'import_jobs': LeadImportJob.objects.filter(created_by=request.user).order_by('-created_at')[:5],
     }
     
     return render(request, 'dashboard/leads.html', context)
@@ -571,10 +577,12 @@ def add_lead_note(request):
 # Team Management Views (keeping your existing ones)
 @login_required
 def team(request):
-    team_members = TeamMember.objects.select_related('user').all()
+    team_members = list(TeamMember.objects.select_related('user').all())
+    team_metrics = TeamMetricsService(team_members).attach()
     
     context = {
         'team_members': team_members,
+        'team_metrics': team_metrics,
     }
     
     return render(request, 'dashboard/team.html', context)
@@ -760,6 +768,8 @@ def profile(request):
         team_member = request.user.teammember
     except TeamMember.DoesNotExist:
         team_member = None
+    if team_member:
+        TeamMetricsService([team_member]).attach()
     
     if request.method == 'POST':
         try:
@@ -873,44 +883,48 @@ def update_lead_status(request):
 # Other views
 @login_required
 def reports(request):
-    from django.db.models import Count, Q
-    from django.db.models.functions import TruncMonth, TruncDate
-    from datetime import datetime, timedelta
-    
-    # Lead statistics by source
-    leads_by_source = Lead.objects.values('source').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    context = report_cache.cached('reports', {}, _reports_context)
+    return render(request, 'dashboard/reports.html', context)
+
+
+def _reports_context():
+    from django.db.models import Sum
+    from django.db.models.functions import TruncMonth
     
+    # Breakdowns, trends and activity come from the daily rollup rather than raw leads
+    metrics = lead_metrics()
+    today = timezone.now().date()
+
     # Lead statistics by stage category
-    leads_by_stage = Lead.objects.values('current_stage__category').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    leads_by_stage = [
+        {'current_stage__category': item['stage_category'] or None, 'count': item['count']}
+        for item in metrics.values('stage_category').annotate(count=Sum('created')).filter(count__gt=0).order_by('-count')
+    ]
 
     # Lead statistics by project
-    leads_by_project = Lead.objects.filter(
-        interested_projects__isnull=False
-    ).values('interested_projects__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    
-    # Monthly trends (last 12 months) - SQLite compatible
-    monthly_leads = Lead.objects.filter(
-        created_at__gte=timezone.now() - timedelta(days=365)
+    leads_by_project = list(
+        lead_metrics(by_project=True).values('project__name').annotate(
+            count=Sum('created')
+        ).filter(count__gt=0).order_by('-count')[:10]
+    )
+    for item in leads_by_project:
+        item['interested_projects__name'] = item.pop('project__name')
+    
+    # Monthly trends (last 12 months)
+    monthly_leads = metrics.filter(
+        date__gte=today - timedelta(days=365)
     ).annotate(
-        month=TruncMonth('created_at')
+        month=TruncMonth('date')
     ).values('month').annotate(
-        count=Count('id')
+        count=Sum('created')
     ).order_by('month')
     
-    # Daily activity (last 30 days) - SQLite compatible
-    daily_activity = Lead.objects.filter(
-        created_at__gte=timezone.now() - timedelta(days=30)
-    ).annotate(
-        date=TruncDate('created_at')
+    # Daily activity (last 30 days)
+    daily_activity = metrics.filter(
+        date__gte=today - timedelta(days=30)
     ).values('date').annotate(
-        count=Count('id')
-    ).order_by('date')
+        count=Sum('created')
+    ).filter(count__gt=0).order_by('date')
     
     # Convert monthly data for template
     monthly_data = []
@@ -929,15 +943,16 @@ def reports(request):
         })
     
     # Lead conversion funnel
-    total_leads = Lead.objects.count()
-    warm_leads = Lead.objects.filter(current_stage__category='warm').count()
-    hot_leads = Lead.objects.filter(current_stage__category='hot').count()
-    converted_leads = Lead.objects.filter(current_stage__category='closed').count()
+    kpis = kpi.snapshot()
+    total_leads = kpis['total_leads']
+    warm_leads = kpis['leads_warm']
+    hot_leads = kpis['leads_hot']
+    converted_leads = kpis['leads_closed']
 
     # Lead statistics by source with percentages
-    leads_by_source = Lead.objects.values('source').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    leads_by_source = list(metrics.values('source').annotate(
+        count=Sum('created')
+    ).filter(count__gt=0).order_by('-count'))
 
     # Add percentage calculation
     for item in leads_by_source:
@@ -958,8 +973,7 @@ def reports(request):
         'hot_leads': hot_leads,
         'converted_leads': converted_leads,
     }
-    
-    return render(request, 'dashboard/reports.html', context)
+    return context
 
 @login_required
 def earnings(request):
@@ -982,7 +996,7 @@ def clients(request):
 def calendar(request):
     """View for the calendar page"""
     projects = Project.objects.filter(is_active=True).order_by('name')
-    active_leads = Lead.objects.exclude(current_stage__category='lost').order_by('name')
+    active_leads = Lead.objects.exclude(stage_category='lost').order_by('name')
     team_members = TeamMember.objects.select_related('user').all()
     
     context = {
@@ -1130,7 +1144,7 @@ def edit_event(request, event_id):
             messages.error(request, f'Error updating event: {str(e)}')
     
     projects = Project.objects.filter(is_active=True).order_by('name')
-    active_leads = Lead.objects.exclude(current_stage__category='lost').order_by('name')
+    active_leads = Lead.objects.exclude(stage_category='lost').order_by('name')
     team_members = TeamMember.objects.select_related('user').all()
     
     context = {
@@ -1178,7 +1192,7 @@ def tasks(request):
     stages = TaskStage.objects.all().order_by('order')
     categories = TaskCategory.objects.all()
     projects = Project.objects.filter(is_active=True)
-    leads = Lead.objects.exclude(current_stage__category='lost')
+    leads = Lead.objects.exclude(stage_category='lost')
     team_members = TeamMember.objects.select_related('user').all()
     
     context = {
@@ -1344,7 +1358,7 @@ def edit_task(request, task_id):
     stages = TaskStage.objects.all().order_by('order')
     categories = TaskCategory.objects.all()
     projects = Project.objects.filter(is_active=True)
-    leads = Lead.objects.exclude(current_stage__category='lost')
+    leads = Lead.objects.exclude(stage_category='lost')
     team_members = TeamMember.objects.select_related('user').all()
     
     context = {
@@ -1477,60 +1491,11 @@ def analytics(request):
     team_filter = request.GET.get('team', '')
     source_filter = request.GET.get('source', '')
     
-    # Base querysets
-    projects = Project.objects.filter(is_active=True)
-    leads = Lead.objects.all()
-    expenses = MarketingExpense.objects.all()
-
-    # Apply filters
-    if project_filter:
-        leads = leads.filter(interested_projects__id=project_filter)
-        expenses = expenses.filter(category=project_filter) # Assuming expense category matches project
-    if team_filter:
-        leads = leads.filter(assigned_to_id=team_filter)
-    if source_filter:
-        leads = leads.filter(source=source_filter)
-        
-    # Aggregate data
-    if team_filter:
-        # Team-based analytics
-        team_member = get_object_or_404(User, id=team_filter)
-        analytics_data = [{
-            'dimension': team_member.get_full_name(),
-            'total_leads': leads.count(),
-            'conversion_rate': (leads.filter(current_stage__category='closed').count() * 100.0 / leads.count()) if leads.count() > 0 else 0,
-            'total_cost': 0, # CPL for team member is complex, omitting for now
-            'cpl': 0
-        }]
-    elif project_filter:
-         # Project-based analytics
-        project = get_object_or_404(Project, id=project_filter)
-        analytics_data = [{
-            'dimension': project.name,
-            'total_leads': leads.count(),
-            'conversion_rate': project.conversion_rate,
-            'total_cost': 0,
-            'cpl': 0
-        }]
-    else:
-        # Overall analytics grouped by project
-        analytics_data = Project.objects.filter(is_active=True).annotate(
-            total_leads=Count('interested_leads'),
-            converted_leads=Count('interested_leads', filter=Q(interested_leads__current_stage__category='closed')),
-        ).annotate(
-            conversion_rate=ExpressionWrapper(
-                (F('converted_leads') * 100.0 / F('total_leads')),
-                output_field=fields.FloatField()
-            )
-        ).values('name', 'total_leads', 'conversion_rate')
-        
-        analytics_data = [{
-            'dimension': item['name'],
-            'total_leads': item['total_leads'],
-            'conversion_rate': item['conversion_rate'] or 0,
-            'total_cost': 0,
-            'cpl': 0,
-        } for item in analytics_data]
+    analytics_data = report_cache.cached(
+        'analytics',
+        {'project': project_filter, 'team': team_filter, 'source': source_filter},
+        lambda: _analytics_data(project_filter, team_filter, source_filter)
+    )
 
     context = {
         'analytics_data': analytics_data,
@@ -1544,6 +1509,49 @@ def analytics(request):
     return render(request, 'dashboard/analytics.html', context)
 
 
+def _analytics_data(project_filter, team_filter, source_filter):
+    """Per-dimension lead totals and conversion rates for the analytics page"""
+    from django.db.models import Sum
+
+    def row(dimension, total_leads, converted_leads):
+        total_leads = total_leads or 0
+        return {
+            'dimension': dimension,
+            'total_leads': total_leads,
+            'conversion_rate': (converted_leads or 0) * 100.0 / total_leads if total_leads else 0,
+            'total_cost': 0, # CPL per dimension is complex, omitting for now
+            'cpl': 0,
+        }
+        
+    # Aggregate data
+    if team_filter:
+        # Team-based analytics from the member's rollup rows
+        team_member = get_object_or_404(User, id=team_filter)
+        metrics = lead_metrics(by_project=bool(project_filter), assigned_to_id=team_filter)
+        if project_filter:
+            metrics = metrics.filter(project_id=project_filter)
+        if source_filter:
+            metrics = metrics.filter(source=source_filter)
+        totals = metrics.aggregate(
+            total_leads=Sum('created'),
+            converted_leads=Sum('created', filter=Q(stage_category='closed'))
+        )
+        analytics_data = [row(team_member.get_full_name(), totals['total_leads'], totals['converted_leads'])]
+    else:
+        # Project-based analytics (one project, or every active one) from the rollup's project rows
+        projects = Project.objects.with_lead_metrics(source=source_filter or None, from_rollup=True)
+        if project_filter:
+            projects = [get_object_or_404(projects, id=project_filter)]
+        else:
+            projects = projects.filter(is_active=True)
+        analytics_data = [
+            row(project.name, project.total_leads, project.converted_leads)
+            for project in projects
+        ]
+
+    return analytics_data
+
+
 @login_required
 def automation(request):
     """Automation hub page"""
@@ -1577,21 +1585,14 @@ def bulk_email(request):
                 messages.error(request, 'Please upload an Excel file.')
                 return redirect('bulk_email')
             
-            # Save file temporarily
-            file_name = default_storage.save(f'temp/{excel_file.name}', ContentFile(excel_file.read()))
-            file_path = default_storage.path(file_name)
-            
             try:
-                # Read Excel file (support both Excel and CSV)
-                if file_name.endswith('.csv'):
-                    df = pd.read_csv(file_path)
-                else:
-                    df = pd.read_excel(file_path)
+                # Stream the file (Excel or CSV) in bounded chunks straight from the upload
+                chunks = (chunk for _, chunk in iter_upload_chunks(excel_file))
+                first_chunk = next(chunks, None)
                 
                 # Validate columns
-                if 'name' not in df.columns or 'email' not in df.columns:
+                if first_chunk is None or 'name' not in first_chunk.columns or 'email' not in first_chunk.columns:
                     messages.error(request, 'File must have "name" and "email" columns.')
-                    default_storage.delete(file_name)
                     return redirect('bulk_email')
                 
                 # Enhanced SMTP connection test
@@ -1602,8 +1603,6 @@ def bulk_email(request):
                     server.quit()
                     
                 except smtplib.SMTPAuthenticationError as e:
-                    default_storage.delete(file_name)
-                    
                     if provider_name == 'sendgrid':
                         messages.error(request, 
                             '🔐 SendGrid Authentication Failed!\n\n'
@@ -1634,7 +1633,6 @@ def bulk_email(request):
                     return redirect('bulk_email')
                     
                 except Exception as e:
-                    default_storage.delete(file_name)
                     messages.error(request, f'Connection error: {str(e)}')
                     return redirect('bulk_email')
                 
@@ -1646,15 +1644,19 @@ def bulk_email(request):
                 sent_count = 0
                 failed_count = 0
                 failed_emails = []
-                total_emails = len(df)
+                total_emails = 0
                 
-                print(f"Starting bulk email via {provider_name} to {total_emails} recipients...")
+                print(f"Starting bulk email via {provider_name}...")
                 
-                # Send emails
-                for index, row in df.iterrows():
+                # Send emails (blank spreadsheet rows are not recipients)
+                rows = chain.from_iterable(
+                    chunk[['name', 'email']].dropna(how='all').itertuples(index=False) for chunk in chain([first_chunk], chunks)
+                )
+                for row in rows:
+                    total_emails += 1
                     try:
-                        name = str(row['name']).strip()
-                        email = str(row['email']).strip()
+                        name = str(row.name).strip()
+                        email = str(row.email).strip()
                         
                         if not email or '@' not in email:
                             failed_count += 1
@@ -1683,7 +1685,6 @@ def bulk_email(request):
                         failed_emails.append(f"{email} ({str(e)})")
                 
                 server.quit()
-                default_storage.delete(file_name)
                 
                 # Success message
                 if sent_count > 0:
@@ -1702,8 +1703,6 @@ def bulk_email(request):
                     return redirect('bulk_email')
                 
             except Exception as e:
-                if 'file_name' in locals():
-                    default_storage.delete(file_name)
                 messages.error(request, f'Error processing file: {str(e)}')
                 return redirect('bulk_email')
             
@@ -1728,12 +1727,6 @@ def bulk_upload_leads(request):
     """Bulk upload leads from Excel/CSV file"""
     if request.method == 'POST':
         try:
-            import pandas as pd
-            from django.core.files.storage import default_storage
-            from django.core.files.base import ContentFile
-            from django.http import HttpResponseRedirect
-           
-            
             # Get form data
             bulk_file = request.FILES.get('bulk_file')
             default_source = request.POST.get('default_source', 'website')
@@ -1744,121 +1737,84 @@ def bulk_upload_leads(request):
                 messages.error(request, 'Please upload a file.')
                 return redirect('leads')
             
-            # Save file temporarily
-            file_name = default_storage.save(f'temp/{bulk_file.name}', ContentFile(bulk_file.read()))
-            file_path = default_storage.path(file_name)
-            
+            # Validate required columns from the header before queueing the file
             try:
-                # Read file based on extension
-                if bulk_file.name.endswith('.csv'):
-                    df = pd.read_csv(file_path)
-                else:
-                    df = pd.read_excel(file_path)
-                
-                # Validate required columns
-                required_columns = ['name', 'email', 'phone']
-                missing_columns = [col for col in required_columns if col not in df.columns]
-                
-                if missing_columns:
-                    default_storage.delete(file_name)
-                    messages.error(request, f'Missing required columns: {", ".join(missing_columns)}')
-                    return redirect('leads')
-                
-                created_count = 0
-                skipped_count = 0
-                error_count = 0
-                errors = []
-                
-                for index, row in df.iterrows():
-                    try:
-                        name = str(row['name']).strip()
-                        email = str(row['email']).strip().lower()
-                        phone = str(row['phone']).strip()
-                        
-                        # Skip empty rows
-                        if not name or not email or not phone:
-                            skipped_count += 1
-                            continue
-                        
-                        # Check for duplicates
-                        if skip_duplicates:
-                            existing = Lead.objects.filter(
-                                Q(email=email) | Q(phone=phone)
-                            ).first()
-                            
-                            if existing:
-                                skipped_count += 1
-                                continue
-                        
-                        # Get optional fields
-                        source = row.get('source', default_source) if 'source' in df.columns else default_source
-                        status = row.get('status', default_status) if 'status' in df.columns else default_status
-                        budget_min = row.get('budget_min') if 'budget_min' in df.columns else None
-                        budget_max = row.get('budget_max') if 'budget_max' in df.columns else None
-                        notes = row.get('notes', '') if 'notes' in df.columns else ''
-                        
-                        # Validate source and status
-                        valid_sources = [choice[0] for choice in Lead.SOURCE_CHOICES]
-                        
-                        if source not in valid_sources:
-                            source = default_source
-                        
-                        # Create lead
-                        lead = Lead.objects.create(
-                            name=name,
-                            email=email,
-                            phone=phone,
-                            source=source,
-                            budget_min=budget_min if pd.notna(budget_min) else None,
-                            budget_max=budget_max if pd.notna(budget_max) else None,
-                            notes=notes
-                        )
-                        
-                        # Set lead stage
-                        stage = LeadStage.objects.filter(category=status).order_by('order').first()
-                        if stage:
-                            lead.current_stage = stage
-                            lead.save()
-
-                        created_count += 1
-                        
-                    except Exception as e:
-                        error_count += 1
-                        errors.append(f"Row {index + 2}: {str(e)}")
-                
-                # Clean up temp file
-                default_storage.delete(file_name)
-                
-                # Prepare success message
-                success_msg = f'✅ Bulk upload completed! Created: {created_count} leads'
-                if skipped_count > 0:
-                    success_msg += f', Skipped: {skipped_count} duplicates'
-                if error_count > 0:
-                    success_msg += f', Errors: {error_count}'
-                
-                messages.success(request, success_msg)
-                
-                if errors:
-                    error_msg = 'Errors encountered:\n' + '\n'.join(errors[:10])  # Show first 10 errors
-                    if len(errors) > 10:
-                        error_msg += f'\n... and {len(errors) - 10} more errors'
-                    messages.warning(request, error_msg)
-                
-                return redirect('leads')
-                
+                _, header_chunk = next(iter_upload_chunks(bulk_file, chunk_rows=1))
             except Exception as e:
-                # Clean up temp file
-                if 'file_name' in locals():
-                    default_storage.delete(file_name)
                 messages.error(request, f'Error processing file: {str(e)}')
                 return redirect('leads')
             
+            missing_columns = LeadImportPipeline.missing_columns(header_chunk.columns)
+            if missing_columns:
+                messages.error(request, f'Missing required columns: {", ".join(missing_columns)}')
+                return redirect('leads')
+            
+            # The rows are imported by the process_lead_imports worker
+            job = LeadImportJobRunner.enqueue(
+                bulk_file,
+                default_source=default_source,
+                default_status=default_status,
+                skip_duplicates=skip_duplicates,
+                user=request.user
+            )
+            
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({
+                    'success': True,
+                    'job_id': job.id,
+                    'status_url': reverse('lead_import_job_status', args=[job.id])
+                })
+            
+            messages.success(request, f'✅ Upload queued as import job #{job.id}. Progress is shown below.')
+            return redirect('leads')
+            
         except Exception as e:
             messages.error(request, f'Error uploading leads: {str(e)}')
             return redirect('leads')
     
     return redirect('leads')
 
+def _visible_import_jobs(user):
+    """Import jobs a user may see: their own, or every job for staff"""
+    jobs = LeadImportJob.objects.all()
+    return jobs if user.is_staff else jobs.filter(created_by=user)
+
+@login_required
+def lead_import_job_status(request, job_id):
+    """Progress of a background lead import"""
+    job = get_object_or_404(_visible_import_jobs(request.user), id=job_id)
+    
+    return JsonResponse({
+        'success': True,
+        'job_id': job.id,
+        'file': job.original_name,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'created': job.created_count,
+        'skipped': job.skipped_count,
+        'failed': job.failed_count,
+        'rows_per_second': round(job.rows_per_second, 1),
+        'error': job.last_error,
+        'error_report_url': reverse('lead_import_errors_csv', args=[job.id]) if job.failed_count else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+    })
+
+@login_required
+def lead_import_errors_csv(request, job_id):
+    """Download every row error of a lead import as CSV"""
+    job = get_object_or_404(_visible_import_jobs(request.user), id=job_id)
+    
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="import_{job.id}_errors.csv"'
+    
+    writer = csv.writer(response)
+    writer.writerow(['row', 'error'])
+    for row_number, message in job.row_errors.values_list('row_number', 'message').iterator():
+        writer.writerow([row_number, message])
+    
+    return response
+
 # ... (the rest of the views remain the same, so I'll omit them for brevity)
 
 # Add the missing check_duplicate_leads function
@@ -1867,30 +1823,14 @@ def check_duplicate_leads(request):
     """Check for duplicate leads based on email and phone"""
     if request.method == 'POST':
         try:
-            duplicates_found = 0
-            
-            # Get all hot leads
-            hot_leads = Lead.objects.filter(current_stage__category='hot')
-            
-            for lead in hot_leads:
-                # Check for duplicates by email or phone
-                potential_duplicates = Lead.objects.filter(
-                    Q(email=lead.email) | Q(phone=lead.phone)
-                ).exclude(id=lead.id).order_by('created_at')
-                
-                if potential_duplicates.exists():
-                    original_lead = potential_duplicates.first()
-                    
-                    # Mark as duplicate if not already marked
-                    if not lead.is_duplicate:
-                        lead.is_duplicate = True
-                        lead.original_lead = original_lead
-                        lead.save()
-                        duplicates_found += 1
+            # Blocking-key scan across all stages; the earliest lead of each cluster stays the original
+            results = LeadDuplicateDetector().detect()
             
             return JsonResponse({
                 'success': True,
-                'duplicates_found': duplicates_found
+                'duplicates_found': results['duplicates_found'],
+                'duplicate_leads': results['duplicate_leads'],
+                'clusters': results['clusters']
             })
             
         except Exception as e:
@@ -1933,33 +1873,20 @@ def merge_duplicate_lead(request):
             import json
             data = json.loads(request.body)
             
+            merge_service = LeadMergeService()
+            
+            # Batch cleanup: merge every marked duplicate in one call
+            if data.get('merge_all'):
+                results = merge_service.merge_marked()
+                return JsonResponse({'success': True, **results})
+            
             lead_id = data.get('lead_id')
             lead = Lead.objects.get(id=lead_id, is_duplicate=True)
             
-            if lead.original_lead:
-                original = lead.original_lead
-                
-                # Merge notes
-                for note in lead.call_notes.all():
-                    note.lead = original
-                    note.save()
-                
-                # Merge interested projects
-                for project in lead.interested_projects.all():
-                    original.interested_projects.add(project)
-                
-                # Update original lead's notes with merge info
-                merge_note = f"Merged with duplicate lead: {lead.name} ({lead.email}, {lead.phone})"
-                if original.notes:
-                    original.notes += f"\n\n{merge_note}"
-                else:
-                    original.notes = merge_note
-                original.save()
-                
-                # Delete the duplicate
-                lead.delete()
-                
-                return JsonResponse({'success': True})
+            if lead.original_lead_id:
+                # Notes, messages, calls, history, meetings, tasks and events all move to the original
+                results = merge_service.merge(lead)
+                return JsonResponse({'success': True, **results})
             else:
                 return JsonResponse({'success': False, 'error': 'No original lead found'})
             
@@ -2116,10 +2043,8 @@ def attendance(request):
     if status_filter:
         attendance_list = attendance_list.filter(status=status_filter)
     
-    # Pagination
-    paginator = Paginator(attendance_list, 25)
-    page_number = request.GET.get('page')
-    attendance_records = paginator.get_page(page_number)
+    # Keyset pagination, latest day first
+    attendance_records = paginate(request, attendance_list, ['-date', 'employee__first_name', 'id'])
     
     # Get employees for filter
     employees = User.objects.filter(teammember__isnull=False).order_by('first_name', 'last_name')
@@ -2131,7 +2056,7 @@ def attendance(request):
     today_absent = Attendance.objects.filter(date=today, status='absent').count()
     
     context = {
-        'attendance_records': attendance_records,
+        'attendance': attendance_records,
         'employees': employees,
         'status_choices': Attendance.STATUS_CHOICES,
         'date_filter': date_filter,
@@ -2255,8 +2180,19 @@ def delete_project_unit(request, unit_id):
 @login_required
 def team_hierarchy(request):
     """Team hierarchy view"""
-    team_members = TeamMember.objects.select_related('user', 'manager').all()
-    context = {'team_members': team_members}
+    team_members = list(TeamMember.objects.select_related('user').all())
+    team_metrics = TeamMetricsService(team_members).attach()
+
+    # Build the tree in memory instead of one team_members query per node
+    by_id = {member.id: member for member in team_members}
+    for member in team_members:
+        member.subordinates = []
+    for member in team_members:
+        if member.manager_id in by_id:
+            by_id[member.manager_id].subordinates.append(member)
+    managers = [member for member in team_members if member.manager_id not in by_id]
+
+    context = {'team_members': team_members, 'managers': managers, 'team_metrics': team_metrics}
     return render(request, 'dashboard/team_hierarchy.html', context)
 
 @login_required
@@ -2312,10 +2248,7 @@ def tata_calls(request):
         whatsapp_messages = {'success': False, 'error': str(e)}
     
     # Local call logs for comparison
-    calls = IVRCallLog.objects.all().order_by('-start_stamp')
-    paginator = Paginator(calls, 25)
-    page_number = request.GET.get('page')
-    call_logs = paginator.get_page(page_number)
+    call_logs = paginate(request, IVRCallLog.objects.all(), ['-start_stamp', '-id'])
     
     context = {
         'call_logs': call_logs,
@@ -2346,28 +2279,24 @@ def sync_tata_calls(request):
                 {'+911409307733': '+917290001132'}
             ]
             
-            created_count = 0
+            calls = []
             for i, call_data in enumerate(test_calls):
                 caller, destination = list(call_data.items())[0]
                 
-                call_log, created = IVRCallLog.objects.get_or_create(
+                calls.append(IVRCallLog(
                     uuid=f'test_call_{i}',
-                    defaults={
-                        'call_to_number': destination,
-                        'caller_id_number': caller,
-                        'call_id': f'test_{i}',
-                        'start_stamp': timezone.now() - timedelta(hours=i),
-                        'duration': 30 + (i * 15),
-                        'status': 'answered',
-                        'raw_data': {'test_data': True, 'from_tata_cdr': True},
-                        'billing_circle': 'Delhi',
-                        'customer_no_with_prefix': caller
-                    }
-                )
-                
-                if created:
-                    call_log.associate_with_lead()
-                    created_count += 1
+                    call_to_number=destination,
+                    caller_id_number=caller,
+                    call_id=f'test_{i}',
+                    start_stamp=timezone.now() - timedelta(hours=i),
+                    duration=30 + (i * 15),
+                    status='answered',
+                    raw_data={'test_data': True, 'from_tata_cdr': True},
+                    billing_circle='Delhi',
+                    customer_no_with_prefix=caller
+                ))
+            
+            created_count = ivr_ingest.ingest_calls(calls)['created']
             
             return JsonResponse({
                 'success': True,
@@ -2425,7 +2354,7 @@ def send_tata_reply(request):
             
             if result['success']:
                 # Add note to lead
-                lead = Lead.objects.filter(phone=phone).first()
+                lead = Lead.objects.matching_phone(phone).first()
                 if lead:
                     LeadNote.objects.create(
                         lead=lead,
@@ -2450,24 +2379,12 @@ def tata_webhook(request):
         try:
             data = json.loads(request.body)
             
-            # Process TATA webhook data
-            if 'entry' in data:
-                for entry in data['entry']:
-                    if 'changes' in entry:
-                        for change in entry['changes']:
-                            if change.get('field') == 'messages':
-                                value = change.get('value', {})
-                                
-                                # Process incoming messages
-                                if 'messages' in value:
-                                    for message in value['messages']:
-                                        process_incoming_message(message, value)
-                                
-                                # Process message status updates
-                                if 'statuses' in value:
-                                    for status in value['statuses']:
-                                        process_message_status(status)
+            # Stored for process_webhook_inbox; retried deliveries share the body hash
+            key = webhook_inbox.idempotency_key('tata_whatsapp', body=request.body)
+            if webhook_inbox.accept('tata_whatsapp', data, key):
+                return JsonResponse({'status': 'accepted', 'event': key})
             
+            process_tata_webhook(data)
             return JsonResponse({'status': 'success'})
         except Exception as e:
             print(f"Webhook error: {e}")
@@ -2475,6 +2392,25 @@ def tata_webhook(request):
     
     return JsonResponse({'status': 'method not allowed'})
 
+def process_tata_webhook(data):
+    """Apply the messages and statuses of one TATA WhatsApp webhook payload"""
+    if 'entry' in data:
+        for entry in data['entry']:
+            if 'changes' in entry:
+                for change in entry['changes']:
+                    if change.get('field') == 'messages':
+                        value = change.get('value', {})
+                        
+                        # Process incoming messages
+                        if 'messages' in value:
+                            for message in value['messages']:
+                                process_incoming_message(message, value)
+                        
+                        # Process message status updates
+                        if 'statuses' in value:
+                            for status in value['statuses']:
+                                process_message_status(status)
+
 def process_incoming_message(message_data, value_data):
     """Process incoming WhatsApp message"""
     try:
@@ -2938,63 +2874,119 @@ def analytics_dashboard(request):
     else:
         date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
     
-    # Lead analytics
-    leads_in_period = Lead.objects.filter(
-        created_at__date__range=[date_from, date_to]
-    )
-    
-    # Source-wise analytics
-    source_analytics = leads_in_period.values('source').annotate(
-        count=Count('id'),
-        conversion_rate=Count('id', filter=Q(current_stage__name='Deal Closed')) * 100.0 / Count('id')
-    ).order_by('-count')
-    
-    # Stage-wise analytics
-    stage_analytics = LeadStage.objects.annotate(
-        lead_count=Count('leads'),
-        avg_duration=Avg('to_history__duration_in_previous_stage')
-    ).order_by('category', 'order')
-    
-    # Team performance
-    team_performance = User.objects.filter(
-        assigned_leads__created_at__date__range=[date_from, date_to]
-    ).annotate(
-        leads_assigned=Count('assigned_leads'),
-        site_visits=Count('created_notes', filter=Q(created_notes__call_type='site_visit')),
-        closures=Count('assigned_leads', filter=Q(assigned_leads__current_stage__name='Deal Closed'))
-    ).order_by('-leads_assigned')
-    
-    # Monthly trends
-    monthly_trends = []
-    current_date = date_from
-    while current_date <= date_to:
-        month_leads = Lead.objects.filter(
-            created_at__year=current_date.year,
-            created_at__month=current_date.month
-        ).count()
-        
-        monthly_trends.append({
-            'month': current_date.strftime('%b %Y'),
-            'leads': month_leads
-        })
-        
-        # Move to next month
-        if current_date.month == 12:
-            current_date = current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            current_date = current_date.replace(month=current_date.month + 1)
-    
     context = {
         'date_from': date_from,
         'date_to': date_to,
-        'total_leads': leads_in_period.count(),
+        **report_cache.cached(
+            'analytics_dashboard',
+            {'date_from': date_from, 'date_to': date_to},
+            lambda: _analytics_dashboard_data(date_from, date_to)
+        ),
+    }
+    
+    return render(request, 'dashboard/analytics_advanced.html', context)
+
+
+def _analytics_dashboard_data(date_from, date_to):
+    """Source, stage, team and monthly breakdowns for the advanced analytics page
+
+    The per-period breakdowns come from one grouped read of the daily lead rollup
+    and the trend from one TruncMonth group-by over it, whatever the width of the range.
+    """
+    from django.db.models import Sum
+
+    metrics = lead_metrics()
+
+    # Stages with their average time-in-previous-stage
+    stages = {
+        stage.id: stage
+        for stage in LeadStage.objects.annotate(
+            avg_duration=Avg('to_history__duration_in_previous_stage')
+        ).order_by('category', 'order')
+    }
+    closed_stage_ids = {stage_id for stage_id, stage in stages.items() if stage.name == 'Deal Closed'}
+
+    # One read: lead counts per (source, stage, assignee) for the period
+    groups = metrics.filter(date__range=[date_from, date_to]).values(
+        'source', 'stage_id', 'assigned_to_id'
+    ).annotate(count=Sum('created')).filter(count__gt=0)
+
+    total_leads = 0
+    by_source = {}
+    by_member = {}
+    for group in groups:
+        count = group['count']
+        closed = count if group['stage_id'] in closed_stage_ids else 0
+        total_leads += count
+
+        source = by_source.setdefault(group['source'], {'count': 0, 'closed': 0})
+        source['count'] += count
+        source['closed'] += closed
+
+        if group['assigned_to_id']:
+            member = by_member.setdefault(group['assigned_to_id'], {'count': 0, 'closed': 0})
+            member['count'] += count
+            member['closed'] += closed
+
+    # Source-wise analytics
+    source_analytics = sorted([
+        {
+            'source': source,
+            'count': totals['count'],
+            'conversion_rate': totals['closed'] * 100.0 / totals['count'],
+        }
+        for source, totals in by_source.items()
+    ], key=lambda item: -item['count'])
+
+    # Stage-wise analytics: every lead currently in each stage, not just the period's
+    by_stage = dict(
+        Lead.objects.order_by().values('current_stage_id').annotate(count=Count('id')).values_list('current_stage_id', 'count')
+    )
+    stage_analytics = list(stages.values())
+    for stage in stage_analytics:
+        stage.lead_count = by_stage.get(stage.id, 0)
+
+    # Team performance
+    site_visits = dict(
+        LeadNote.objects.filter(
+            call_type='site_visit',
+            created_by_id__in=by_member,
+            created_at__date__range=[date_from, date_to]
+        ).order_by().values('created_by_id').annotate(count=Count('id')).values_list('created_by_id', 'count')
+    )
+    team_performance = list(User.objects.filter(id__in=by_member))
+    for member in team_performance:
+        member.leads_assigned = by_member[member.id]['count']
+        member.closures = by_member[member.id]['closed']
+        member.site_visits = site_visits.get(member.id, 0)
+    team_performance.sort(key=lambda member: -member.leads_assigned)
+
+    # Monthly trends: whole calendar months from date_from's month to date_to's, gaps filled with 0
+    first_month = date_from.replace(day=1)
+    months = []
+    current_month = first_month
+    while current_month <= date_to:
+        months.append(current_month)
+        current_month = (current_month + timedelta(days=32)).replace(day=1)
+
+    month_counts = {
+        item['month']: item['count']
+        for item in metrics.filter(
+            date__gte=first_month, date__lt=current_month
+        ).annotate(month=TruncMonth('date')).values('month').annotate(count=Sum('created'))
+    }
+    monthly_trends = [
+        {'month': month.strftime('%b %Y'), 'leads': month_counts.get(month, 0)}
+        for month in months
+    ]
+
+    return {
+        'total_leads': total_leads,
         'source_analytics': source_analytics,
         'stage_analytics': stage_analytics,
         'team_performance': team_performance,
         'monthly_trends': monthly_trends,
     }
-    
-    return render(request, 'dashboard/analytics_advanced.html', context)
 
 @login_required
 def active_leads(request):
@@ -3005,10 +2997,10 @@ def active_leads(request):
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
     search_query = request.GET.get('search', '')
-    rows_per_page = int(request.GET.get('rows_per_page', 25))
+    rows_per_page = page_size(request)
     
     # Start with active leads (warm + hot) - Fixed prefetch_related
-    leads_list = Lead.objects.filter(current_stage__category__in=['warm', 'hot']).select_related('assigned_to', 'current_stage').prefetch_related('interested_projects', 'call_notes')
+    leads_list = Lead.objects.filter(stage_category__in=['warm', 'hot']).select_related('assigned_to', 'current_stage').prefetch_related('interested_projects', 'call_notes')
     
     # Apply filters
     if source_filter:
@@ -3030,13 +3022,8 @@ def active_leads(request):
             Q(phone__icontains=search_query)
         )
     
-    # Order by latest first
-    leads_list = leads_list.order_by('-created_at')
-    
-    # Pagination
-    paginator = Paginator(leads_list, rows_per_page)
-    page_number = request.GET.get('page')
-    leads = paginator.get_page(page_number)
+    # Keyset pagination, latest first
+    leads = paginate(request, leads_list, ['-created_at', '-id'], per_page=rows_per_page)
     
     # Get filter options
     team_members = User.objects.filter(teammember__isnull=False).order_by('first_name', 'last_name')
@@ -3065,10 +3052,10 @@ def hot_leads(request):
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
     search_query = request.GET.get('search', '')
-    rows_per_page = int(request.GET.get('rows_per_page', 25))
+    rows_per_page = page_size(request)
     
     # Get hot leads
-    hot_leads_list = Lead.objects.filter(current_stage__category='hot').select_related('assigned_to', 'original_lead', 'current_stage').prefetch_related('interested_projects', 'call_notes')
+    hot_leads_list = Lead.objects.filter(stage_category='hot').select_related('assigned_to', 'original_lead', 'current_stage').prefetch_related('interested_projects', 'call_notes')
     
     # Apply filters
     if show_duplicates == '1':
@@ -3106,10 +3093,14 @@ def hot_leads(request):
     today = timezone.now().date()
     week_ago = today - timedelta(days=7)
     
-    hot_leads_count = Lead.objects.filter(current_stage__category='hot').count()
-    duplicate_leads_count = Lead.objects.filter(current_stage__category='hot', is_duplicate=True).count()
-    this_week_count = Lead.objects.filter(current_stage__category='hot', created_at__date__gte=week_ago).count()
-    converted_count = Lead.objects.filter(current_stage__category='closed').count()
+    stats = LeadStatsService().stats(
+        hot_duplicates=Q(stage_category='hot', is_duplicate=True),
+        hot_this_week=Q(stage_category='hot', created_at__date__gte=week_ago)
+    )
+    hot_leads_count = stats['hot']
+    duplicate_leads_count = stats['hot_duplicates']
+    this_week_count = stats['hot_this_week']
+    converted_count = stats['closed']
     
     # Get projects for filter
     projects = Project.objects.filter(is_active=True).order_by('name')
@@ -3135,22 +3126,18 @@ def hot_leads(request):
 @login_required
 def followup_leads(request):
     """Follow-up leads page with pagination and search filters"""
-    from datetime import timedelta
-    
     # Get filter parameters
     search_query = request.GET.get('search', '')
     assigned_filter = request.GET.get('assigned_to', '')
     status_filter = request.GET.get('status', '')
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
-    rows_per_page = int(request.GET.get('rows_per_page', 25))
-    
-    today = timezone.now().date()
+    rows_per_page = page_size(request)
     
     # Start with all leads that need follow-up
     leads_list = Lead.objects.filter(
         Q(follow_up_date__isnull=False) | Q(requires_callback=True),
-        current_stage__category__in=['warm', 'hot']
+        stage_category__in=['warm', 'hot']
     ).select_related('assigned_to', 'current_stage').prefetch_related('interested_projects', 'call_notes')
     
     # Apply filters
@@ -3165,7 +3152,7 @@ def followup_leads(request):
         leads_list = leads_list.filter(assigned_to_id=assigned_filter)
     
     if status_filter:
-        leads_list = leads_list.filter(current_stage__category=status_filter)
+        leads_list = leads_list.filter(stage_category=status_filter)
     
     if date_from:
         leads_list = leads_list.filter(follow_up_date__gte=date_from)
@@ -3173,35 +3160,15 @@ def followup_leads(request):
     if date_to:
         leads_list = leads_list.filter(follow_up_date__lte=date_to)
     
-    # Order by follow-up date (overdue first)
-    leads_list = leads_list.order_by('follow_up_date', '-created_at')
-    
-    # Pagination
-    paginator = Paginator(leads_list, rows_per_page)
-    page_number = request.GET.get('page')
-    leads = paginator.get_page(page_number)
+    # Keyset pagination by follow-up date (overdue first, callbacks without a date last)
+    leads = paginate(request, leads_list, ['follow_up_date', '-created_at', '-id'], per_page=rows_per_page)
     
     # Get statistics for badges
-    overdue_leads_count = Lead.objects.filter(
-        follow_up_date__lt=today,
-        current_stage__category__in=['warm', 'hot']
-    ).count()
-    
-    due_today_count = Lead.objects.filter(
-        follow_up_date=today,
-        current_stage__category__in=['warm', 'hot']
-    ).count()
-    
-    upcoming_leads_count = Lead.objects.filter(
-        follow_up_date__gt=today,
-        follow_up_date__lte=today + timedelta(days=7),
-        current_stage__category__in=['warm', 'hot']
-    ).count()
-    
-    callback_leads_count = Lead.objects.filter(
-        requires_callback=True,
-        current_stage__category__in=['warm', 'hot']
-    ).count()
+    stats = LeadStatsService().stats()
+    overdue_leads_count = stats['overdue']
+    due_today_count = stats['due_today']
+    upcoming_leads_count = stats['upcoming']
+    callback_leads_count = stats['callback']
     
     # Get filter options
     team_members = User.objects.filter(teammember__isnull=False).order_by('first_name', 'last_name')
@@ -3231,14 +3198,14 @@ def closed_leads(request):
     # Get filter parameters
     status_filter = request.GET.get('status', '')
     search_query = request.GET.get('search', '')
-    rows_per_page = int(request.GET.get('rows_per_page', 25))
+    rows_per_page = page_size(request)
     
     # Start with closed leads
-    leads_list = Lead.objects.filter(current_stage__category='closed').select_related('assigned_to', 'current_stage').prefetch_related('interested_projects', 'call_notes')
+    leads_list = Lead.objects.filter(stage_category='closed').select_related('assigned_to', 'current_stage').prefetch_related('interested_projects', 'call_notes')
     
     # Apply filters
     if status_filter:
-        leads_list = leads_list.filter(current_stage__category=status_filter)
+        leads_list = leads_list.filter(stage_category=status_filter)
     
     if search_query:
         leads_list = leads_list.filter(
@@ -3677,24 +3644,25 @@ def handle_ivr_webhook(request):
         
         data = json.loads(request.body) if request.body else request.GET.dict()
         
-        call_log = IVRCallLog.objects.create(
-            uuid=data.get('uuid', ''),
-            call_to_number=data.get('call_to_number', ''),
-            caller_id_number=data.get('caller_id_number', ''),
-            call_id=data.get('call_id', ''),
-            start_stamp=timezone.now(),
-            duration=int(data.get('duration', 0)),
-            status=data.get('status', 'received'),
-            raw_data=data
-        )
-        
-        call_log.associate_with_lead()
+        key = webhook_inbox.idempotency_key('ivr_call_log', ivr_ingest.call_uuid(data))
+        if webhook_inbox.accept('ivr_call_log', data, key):
+            return JsonResponse({'status': 'accepted', 'event': key})
         
+        call_log = process_ivr_call_log(data)
         return JsonResponse({'status': 'success', 'call_id': call_log.id})
         
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)})
 
+def process_ivr_call_log(data):
+    """Record one IVR webhook payload as a call log and link it to its lead
+    
+    Upserted on the provider uuid, so a replayed webhook updates the same row.
+    """
+    call_log = ivr_ingest.call_from_webhook(data)
+    ivr_ingest.ingest_calls([call_log])
+    return IVRCallLog.objects.get(uuid=call_log.uuid)
+
 # Profile API endpoints
 @login_required
 def api_attendance_data(request, year, month):
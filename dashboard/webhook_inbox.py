@@ -0,0 +1,136 @@
+"""
+Webhook inbox
+Provider webhooks are stored verbatim with an idempotency key and acknowledged
+straight away; the process_webhook_inbox worker drains them in leased batches
+and runs the business processing (leads, notes, call logs, message statuses).
+"""
+import hashlib
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+def idempotency_key(source: str, event_id: str = '', body: bytes = b'') -> str:
+    """source:provider-id, or source:sha256(body) when the payload carries no usable id"""
+    return f"{source}:{event_id or hashlib.sha256(body).hexdigest()}"[:255]
+
+
+def accept(source: str, payload: Dict, key: str) -> bool:
+    """Store a webhook for the worker in a single INSERT; False when processing runs inline instead
+
+    A retried delivery with the same key is dropped by the unique constraint.
+    """
+    if not getattr(settings, 'WEBHOOK_INBOX_ENABLED', True):
+        return False
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(source=source, idempotency_key=key, payload=payload)],
+        ignore_conflicts=True
+    )
+    return True
+
+
+def _handlers() -> Dict[str, Callable[[Dict], object]]:
+    from .ivr_webhook_handler import process_ivr_call
+    from .tata_webhook_handler import webhook_handler
+    from .views import process_ivr_call_log, process_tata_webhook
+
+    return {
+        'tata_whatsapp': process_tata_webhook,
+        'whatsapp_message': webhook_handler.handle_incoming_message,
+        'ivr_call': process_ivr_call,
+        'ivr_call_log': process_ivr_call_log,
+    }
+
+
+class WebhookInboxWorker:
+    """Claim and process stored webhook events in batches"""
+
+    def __init__(self, batch_size: int = 200, lease_seconds: int = 120, max_attempts: int = None, worker_id: str = None):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts or getattr(settings, 'WEBHOOK_INBOX_MAX_ATTEMPTS', 5)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers = _handlers()
+
+    def claim_batch(self) -> List[WebhookEvent]:
+        """Lease the oldest pending events (and ones whose worker's lease ran out)"""
+        now = timezone.now()
+        claimable = Q(status='pending') | Q(status='processing', lease_expires_at__lt=now)
+        ids = list(
+            WebhookEvent.objects.filter(claimable).order_by('id').values_list('id', flat=True)[:self.batch_size]
+        )
+        if not ids:
+            return []
+        # Compare-and-set on the lease so two workers never process the same event
+        WebhookEvent.objects.filter(claimable, id__in=ids).update(
+            status='processing',
+            lease_owner=self.worker_id,
+            lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+            attempts=F('attempts') + 1
+        )
+        return list(WebhookEvent.objects.filter(id__in=ids, status='processing', lease_owner=self.worker_id).order_by('id'))
+
+    def process_batch(self, events: List[WebhookEvent]) -> Dict[str, int]:
+        done, failed = [], {}
+
+        # Delivery statuses from every payload in the batch go through one bulk apply
+        status_events = [event for event in events if event.source == 'whatsapp_status']
+        if status_events:
+            from .tata_webhook_handler import webhook_handler
+            try:
+                webhook_handler.apply_statuses(
+                    [status for event in status_events for status in event.payload.get('statuses', [])]
+                )
+                done.extend(event.id for event in status_events)
+            except Exception as e:
+                logger.error(f"Error applying {len(status_events)} delivery status events: {str(e)}")
+                failed.update({event.id: str(e) for event in status_events})
+
+        for event in events:
+            if event.source == 'whatsapp_status':
+                continue
+            handler = self.handlers.get(event.source)
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler for webhook source {event.source}")
+                with transaction.atomic():
+                    handler(event.payload)
+                done.append(event.id)
+            except Exception as e:
+                logger.error(f"Error processing webhook event {event.id} ({event.source}): {str(e)}")
+                failed[event.id] = str(e)
+
+        self._finish(done, failed, {event.id: event.attempts for event in events})
+        return {'done': len(done), 'failed': len(failed)}
+
+    def _finish(self, done: List[int], failed: Dict[int, str], attempts: Dict[int, int]):
+        mine = WebhookEvent.objects.filter(lease_owner=self.worker_id, status='processing')
+        mine.filter(id__in=done).update(
+            status='done', processed_at=timezone.now(), last_error='', lease_owner='', lease_expires_at=None
+        )
+        for event_id, error in failed.items():
+            # Retried on a later batch until max_attempts, then parked as failed for inspection
+            mine.filter(id=event_id).update(
+                status='failed' if attempts[event_id] >= self.max_attempts else 'pending',
+                last_error=error[:2000],
+                lease_owner='',
+                lease_expires_at=None
+            )
+
+    def purge(self, older_than_days: int) -> int:
+        """Delete processed events older than this many days"""
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+        deleted, _ = WebhookEvent.objects.filter(status='done', processed_at__lt=cutoff).delete()
+        return deleted
+
@@ -0,0 +1,306 @@
+"""
+Persistent WhatsApp campaign queue
+Campaigns are stored as jobs with per-recipient state and drained in leased,
+checkpointed batches by the process_whatsapp_campaigns worker command.
+"""
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import WhatsAppCampaignJob, WhatsAppCampaignRecipient
+from .tata_whatsapp_service import TataWhatsAppCampaignService
+
+logger = logging.getLogger(__name__)
+
+INTERRUPTED_ERROR = "ERR_INTERRUPTED: worker stopped mid-send, not retried to avoid a duplicate message"
+
+
+class WhatsAppCampaignQueue:
+    """Enqueue campaigns and process them in resumable batches"""
+
+    def __init__(self, batch_size: int = 100, lease_seconds: int = 300, max_attempts: int = None,
+                 retry_seconds: int = None, worker_id: str = None):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts or getattr(settings, 'WHATSAPP_CAMPAIGN_MAX_ATTEMPTS', 3)
+        self.retry_seconds = getattr(settings, 'WHATSAPP_CAMPAIGN_RETRY_SECONDS', 60) if retry_seconds is None else retry_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.campaign_service = TataWhatsAppCampaignService()
+        self.whatsapp_service = self.campaign_service.whatsapp_service
+
+    def enqueue(self,
+                template_name: str,
+                from_date,
+                to_date,
+                project_names: List[str] = None,
+                language: str = 'en',
+                header_media_url: str = None,
+                header_media_type: str = None,
+                limit: int = None,
+                user=None) -> WhatsAppCampaignJob:
+        """Store a campaign for the worker; the audience is resolved by the worker, not the caller"""
+        job = WhatsAppCampaignJob.objects.create(
+            template_name=template_name,
+            language=language,
+            project_names=project_names or [],
+            from_date=from_date,
+            to_date=to_date,
+            header_media_url=header_media_url or '',
+            header_media_type=header_media_type or '',
+            limit=limit,
+            created_by=user
+        )
+        logger.info(f"Queued WhatsApp campaign job {job.id} ({template_name})")
+        return job
+
+    def claim_job(self, job_id: int = None) -> Optional[WhatsAppCampaignJob]:
+        """Atomically lease the next runnable job (or a specific one) for this worker"""
+        now = timezone.now()
+        candidates = WhatsAppCampaignJob.objects.filter(status__in=['queued', 'running']).filter(
+            Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now) | Q(lease_owner=self.worker_id)
+        )
+        if job_id:
+            candidates = candidates.filter(id=job_id)
+
+        for job in candidates.order_by('created_at')[:10]:
+            # Compare-and-set on the lease so two workers never own the same job
+            claimed = WhatsAppCampaignJob.objects.filter(id=job.id).filter(
+                Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now) | Q(lease_owner=self.worker_id)
+            ).update(lease_owner=self.worker_id, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+            if claimed:
+                job.refresh_from_db()
+                return job
+        return None
+
+    def renew_lease(self, job: WhatsAppCampaignJob) -> bool:
+        return WhatsAppCampaignJob.objects.filter(id=job.id, lease_owner=self.worker_id).update(
+            lease_expires_at=timezone.now() + timedelta(seconds=self.lease_seconds)
+        ) == 1
+
+    def release_lease(self, job: WhatsAppCampaignJob, retry_after: int = 0):
+        """Give the job up; with retry_after no worker may claim it for that many seconds"""
+        WhatsAppCampaignJob.objects.filter(id=job.id, lease_owner=self.worker_id).update(
+            lease_owner='',
+            lease_expires_at=timezone.now() + timedelta(seconds=retry_after) if retry_after else None
+        )
+
+    def record_failure(self, job: WhatsAppCampaignJob, error: str):
+        """Count an errored run; after max_attempts the job is failed so it stops being re-claimed"""
+        WhatsAppCampaignJob.objects.filter(id=job.id).update(attempts=F('attempts') + 1, last_error=error[:2000])
+        job.refresh_from_db(fields=['attempts'])
+        if job.attempts >= self.max_attempts:
+            logger.error(f"Campaign job {job.id}: failed {job.attempts} times, giving up")
+            self._finish(job, 'failed', error[:2000])
+
+    def materialize_recipients(self, job: WhatsAppCampaignJob):
+        """Snapshot the campaign audience into recipient rows (idempotent)"""
+        leads = self.campaign_service.get_ivr_leads(
+            job.project_names, job.from_date, job.to_date, job.limit
+        )
+
+        # get_ivr_leads only returns leads with a valid, deduplicated, non-opted-out phone_e164
+        recipients = [
+            WhatsAppCampaignRecipient(job=job, lead=lead, phone_number=lead.phone_e164)
+            for lead in leads
+        ]
+
+        WhatsAppCampaignRecipient.objects.bulk_create(recipients, batch_size=1000, ignore_conflicts=True)
+
+        recipient_rows = job.recipients.all()
+        # A job cancelled while its audience was being resolved stays cancelled
+        WhatsAppCampaignJob.objects.filter(id=job.id).exclude(status='cancelled').update(
+            status='running',
+            started_at=timezone.now(),
+            total_recipients=recipient_rows.count(),
+            skipped_count=recipient_rows.filter(status='skipped').count()
+        )
+        job.refresh_from_db()
+        logger.info(f"Campaign job {job.id}: {job.total_recipients} recipients materialized")
+
+    def recover_interrupted(self, job: WhatsAppCampaignJob) -> int:
+        """Close out rows a dead worker left in flight; their send outcome is unknown"""
+        interrupted = job.recipients.filter(status='in_flight').update(
+            status='failed', error=INTERRUPTED_ERROR, processed_at=timezone.now()
+        )
+        if interrupted:
+            WhatsAppCampaignJob.objects.filter(id=job.id).update(failed_count=F('failed_count') + interrupted)
+            logger.warning(f"Campaign job {job.id}: {interrupted} interrupted sends marked failed")
+        return interrupted
+
+    def lease_batch(self, job: WhatsAppCampaignJob) -> List[WhatsAppCampaignRecipient]:
+        """Move the next batch of pending recipients to in_flight"""
+        with transaction.atomic():
+            ids = list(
+                job.recipients.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('id')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                return []
+            WhatsAppCampaignRecipient.objects.filter(id__in=ids, status='pending').update(
+                status='in_flight', leased_at=timezone.now()
+            )
+        return list(
+            WhatsAppCampaignRecipient.objects.filter(id__in=ids)
+            .select_related('lead')
+            .prefetch_related('lead__interested_projects')
+        )
+
+    def process_batch(self, job: WhatsAppCampaignJob, batch: List[WhatsAppCampaignRecipient]) -> Dict:
+        """Send one leased batch and checkpoint each recipient as its send completes
+
+        The job lease is renewed every third of lease_seconds while the batch sends, so a
+        slow batch is not taken over by another worker. If the lease is lost anyway the
+        batch stops; its unsent rows stay in_flight for the new owner to close out.
+        """
+        counts = {'sent': 0, 'failed': 0, 'lease_lost': False}
+        renewed_at = time.monotonic()
+
+        def prepared_sends():
+            for recipient in batch:
+                lead = recipient.lead
+                projects = list(lead.interested_projects.all())
+                variables = self.campaign_service.prepare_template_variables(
+                    lead, projects[0] if projects else None
+                )
+                yield (recipient, variables), recipient.phone_number, variables, lead.id
+
+        for (recipient, variables), outcome in self.campaign_service.iter_send_results(
+            prepared_sends(),
+            template_name=job.template_name,
+            language=job.language,
+            header_media_url=job.header_media_url or None,
+            header_media_type=job.header_media_type or None
+        ):
+            if isinstance(outcome, Exception):
+                success, message_id_or_error, api_response = False, f"ERR_INTERNAL: {outcome}", {}
+            else:
+                success, message_id_or_error, api_response = outcome
+
+            whatsapp_msg = self.whatsapp_service.create_whatsapp_message_record(
+                lead=recipient.lead,
+                template_name=job.template_name,
+                message_content=f"Template: {job.template_name}, Variables: {variables}",
+                phone_number=recipient.phone_number,
+                message_id=message_id_or_error if success else None,
+                api_response=api_response
+            )
+
+            recipient.status = 'sent' if success else 'failed'
+            recipient.error = '' if success else message_id_or_error
+            recipient.whatsapp_message = whatsapp_msg
+            recipient.processed_at = timezone.now()
+            recipient.save(update_fields=['status', 'error', 'whatsapp_message', 'processed_at'])
+            counts['sent' if success else 'failed'] += 1
+
+            if time.monotonic() - renewed_at > self.lease_seconds / 3:
+                if not self.renew_lease(job):
+                    logger.warning(f"Campaign job {job.id}: lease lost mid-batch, stopping")
+                    counts['lease_lost'] = True
+                    break
+                renewed_at = time.monotonic()
+
+        WhatsAppCampaignJob.objects.filter(id=job.id).update(
+            sent_count=F('sent_count') + counts['sent'],
+            failed_count=F('failed_count') + counts['failed']
+        )
+        return counts
+
+    def process_job(self, job: WhatsAppCampaignJob, max_batches: int = None) -> WhatsAppCampaignJob:
+        """Drain a claimed job batch by batch, resuming from its last checkpoint
+
+        An error is recorded on the job (see record_failure) and re-raised; the job is
+        not claimable again for retry_seconds, so other jobs get their turn first.
+        """
+        retry_after = 0
+        try:
+            if job.status == 'queued':
+                self.materialize_recipients(job)
+            else:
+                self.recover_interrupted(job)
+
+            if job.header_media_url:
+                media_valid, media_error, _ = self.whatsapp_service.validate_media_url(
+                    job.header_media_url, job.header_media_type
+                )
+                if not media_valid:
+                    self._finish(job, 'failed', f"ERR_MEDIA_UNSUPPORTED: {media_error}")
+                    return job
+
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                job.refresh_from_db(fields=['status'])
+                if job.status == 'cancelled':
+                    break
+                if not self.renew_lease(job):
+                    logger.warning(f"Campaign job {job.id}: lease lost, stopping")
+                    return job
+
+                batch = self.lease_batch(job)
+                if not batch:
+                    self._finish(job, 'completed')
+                    break
+
+                counts = self.process_batch(job, batch)
+                batches += 1
+                if counts['lease_lost']:
+                    return job
+                logger.info(f"Campaign job {job.id}: batch {batches} done ({counts['sent']} sent, {counts['failed']} failed)")
+
+        except Exception as e:
+            logger.error(f"Campaign job {job.id} failed: {str(e)}")
+            self.record_failure(job, str(e))
+            retry_after = self.retry_seconds
+            raise
+        finally:
+            self.release_lease(job, retry_after)
+
+        job.refresh_from_db()
+        return job
+
+    def _finish(self, job: WhatsAppCampaignJob, status: str, error: str = ''):
+        WhatsAppCampaignJob.objects.filter(id=job.id).exclude(status='cancelled').update(
+            status=status, last_error=error, completed_at=timezone.now()
+        )
+
+    def job_results(self, job: WhatsAppCampaignJob, include_messages: bool = True) -> Dict:
+        """Summarize a job in the same shape as TataWhatsAppCampaignService.run_campaign"""
+        results = {
+            'job_id': job.id,
+            'status': job.status,
+            'total_leads': job.total_recipients,
+            'valid_leads': job.total_recipients - job.skipped_count,
+            'sent_count': job.sent_count,
+            'failed_count': job.failed_count,
+            'progress_percentage': round(job.progress_percentage, 1),
+            'errors': [job.last_error] if job.last_error else [],
+            'sent_messages': [],
+            'failed_messages': []
+        }
+
+        if not include_messages:
+            return results
+
+        for recipient in job.recipients.filter(status__in=['sent', 'failed', 'skipped']).select_related('lead', 'whatsapp_message'):
+            entry = {
+                'lead_id': recipient.lead_id,
+                'lead_name': recipient.lead.name,
+                'phone': recipient.phone_number,
+            }
+            if recipient.status == 'sent':
+                entry['message_id'] = recipient.whatsapp_message.message_id if recipient.whatsapp_message else ''
+                results['sent_messages'].append(entry)
+            else:
+                entry['error'] = recipient.error
+                results['failed_messages'].append(entry)
+
+        return results
@@ -5,13 +5,14 @@ Production-grade implementation with exact API specifications
 import requests
 import json
 import time
-import re
 import logging
 from typing import Dict, List, Tuple
 from urllib.parse import urlparse
 from django.conf import settings
 from django.utils import timezone
 from .models import WhatsAppMessage
+from . import phone_numbers
+from .tata_http import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,7 @@ class WhatsAppIntegrationService:
     }
     
     def __init__(self):
+        self.http = get_client()
         self.base_url = settings.TATA_BASE_URL
         self.auth_token = settings.TATA_AUTH_TOKEN
         self.headers = {
@@ -36,21 +38,7 @@ class WhatsAppIntegrationService:
     
     def validate_phone_number(self, phone: str) -> Tuple[bool, str]:
         """Validate and convert to E.164 format"""
-        clean_phone = re.sub(r'[^\d+]', '', phone)
-        
-        if not clean_phone.startswith('+'):
-            if clean_phone.startswith('91') and len(clean_phone) == 12:
-                clean_phone = '+' + clean_phone
-            elif len(clean_phone) == 10:
-                clean_phone = '+91' + clean_phone
-            else:
-                return False, "Invalid phone number format"
-        
-        e164_pattern = r'^\+[1-9]\d{6,15}$'
-        if not re.match(e164_pattern, clean_phone):
-            return False, "Phone number must be in E.164 format"
-        
-        return True, clean_phone
+        return phone_numbers.validate(phone)
     
     def validate_media(self, url: str, media_type: str = 'document') -> Tuple[bool, str]:
         """Validate media URL with HEAD request"""
@@ -62,7 +50,7 @@ class WhatsAppIntegrationService:
             if not parsed.scheme or not parsed.netloc:
                 return False, "Invalid media URL format"
             
-            response = requests.head(url, timeout=10, allow_redirects=True)
+            response = self.http.head(url, allow_redirects=True)
             response.raise_for_status()
             
             content_type = response.headers.get('content-type', '').lower()
@@ -185,7 +173,7 @@ class WhatsAppIntegrationService:
         """Send via direct WhatsApp Cloud API"""
         try:
             url = f"{self.base_url}/whatsapp-cloud/messages"
-            response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            response = self.http.post(url, headers=self.headers, json=payload)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -212,7 +200,7 @@ class WhatsAppIntegrationService:
             }
             
             webhook_url = f"{self.base_url}/automation/webhook"
-            response = requests.post(webhook_url, headers=self.headers, json=omni_payload, timeout=30)
+            response = self.http.post(webhook_url, headers=self.headers, json=omni_payload)
             
             if response.status_code == 200:
                 response_data = response.json()
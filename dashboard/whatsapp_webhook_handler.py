@@ -9,6 +9,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
 from .whatsapp_integration import WhatsAppIntegrationService
+from . import phone_numbers
 
 logger = logging.getLogger(__name__)
 
@@ -71,12 +72,10 @@ def process_ivr_call(payload):
         return JsonResponse({"status": "error", "message": "No phone number"})
     
     # Clean phone
-    clean_phone = phone.replace('+91', '').replace(' ', '').replace('-', '')
-    if len(clean_phone) == 10:
-        clean_phone = '+91' + clean_phone
+    clean_phone = phone_numbers.normalize(phone) or phone
     
     # Check existing lead
-    existing_lead = Lead.objects.filter(phone=clean_phone).first()
+    existing_lead = Lead.objects.matching_phone(clean_phone).first()
     if existing_lead:
         existing_lead.notes += f"\n\nNew Call: {timezone.now()}\nDuration: {duration}s\nAgent: {agent}"
         existing_lead.save()
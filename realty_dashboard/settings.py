@@ -38,6 +38,42 @@ TATA_IVR_TOKEN = os.getenv('TATA_IVR_TOKEN', 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVC
 # WhatsApp Rate Limiting (100k/24h = ~1.15 msg/sec)
 WHATSAPP_RATE_LIMIT_DELAY = float(os.getenv('WHATSAPP_RATE_LIMIT_DELAY', '1.25'))
 WHATSAPP_DAILY_LIMIT = int(os.getenv('WHATSAPP_DAILY_LIMIT', '100000')) 
+WHATSAPP_RATE_LIMIT_BURST = int(os.getenv('WHATSAPP_RATE_LIMIT_BURST', '1'))
+# Campaign sends share one token bucket per process at WHATSAPP_DAILY_LIMIT/24h divided by
+# this many processes; set it to the number of campaign workers running at the same time
+WHATSAPP_SENDER_PROCESSES = int(os.getenv('WHATSAPP_SENDER_PROCESSES', '1'))
+# A campaign job whose worker run errors is retried after WHATSAPP_CAMPAIGN_RETRY_SECONDS,
+# and failed after WHATSAPP_CAMPAIGN_MAX_ATTEMPTS errored runs so it can't block the queue
+WHATSAPP_CAMPAIGN_MAX_ATTEMPTS = int(os.getenv('WHATSAPP_CAMPAIGN_MAX_ATTEMPTS', '3'))
+WHATSAPP_CAMPAIGN_RETRY_SECONDS = int(os.getenv('WHATSAPP_CAMPAIGN_RETRY_SECONDS', '60'))
+WHATSAPP_MAX_IN_FLIGHT = int(os.getenv('WHATSAPP_MAX_IN_FLIGHT', '8'))
+
+# Delivery-status webhooks: hold statuses up to this many seconds (0 = apply per webhook)
+# so campaign callback bursts are applied in batches of up to WHATSAPP_STATUS_BATCH_SIZE
+WHATSAPP_STATUS_BATCH_SECONDS = float(os.getenv('WHATSAPP_STATUS_BATCH_SECONDS', '0'))
+WHATSAPP_STATUS_BATCH_SIZE = int(os.getenv('WHATSAPP_STATUS_BATCH_SIZE', '500'))
+
+# Webhooks are stored in the WebhookEvent inbox and acknowledged immediately; the
+# process_webhook_inbox worker (the 'inbox' Procfile process) applies them. Set to
+# 'false' to process inline again when no inbox worker is deployed
+WEBHOOK_INBOX_ENABLED = os.getenv('WEBHOOK_INBOX_ENABLED', 'True').lower() == 'true'
+WEBHOOK_INBOX_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_INBOX_MAX_ATTEMPTS', '5'))
+
+# TATA call record sync: pulls from the stored watermark minus an overlap for late CDRs,
+# fetching up to TATA_CDR_SYNC_WORKERS pages at a time
+TATA_CDR_PAGE_SIZE = int(os.getenv('TATA_CDR_PAGE_SIZE', '100'))
+TATA_CDR_SYNC_WORKERS = int(os.getenv('TATA_CDR_SYNC_WORKERS', '4'))
+TATA_CDR_SYNC_OVERLAP_SECONDS = int(os.getenv('TATA_CDR_SYNC_OVERLAP_SECONDS', '300'))
+TATA_CDR_SYNC_INITIAL_DAYS = int(os.getenv('TATA_CDR_SYNC_INITIAL_DAYS', '1'))
+
+# Shared Tata HTTP client: keep-alive connections per host, (connect, read) timeouts in seconds,
+# retries with exponential backoff on 429/5xx, and a warning for calls slower than TATA_HTTP_SLOW_SECONDS
+TATA_HTTP_POOL_SIZE = int(os.getenv('TATA_HTTP_POOL_SIZE', '10'))
+TATA_HTTP_CONNECT_TIMEOUT = float(os.getenv('TATA_HTTP_CONNECT_TIMEOUT', '5'))
+TATA_HTTP_READ_TIMEOUT = float(os.getenv('TATA_HTTP_READ_TIMEOUT', '30'))
+TATA_HTTP_RETRIES = int(os.getenv('TATA_HTTP_RETRIES', '3'))
+TATA_HTTP_BACKOFF = float(os.getenv('TATA_HTTP_BACKOFF', '0.5'))
+TATA_HTTP_SLOW_SECONDS = float(os.getenv('TATA_HTTP_SLOW_SECONDS', '5'))
 
 
 # Application definition
@@ -137,12 +173,59 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    # Lead import uploads are saved by the web service and read by the importer service, which
+    # doesn't share its disk; keep them in the database unless IMPORT_STORAGE_BACKEND names
+    # another shared backend (e.g. storages.backends.s3.S3Storage)
+    'imports': {'BACKEND': os.getenv('IMPORT_STORAGE_BACKEND', 'dashboard.db_storage.DatabaseStorage')},
+}
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Streaming upload ingestion (bulk lead import, bulk email)
+UPLOAD_CHUNK_ROWS = int(os.getenv('UPLOAD_CHUNK_ROWS', '5000'))
+UPLOAD_MEMORY_CEILING_MB = int(os.getenv('UPLOAD_MEMORY_CEILING_MB', '64'))
+
+# Dashboard KPI snapshot: full recount when counters are older than this
+KPI_RECONCILE_SECONDS = int(os.getenv('KPI_RECONCILE_SECONDS', '900'))
+
+# Report/analytics page cache. Entries live in the database (created by createcachetable)
+# and the invalidation counter in the ReportGeneration table, so every web worker and job
+# runner sees the same data; set REPORT_CACHE_DIR to keep entries in a file cache on a
+# shared volume instead.
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reports': {
+        'BACKEND': (
+            'django.core.cache.backends.filebased.FileBasedCache' if REPORT_CACHE_DIR
+            else 'django.core.cache.backends.db.DatabaseCache'
+        ),
+        'LOCATION': REPORT_CACHE_DIR or 'report_cache',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+# 0 disables caching; STALE_SECONDS > 0 serves outdated entries while refreshing in the background
+REPORT_CACHE_SECONDS = int(os.getenv('REPORT_CACHE_SECONDS', '600'))
+REPORT_CACHE_STALE_SECONDS = int(os.getenv('REPORT_CACHE_STALE_SECONDS', '0'))
+
+# Project lead metrics from the daily rollup instead of joining every lead (large lead tables)
+PROJECT_METRICS_FROM_ROLLUP = os.getenv('PROJECT_METRICS_FROM_ROLLUP', 'False').lower() == 'true'
+
+# Lead, call log and attendance listings page by cursor; rows_per_page is capped at MAX_PAGE_SIZE.
+# LISTING_COUNT_MODE: 'estimate' (planner estimate on PostgreSQL, count capped at
+# ESTIMATED_COUNT_CAP elsewhere), 'exact' or 'none'
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '100'))
+LISTING_COUNT_MODE = os.getenv('LISTING_COUNT_MODE', 'estimate')
+ESTIMATED_COUNT_CAP = int(os.getenv('ESTIMATED_COUNT_CAP', '10000'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 